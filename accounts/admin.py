@@ -7,7 +7,8 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from .models import (
     Role, Permission, RolePermission, Major, Level, 
-    Semester, User, VerificationCode, PasswordResetToken, UserActivity
+    Semester, User, VerificationCode, PasswordResetToken, UserActivity,
+    PromotionBatch, UserImportJob
 )
 
 
@@ -145,3 +146,30 @@ class UserActivityAdmin(admin.ModelAdmin):
     search_fields = ['user__academic_id', 'user__full_name', 'description']
     readonly_fields = ['activity_time']
     date_hierarchy = 'activity_time'
+
+
+@admin.register(PromotionBatch)
+class PromotionBatchAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'mode', 'from_level', 'major', 'student_count', 'duration', 'status', 'performed_by']
+    list_filter = ['mode', 'status']
+    readonly_fields = [
+        'mode', 'from_level', 'major', 'status', 'student_count', 'duration',
+        'last_error', 'performed_by', 'created_at', 'undone_at'
+    ]
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(UserImportJob)
+class UserImportJobAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'original_name', 'status', 'processed_rows', 'created_count', 'failed_count', 'duration', 'created_by']
+    list_filter = ['status']
+    readonly_fields = [
+        'file', 'original_name', 'skip_errors', 'status', 'total_rows', 'processed_rows',
+        'created_count', 'failed_count', 'skipped_count', 'error_file', 'duration',
+        'last_error', 'attempts', 'created_by', 'created_at', 'started_at', 'heartbeat_at', 'finished_at'
+    ]
+    
+    def has_add_permission(self, request):
+        return False
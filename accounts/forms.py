@@ -269,21 +269,28 @@ class ChangePasswordForm(forms.Form):
 
 class UserBulkImportForm(forms.Form):
     """
-    نموذج استيراد المستخدمين بالجملة من CSV
+    نموذج استيراد المستخدمين بالجملة من CSV أو Excel (xlsx)
     """
     csv_file = forms.FileField(
-        label='ملف CSV',
+        label='ملف CSV / Excel',
         widget=forms.FileInput(attrs={
             'class': 'form-control',
-            'accept': '.csv'
+            'accept': '.csv,.xlsx'
         }),
         help_text='الملف يجب أن يحتوي على الأعمدة: academic_id, id_card_number, full_name, role, major, level'
     )
+    skip_errors = forms.BooleanField(
+        required=False,
+        label='تخطي الصفوف التي تحتوي على أخطاء والاستمرار'
+    )
     
     def clean_csv_file(self):
+        from .services import UserImportService
+        
         csv_file = self.cleaned_data.get('csv_file')
-        if not csv_file.name.endswith('.csv'):
-            raise ValidationError('يجب أن يكون الملف بصيغة CSV.')
+        extensions = UserImportService.get_supported_extensions()
+        if not csv_file.name.lower().endswith(tuple(extensions)):
+            raise ValidationError(f'صيغة الملف غير مدعومة. الصيغ المسموحة: {", ".join(extensions)}')
         return csv_file
 
 
@@ -312,15 +319,12 @@ class UserCreateForm(forms.ModelForm):
 class StudentPromotionForm(forms.Form):
     """
     نموذج ترقية الطلاب الجماعية
+    المستوى الجديد يُحدد تلقائياً (المستوى التالي)
     """
     from_level = forms.ModelChoiceField(
         queryset=Level.objects.all(),
         label='من المستوى',
-        widget=forms.Select(attrs={'class': 'form-select'})
-    )
-    to_level = forms.ModelChoiceField(
-        queryset=Level.objects.all(),
-        label='إلى المستوى',
+        required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     major = forms.ModelChoiceField(
@@ -330,16 +334,17 @@ class StudentPromotionForm(forms.Form):
         widget=forms.Select(attrs={'class': 'form-select'}),
         help_text='اتركه فارغاً لترقية جميع التخصصات'
     )
+    rollover = forms.BooleanField(
+        label='ترحيل جميع المستويات',
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        help_text='ترقية طلاب كل المستويات إلى المستوى التالي (بدءاً من الأعلى)'
+    )
     
     def clean(self):
         cleaned_data = super().clean()
-        from_level = cleaned_data.get('from_level')
-        to_level = cleaned_data.get('to_level')
         
-        if from_level and to_level:
-            if from_level.level_number >= to_level.level_number:
-                raise ValidationError(
-                    'المستوى الجديد يجب أن يكون أعلى من المستوى الحالي.'
-                )
+        if not cleaned_data.get('rollover') and not cleaned_data.get('from_level'):
+            raise ValidationError('اختر المستوى المراد ترقيته أو فعّل ترحيل جميع المستويات.')
         
         return cleaned_data
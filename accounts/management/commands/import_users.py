@@ -0,0 +1,144 @@
+"""
+Management Command لاستيراد المستخدمين بالجملة
+S-ACM - Smart Academic Content Management System
+"""
+
+import csv
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Level, Major
+from accounts.services import UserImportService
+
+
+class Command(BaseCommand):
+    help = 'استيراد المستخدمين من ملف CSV أو Excel (xlsx) على دفعات مع تقرير أخطاء لكل صف'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            help='مسار ملف الاستيراد'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='عدد الصفوف في كل دفعة إدراج'
+        )
+        parser.add_argument(
+            '--stop-on-error',
+            action='store_true',
+            help='إلغاء الاستيراد كاملاً عند وجود أي صف خاطئ'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='تنفيذ الاستيراد كاملاً ثم التراجع عنه (للتحقق من الملف)'
+        )
+        parser.add_argument(
+            '--benchmark',
+            type=int,
+            metavar='ROWS',
+            help='قياس سرعة الاستيراد على ملف مولّد بعدد الصفوف المحدد (تشغيل تجريبي)'
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'xlsx'],
+            default='csv',
+            help='صيغة الملف المولّد للقياس'
+        )
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark(options['benchmark'], options['format'], options['batch_size'])
+
+        if not options['path']:
+            raise CommandError('حدد مسار الملف أو استخدم --benchmark.')
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'الملف غير موجود: {path}')
+
+        result = self.run_import(
+            path,
+            skip_errors=not options['stop_on_error'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+        )
+
+        for error in result['errors'][:UserImportService.ERRORS_DISPLAY_LIMIT]:
+            self.stdout.write(self.style.WARNING(
+                f'  السطر {error["row"]} ({error["academic_id"]}): {error["error"]}'
+            ))
+        if len(result['errors']) > UserImportService.ERRORS_DISPLAY_LIMIT:
+            self.stdout.write(f'  ... و{len(result["errors"]) - UserImportService.ERRORS_DISPLAY_LIMIT} أخطاء أخرى')
+
+        if options['dry_run']:
+            self.stdout.write('\n(تشغيل تجريبي، لم يتم حفظ أي مستخدم)')
+        elif result['created']:
+            self.stdout.write(self.style.SUCCESS(f'\n✓ تم استيراد {result["created"]} مستخدم بنجاح!'))
+
+    def run_import(self, path, **options):
+        with open(path, 'rb') as file_obj:
+            result, error = UserImportService.import_file(
+                file_obj, path.name, progress=self.report_progress, **options
+            )
+        if error:
+            raise CommandError(error)
+
+        self.stdout.write(
+            f'\n{result["total"]} صف: {result["created"]} تم إنشاؤه، {result["failed"]} خاطئ، '
+            f'{result["skipped"]} متخطى خلال {result["duration"]:.2f} ثانية '
+            f'({result["rate"]:.0f} صف/ثانية)'
+        )
+        return result
+
+    def report_progress(self, result):
+        self.stdout.write(f'  {result["total"]} صف حتى الآن ({result["created"]} تم إنشاؤه)')
+
+    def benchmark(self, count, file_format, batch_size):
+        if f'.{file_format}' not in UserImportService.get_supported_extensions():
+            raise CommandError(f'صيغة {file_format} غير مدعومة (تحتاج openpyxl).')
+
+        majors = list(Major.objects.values_list('major_name', flat=True)) or ['']
+        levels = list(Level.objects.values_list('level_number', flat=True)) or ['']
+        rows = (
+            [
+                f'BENCH{i:08d}', f'BENCHID{i:08d}', 'student', 'طالب', str(i),
+                majors[i % len(majors)], levels[i % len(levels)],
+            ]
+            for i in range(count)
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / f'benchmark.{file_format}'
+            started = time.monotonic()
+            if file_format == 'xlsx':
+                self.write_xlsx(path, rows)
+            else:
+                self.write_csv(path, rows)
+            self.stdout.write(
+                f'تم توليد {count} صف ({path.stat().st_size // 1024} KB) '
+                f'خلال {time.monotonic() - started:.2f} ثانية، جاري قياس الاستيراد...'
+            )
+            self.run_import(path, skip_errors=True, dry_run=True, batch_size=batch_size)
+
+    def write_csv(self, path, rows):
+        with open(path, 'w', encoding='utf-8', newline='') as file_obj:
+            writer = csv.writer(file_obj)
+            writer.writerow(UserImportService.TEMPLATE_COLUMNS)
+            writer.writerows(rows)
+
+    def write_xlsx(self, path, rows):
+        from openpyxl import Workbook
+
+        # وضع write_only يكتب الصفوف بالتدفق دون الاحتفاظ بها في الذاكرة
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(UserImportService.TEMPLATE_COLUMNS)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
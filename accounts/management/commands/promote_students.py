@@ -0,0 +1,110 @@
+"""
+Management Command لترقية الطلاب على دفعات
+S-ACM - Smart Academic Content Management System
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Level, Major, PromotionBatch
+from courses.services import PromotionService
+
+
+class Command(BaseCommand):
+    help = 'ترقية الطلاب إلى المستوى التالي (مستوى واحد أو ترحيل جميع المستويات) مع إمكانية التراجع'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--level',
+            type=int,
+            help='رقم المستوى المراد ترقية طلابه'
+        )
+        parser.add_argument(
+            '--rollover',
+            action='store_true',
+            help='ترقية جميع المستويات بترتيب تنازلي في عملية واحدة'
+        )
+        parser.add_argument(
+            '--major',
+            type=int,
+            help='معرف التخصص (الافتراضي: جميع التخصصات)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='عدد الطلاب في كل معاملة'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='عرض أعداد الطلاب لكل (تخصص، مستوى) دون تنفيذ'
+        )
+        parser.add_argument(
+            '--undo',
+            type=int,
+            metavar='BATCH_ID',
+            help='التراجع عن دفعة ترقية سابقة'
+        )
+
+    def handle(self, *args, **options):
+        if options['undo']:
+            return self.undo(options['undo'], options['chunk_size'])
+
+        if bool(options['level']) == options['rollover']:
+            raise CommandError('حدد --level أو --rollover (أحدهما فقط).')
+
+        from_level = None
+        if options['level']:
+            try:
+                from_level = Level.objects.get(level_number=options['level'])
+            except Level.DoesNotExist:
+                raise CommandError(f'المستوى {options["level"]} غير موجود.')
+
+        major = None
+        if options['major']:
+            try:
+                major = Major.objects.get(pk=options['major'])
+            except Major.DoesNotExist:
+                raise CommandError(f'التخصص {options["major"]} غير موجود.')
+
+        if options['dry_run']:
+            rows, total = PromotionService.preview(from_level=from_level, major=major)
+            for row in rows:
+                self.stdout.write(
+                    f'  - {row["major"]}: {row["from_level"]} → {row["to_level"]}: {row["count"]}'
+                )
+            self.stdout.write(f'الإجمالي: {total} طالب (تشغيل تجريبي، لم يتم أي تعديل)')
+            return
+
+        batch, error = PromotionService.promote(
+            from_level=from_level,
+            major=major,
+            chunk_size=options['chunk_size'],
+            progress=self.report_progress
+        )
+        if batch is None:
+            raise CommandError(error)
+
+        self.stdout.write(
+            f'\nالدفعة #{batch.pk}: {batch.student_count} طالب خلال {batch.duration:.2f} ثانية '
+            f'({batch.throughput:.0f} طالب/ثانية)'
+        )
+        if error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ تمت الترقية بنجاح! (للتراجع: promote_students --undo {batch.pk})'
+        ))
+
+    def report_progress(self, batch, from_level, to_level, done):
+        self.stdout.write(f'  {from_level} → {to_level}: {done} طالب حتى الآن')
+
+    def undo(self, batch_id, chunk_size):
+        try:
+            batch = PromotionBatch.objects.get(pk=batch_id)
+        except PromotionBatch.DoesNotExist:
+            raise CommandError(f'الدفعة {batch_id} غير موجودة.')
+
+        count, error = PromotionService.undo(batch, chunk_size=chunk_size)
+        if error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(f'\n✓ تم إعادة {count} طالب إلى مستوياتهم السابقة!'))
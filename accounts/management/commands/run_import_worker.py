@@ -0,0 +1,51 @@
+"""
+Management Command لمعالجة مهام استيراد المستخدمين في الخلفية
+S-ACM - Smart Academic Content Management System
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.services import UserImportJobService
+
+
+class Command(BaseCommand):
+    help = 'معالجة طابور مهام استيراد المستخدمين (الملفات الكبيرة المرفوعة من لوحة التحكم)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='معالجة المهام المعلقة مرة واحدة ثم الخروج'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'USER_IMPORT_WORKER_INTERVAL', 5),
+            help='الفاصل الزمني بين دورات المعالجة بالثواني'
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.run_cycle()
+            return
+
+        self.stdout.write(f'بدء معالج مهام الاستيراد (كل {options["interval"]} ثانية)...')
+        try:
+            while True:
+                if not self.run_cycle():
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\nتم إيقاف معالج مهام الاستيراد.')
+
+    def run_cycle(self):
+        stats = UserImportJobService.process_pending(limit=1)
+        processed = sum(stats.values())
+        if processed:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ تمت معالجة {processed} مهمة '
+                f'({stats.get("completed", 0)} مكتملة، {stats.get("failed", 0)} فاشلة)'
+            ))
+        return processed
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='useractivity',
+            name='activity_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='وقت النشاط'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_activity_time_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromotionBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('level', 'مستوى واحد'), ('rollover', 'ترحيل جميع المستويات')], default='level', max_length=10, verbose_name='نوع الترقية')),
+                ('status', models.CharField(choices=[('running', 'قيد التنفيذ'), ('completed', 'مكتملة'), ('failed', 'فشلت'), ('undone', 'تم التراجع')], default='running', max_length=10, verbose_name='الحالة')),
+                ('student_count', models.PositiveIntegerField(default=0, verbose_name='عدد الطلاب المرقين')),
+                ('duration', models.FloatField(default=0, verbose_name='مدة التنفيذ (ثانية)')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='آخر خطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ التنفيذ')),
+                ('undone_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ التراجع')),
+                ('from_level', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.level', verbose_name='من المستوى')),
+                ('major', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.major', verbose_name='التخصص')),
+                ('performed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='promotion_batches', to=settings.AUTH_USER_MODEL, verbose_name='المنفذ')),
+            ],
+            options={
+                'verbose_name': 'دفعة ترقية',
+                'verbose_name_plural': 'دفعات الترقية',
+                'db_table': 'promotion_batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PromotionBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='accounts.promotionbatch', verbose_name='الدفعة')),
+                ('from_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.level', verbose_name='المستوى السابق')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='الطالب')),
+                ('to_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.level', verbose_name='المستوى الجديد')),
+            ],
+            options={
+                'verbose_name': 'طالب في دفعة ترقية',
+                'verbose_name_plural': 'طلاب دفعات الترقية',
+                'db_table': 'promotion_batch_items',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:09
+
+import accounts.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_promotion_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(storage=accounts.models.get_import_storage, upload_to='%Y/%m/', verbose_name='ملف الاستيراد')),
+                ('original_name', models.CharField(max_length=255, verbose_name='اسم الملف')),
+                ('skip_errors', models.BooleanField(default=True, verbose_name='تخطي الصفوف الخاطئة')),
+                ('status', models.CharField(choices=[('pending', 'قيد الانتظار'), ('processing', 'قيد المعالجة'), ('completed', 'مكتملة'), ('failed', 'فشلت')], default='pending', max_length=10, verbose_name='الحالة')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='عدد الصفوف (تقديري)')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='الصفوف المعالجة')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='المستخدمون المنشؤون')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='الصفوف الخاطئة')),
+                ('skipped_count', models.PositiveIntegerField(default=0, verbose_name='الصفوف المتخطاة')),
+                ('error_file', models.FileField(blank=True, storage=accounts.models.get_import_storage, upload_to='errors/%Y/%m/', verbose_name='تقرير الأخطاء')),
+                ('duration', models.FloatField(default=0, verbose_name='مدة التنفيذ (ثانية)')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='آخر خطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإضافة')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ البدء')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الانتهاء')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='المنفذ')),
+            ],
+            options={
+                'verbose_name': 'مهمة استيراد مستخدمين',
+                'verbose_name_plural': 'مهام استيراد المستخدمين',
+                'db_table': 'user_import_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='user_import_status_735668_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userimportjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات'),
+        ),
+        migrations.AddField(
+            model_name='userimportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر تحديث من المعالج'),
+        ),
+    ]
@@ -197,6 +197,17 @@ class Semester(models.Model):
         if self.is_current:
             Semester.objects.filter(is_current=True).exclude(pk=self.pk).update(is_current=False)
         super().save(*args, **kwargs)
+        
+        # قوائم مقررات الطلاب مرتبطة بالفصل الحالي
+        from courses.services import StudentCatalogCache
+        StudentCatalogCache.bump()
+    
+    def delete(self, *args, **kwargs):
+        from courses.services import StudentCatalogCache
+        
+        result = super().delete(*args, **kwargs)
+        StudentCatalogCache.bump()
+        return result
 
 
 class UserManager(BaseUserManager):
@@ -330,6 +341,28 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.full_name} ({self.academic_id})"
     
+    # الحقول التي تحدد مقررات الطالب (جدول course_audience)
+    AUDIENCE_FIELDS = ('role', 'major', 'level', 'account_status')
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        audience_changed = False
+        if update_fields is None or {name.removesuffix('_id') for name in update_fields} & set(self.AUDIENCE_FIELDS):
+            if self.pk:
+                old_state = User.objects.filter(pk=self.pk).values_list(
+                    'role_id', 'major_id', 'level_id', 'account_status'
+                ).first()
+            else:
+                old_state = None
+            new_state = (self.role_id, self.major_id, self.level_id, self.account_status)
+            audience_changed = old_state != new_state
+        
+        super().save(*args, **kwargs)
+        
+        if audience_changed:
+            from courses.services import CourseAudienceService
+            CourseAudienceService.refresh_students([self.pk])
+    
     def is_admin(self):
         return self.role and self.role.role_name == 'Admin'
     
@@ -473,7 +506,7 @@ class UserActivity(models.Model):
         verbose_name='معلومات المتصفح'
     )
     activity_time = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         verbose_name='وقت النشاط'
     )
     
@@ -496,3 +529,273 @@ class UserActivity(models.Model):
     
     def __str__(self):
         return f"{self.user.academic_id} - {self.get_activity_type_display()}"
+
+
+class PromotionBatch(models.Model):
+    """
+    جدول دفعات الترقية (Promotion_Batches)
+    كل تنفيذ للترقية يُسجل مع الطلاب المرقين (PromotionBatchItem) لإمكانية التراجع
+    """
+    MODE_CHOICES = [
+        ('level', 'مستوى واحد'),
+        ('rollover', 'ترحيل جميع المستويات'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('running', 'قيد التنفيذ'),
+        ('completed', 'مكتملة'),
+        ('failed', 'فشلت'),
+        ('undone', 'تم التراجع'),
+    ]
+    
+    mode = models.CharField(
+        max_length=10,
+        choices=MODE_CHOICES,
+        default='level',
+        verbose_name='نوع الترقية'
+    )
+    from_level = models.ForeignKey(
+        Level,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='من المستوى'
+    )
+    major = models.ForeignKey(
+        Major,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='التخصص'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='running',
+        verbose_name='الحالة'
+    )
+    student_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد الطلاب المرقين'
+    )
+    duration = models.FloatField(
+        default=0,
+        verbose_name='مدة التنفيذ (ثانية)'
+    )
+    last_error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='آخر خطأ'
+    )
+    performed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='promotion_batches',
+        verbose_name='المنفذ'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ التنفيذ'
+    )
+    undone_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ التراجع'
+    )
+    
+    class Meta:
+        db_table = 'promotion_batches'
+        verbose_name = 'دفعة ترقية'
+        verbose_name_plural = 'دفعات الترقية'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.get_mode_display()} - {self.created_at:%Y-%m-%d %H:%M} ({self.student_count})"
+    
+    @property
+    def throughput(self):
+        """عدد الطلاب المرقين في الثانية"""
+        return self.student_count / self.duration if self.duration else 0
+    
+    @property
+    def can_undo(self):
+        return self.status in ('completed', 'failed') and self.student_count > 0
+
+
+class PromotionBatchItem(models.Model):
+    """
+    جدول عناصر دفعة الترقية (Promotion_Batch_Items)
+    المستوى السابق والجديد لكل طالب رُقي ضمن الدفعة
+    """
+    batch = models.ForeignKey(
+        PromotionBatch,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name='الدفعة'
+    )
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='الطالب'
+    )
+    from_level = models.ForeignKey(
+        Level,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='المستوى السابق'
+    )
+    to_level = models.ForeignKey(
+        Level,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='المستوى الجديد'
+    )
+    
+    class Meta:
+        db_table = 'promotion_batch_items'
+        verbose_name = 'طالب في دفعة ترقية'
+        verbose_name_plural = 'طلاب دفعات الترقية'
+    
+    def __str__(self):
+        return f"{self.batch_id} - {self.student_id}"
+
+
+def get_import_storage():
+    """ملفات الاستيراد تحتوي بيانات شخصية: تُحفظ خارج MEDIA_ROOT"""
+    from django.conf import settings
+    from django.core.files.storage import FileSystemStorage
+    return FileSystemStorage(location=getattr(settings, 'USER_IMPORT_DIR', settings.BASE_DIR / 'imports'))
+
+
+class UserImportJob(models.Model):
+    """
+    جدول مهام استيراد المستخدمين (User_Import_Jobs)
+    الملفات الكبيرة تُستورد خارج مسار الطلب عبر run_import_worker
+    مع تحديث التقدم بعد كل دفعة وتقرير أخطاء CSV في النهاية
+    """
+    STATUS_CHOICES = [
+        ('pending', 'قيد الانتظار'),
+        ('processing', 'قيد المعالجة'),
+        ('completed', 'مكتملة'),
+        ('failed', 'فشلت'),
+    ]
+    
+    file = models.FileField(
+        upload_to='%Y/%m/',
+        storage=get_import_storage,
+        verbose_name='ملف الاستيراد'
+    )
+    original_name = models.CharField(
+        max_length=255,
+        verbose_name='اسم الملف'
+    )
+    skip_errors = models.BooleanField(
+        default=True,
+        verbose_name='تخطي الصفوف الخاطئة'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='الحالة'
+    )
+    total_rows = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد الصفوف (تقديري)'
+    )
+    processed_rows = models.PositiveIntegerField(
+        default=0,
+        verbose_name='الصفوف المعالجة'
+    )
+    created_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='المستخدمون المنشؤون'
+    )
+    failed_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='الصفوف الخاطئة'
+    )
+    skipped_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='الصفوف المتخطاة'
+    )
+    error_file = models.FileField(
+        upload_to='errors/%Y/%m/',
+        storage=get_import_storage,
+        blank=True,
+        verbose_name='تقرير الأخطاء'
+    )
+    duration = models.FloatField(
+        default=0,
+        verbose_name='مدة التنفيذ (ثانية)'
+    )
+    last_error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='آخر خطأ'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد المحاولات'
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='import_jobs',
+        verbose_name='المنفذ'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الإضافة'
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ البدء'
+    )
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='آخر تحديث من المعالج'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ الانتهاء'
+    )
+    
+    class Meta:
+        db_table = 'user_import_jobs'
+        verbose_name = 'مهمة استيراد مستخدمين'
+        verbose_name_plural = 'مهام استيراد المستخدمين'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.original_name} - {self.get_status_display()}"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+    
+    @property
+    def progress_percent(self):
+        if self.status == 'completed':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.processed_rows * 100 // self.total_rows)
+    
+    @property
+    def throughput(self):
+        """عدد الصفوف المعالجة في الثانية"""
+        return self.processed_rows / self.duration if self.duration else 0
@@ -0,0 +1,673 @@
+"""
+خدمات إدارة المستخدمين
+S-ACM - Smart Academic Content Management System
+"""
+
+import atexit
+import csv
+import io
+import logging
+import os
+import threading
+import time
+import zipfile
+from collections import deque
+from contextlib import nullcontext
+from datetime import timedelta
+from itertools import chain
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Excel Parsing
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogger:
+    """
+    مسار تسجيل نشاط المستخدمين على دفعات
+    
+    تُضاف الأنشطة إلى مخزن مؤقت محدود في ذاكرة العملية، ويكتبها خيط خلفي لكل
+    عملية عبر bulk_create كل ACTIVITY_LOG_FLUSH_INTERVAL ثانية أو فوراً عند بلوغ
+    حجم الدفعة، وعند إيقاف العملية. عند فشل الكتابة تُعاد الأنشطة إلى المخزن
+    للمحاولة التالية (في حدود ACTIVITY_LOG_MAX_BUFFER).
+    
+    سياسة الامتلاء (ACTIVITY_LOG_OVERFLOW_POLICY):
+    - drop: تجاهل النشاط الجديد وزيادة عداد المحذوفات
+    - block: كتابة المخزن فوراً داخل الطلب الحالي (ضغط عكسي)
+    """
+    
+    _lock = threading.Lock()
+    _buffer = deque()
+    _stats = {'logged': 0, 'flushed': 0, 'dropped': 0, 'failed': 0}
+    _wakeup = threading.Event()
+    _flusher = None
+    _flusher_pid = None
+    
+    @classmethod
+    def get_batch_size(cls):
+        return getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 200)
+    
+    @classmethod
+    def get_flush_interval(cls):
+        return getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 10)
+    
+    @classmethod
+    def get_max_buffer(cls):
+        return getattr(settings, 'ACTIVITY_LOG_MAX_BUFFER', 5000)
+    
+    @classmethod
+    def get_overflow_policy(cls):
+        return getattr(settings, 'ACTIVITY_LOG_OVERFLOW_POLICY', 'drop')
+    
+    @classmethod
+    def log(cls, user, activity_type, description=None, ip_address=None, user_agent=None, file_id=None):
+        """
+        إضافة نشاط إلى المخزن المؤقت
+        يعيد False إذا تم تجاهل النشاط بسبب امتلاء المخزن
+        """
+        from .models import UserActivity
+        
+        activity = UserActivity(
+            user_id=user.pk,
+            activity_type=activity_type,
+            description=description,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            file_id=file_id,
+            activity_time=timezone.now()
+        )
+        
+        with cls._lock:
+            is_full = len(cls._buffer) >= cls.get_max_buffer()
+            if is_full and cls.get_overflow_policy() != 'block':
+                cls._stats['dropped'] += 1
+                return False
+        
+        if is_full:
+            cls._safe_flush()
+        
+        with cls._lock:
+            cls._buffer.append(activity)
+            cls._stats['logged'] += 1
+            due = len(cls._buffer) >= cls.get_batch_size()
+        
+        cls.ensure_flusher()
+        if due:
+            cls._wakeup.set()
+        
+        return True
+    
+    @classmethod
+    def ensure_flusher(cls):
+        """تشغيل خيط الكتابة الخلفي مرة لكل عملية (وبعد fork في خوادم preload)"""
+        pid = os.getpid()
+        if cls._flusher_pid == pid and cls._flusher.is_alive():
+            return
+        with cls._lock:
+            if cls._flusher_pid == pid and cls._flusher.is_alive():
+                return
+            cls._flusher = threading.Thread(
+                target=cls._run_flusher, name='activity-log-flusher', daemon=True
+            )
+            cls._flusher_pid = pid
+            cls._flusher.start()
+    
+    @classmethod
+    def _run_flusher(cls):
+        while True:
+            cls._wakeup.wait(cls.get_flush_interval())
+            cls._wakeup.clear()
+            if cls._safe_flush() is None:
+                # تهدئة بعد الفشل حتى لا تعيد الأنشطة المستعادة إيقاظ الخيط فوراً
+                time.sleep(cls.get_flush_interval())
+            # اتصال هذا الخيط يخضع لـ CONN_MAX_AGE كاتصالات الطلبات
+            close_old_connections()
+    
+    @classmethod
+    def restore(cls, pending):
+        """
+        إعادة أنشطة لم تُكتب إلى مقدمة المخزن
+        ما يتجاوز ACTIVITY_LOG_MAX_BUFFER (الأقدم أولاً) يُحتسب في المحذوفات
+        """
+        with cls._lock:
+            room = max(cls.get_max_buffer() - len(cls._buffer), 0)
+            kept = pending[-room:] if room else []
+            cls._buffer.extendleft(reversed(kept))
+            cls._stats['dropped'] += len(pending) - len(kept)
+    
+    @classmethod
+    def flush(cls):
+        """كتابة جميع الأنشطة المتراكمة على دفعات"""
+        from .models import UserActivity
+        
+        with cls._lock:
+            pending = list(cls._buffer)
+            cls._buffer.clear()
+        
+        if not pending:
+            return 0
+        
+        try:
+            UserActivity.objects.bulk_create(pending, batch_size=cls.get_batch_size())
+        except Exception:
+            with cls._lock:
+                cls._stats['failed'] += len(pending)
+            cls.restore(pending)
+            raise
+        
+        with cls._lock:
+            cls._stats['flushed'] += len(pending)
+        return len(pending)
+    
+    @classmethod
+    def _safe_flush(cls):
+        """كتابة المخزن دون رفع الاستثناء (الأنشطة تبقى للمحاولة التالية)"""
+        try:
+            return cls.flush()
+        except Exception:
+            logger.exception('Flushing activity log failed; events kept for the next attempt')
+            return None
+    
+    @classmethod
+    def get_stats(cls):
+        """
+        عدادات المسار في هذه العملية: المسجلة والمكتوبة والمحذوفة وحجم المخزن الحالي
+        failed: أنشطة فشلت كتابتها وأعيدت إلى المخزن
+        """
+        with cls._lock:
+            return dict(cls._stats, buffered=len(cls._buffer))
+
+
+# كتابة الأنشطة المتبقية عند إيقاف العملية
+atexit.register(ActivityLogger._safe_flush)
+
+
+class UserImportService:
+    """
+    استيراد المستخدمين بالجملة (CSV / Excel)
+    
+    - الأدوار والتخصصات والمستويات تُحمّل مرة واحدة في قواميس
+    - الملف يُقرأ صفاً بصف دون تحميله كاملاً في الذاكرة
+      (openpyxl بوضع read_only لملفات xlsx)
+    - التحقق من تكرار academic_id / id_card_number مقابل مجموعة محمّلة مسبقاً
+    - الإدراج عبر bulk_create على دفعات، كل دفعة في معاملة
+    
+    الحسابات المستوردة غير مفعلة (inactive) فلا تدخل جمهور المقررات حتى التفعيل.
+    """
+    
+    REQUIRED_COLUMNS = ('academic_id', 'id_card_number')
+    DEFAULT_ROLE = 'Student'
+    TEMPLATE_COLUMNS = ('academic_id', 'id_card_number', 'role', 'first_name', 'last_name', 'major', 'level')
+    MAX_LENGTHS = {'academic_id': 50, 'id_card_number': 50, 'full_name': 150}
+    ERRORS_DISPLAY_LIMIT = 50
+    
+    class Rollback(Exception):
+        """إلغاء الاستيراد كاملاً (تشغيل تجريبي أو أخطاء دون skip_errors)"""
+    
+    @classmethod
+    def get_batch_size(cls):
+        return getattr(settings, 'USER_IMPORT_BATCH_SIZE', 1000)
+    
+    @staticmethod
+    def normalize_row(row):
+        return {
+            str(key).strip().lower(): ('' if value is None else str(value).strip())
+            for key, value in row.items() if key is not None
+        }
+    
+    @staticmethod
+    def get_supported_extensions():
+        return ['.csv', '.xlsx'] if OPENPYXL_AVAILABLE else ['.csv']
+    
+    @classmethod
+    def iter_csv(cls, file_obj, encoding='utf-8-sig'):
+        """قراءة صفوف CSV من ملف ثنائي بالتدفق: (رقم السطر، الصف)"""
+        stream = io.TextIOWrapper(getattr(file_obj, 'file', file_obj), encoding=encoding, newline='')
+        try:
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, cls.normalize_row(row)
+        finally:
+            # عدم إغلاق الملف الأصلي مع الغلاف
+            stream.detach()
+    
+    @classmethod
+    def iter_xlsx(cls, file_obj):
+        """
+        قراءة صفوف الورقة الأولى من ملف xlsx: (رقم الصف، الصف)
+        وضع read_only يحلل XML الورقة بالتدفق فتبقى الذاكرة ثابتة مهما كبر الملف
+        """
+        workbook = openpyxl.load_workbook(
+            getattr(file_obj, 'file', file_obj), read_only=True, data_only=True
+        )
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            for row_num, values in enumerate(rows, start=2):
+                # الصفوف الفارغة (تنسيق بلا بيانات) في نهاية الورقة
+                if not any(value is not None and str(value).strip() for value in values):
+                    continue
+                yield row_num, cls.normalize_row(dict(zip(header, values)))
+        finally:
+            workbook.close()
+    
+    @classmethod
+    def iter_rows(cls, file_obj, filename):
+        """
+        اختيار المحلل حسب امتداد الملف
+        Returns: (rows iterator, error_message)
+        """
+        extension = Path(filename).suffix.lower()
+        if extension == '.csv':
+            return cls.iter_csv(file_obj), None
+        if extension == '.xlsx' and OPENPYXL_AVAILABLE:
+            return cls.iter_xlsx(file_obj), None
+        return None, 'صيغة الملف غير مدعومة.'
+    
+    @classmethod
+    def count_rows(cls, file_obj, filename):
+        """
+        عدد الصفوف التقريبي (لعرض نسبة التقدم) دون تحليل الملف
+        CSV: عدد الأسطر ناقص العنوان (الحقول متعددة الأسطر تزيد التقدير)
+        xlsx: أبعاد الورقة المسجلة في الملف (دون قراءة الصفوف)
+        """
+        extension = Path(filename).suffix.lower()
+        stream = getattr(file_obj, 'file', file_obj)
+        if extension == '.xlsx' and OPENPYXL_AVAILABLE:
+            workbook = openpyxl.load_workbook(stream, read_only=True)
+            max_row = workbook.worksheets[0].max_row or 0
+            workbook.close()
+            stream.seek(0)
+            return max(max_row - 1, 0)
+        if extension != '.csv':
+            return 0
+        lines = last = 0
+        for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+            lines += chunk.count(b'\n')
+            last = chunk[-1]
+        stream.seek(0)
+        if last and last != ord('\n'):
+            lines += 1
+        return max(lines - 1, 0)
+    
+    @classmethod
+    def load_lookups(cls):
+        """الأدوار والتخصصات والمستويات في قواميس (بالاسم، وبالرقم للمستويات)"""
+        from .models import Role, Major, Level
+        
+        lookups = {'role': {}, 'major': {}, 'level': {}}
+        for role in Role.objects.all():
+            lookups['role'][role.role_name] = role
+            lookups['role'].setdefault(role.role_name.lower(), role)
+        for major in Major.objects.all():
+            lookups['major'][major.major_name] = major
+            lookups['major'].setdefault(major.major_name.lower(), major)
+        for level in Level.objects.all():
+            lookups['level'][level.level_name] = level
+            lookups['level'].setdefault(level.level_name.lower(), level)
+            lookups['level'].setdefault(str(level.level_number), level)
+        return lookups
+    
+    @classmethod
+    def load_existing_identifiers(cls):
+        """المعرفات المستخدمة حالياً في استعلام واحد"""
+        from .models import User
+        
+        academic_ids, id_card_numbers = set(), set()
+        rows = User.objects.values_list('academic_id', 'id_card_number').iterator(chunk_size=5000)
+        for academic_id, id_card_number in rows:
+            academic_ids.add(academic_id)
+            id_card_numbers.add(id_card_number)
+        return academic_ids, id_card_numbers
+    
+    @staticmethod
+    def resolve(mapping, value):
+        return mapping.get(value) or mapping.get(value.lower())
+    
+    @classmethod
+    def build_user(cls, row, lookups, academic_ids, id_card_numbers):
+        """
+        تحويل صف إلى كائن User غير محفوظ
+        Returns: (user, error_message)
+        """
+        from .models import User
+        
+        academic_id = row.get('academic_id', '')
+        id_card_number = row.get('id_card_number', '')
+        full_name = row.get('full_name') or ' '.join(
+            part for part in (row.get('first_name'), row.get('last_name')) if part
+        )
+        
+        if not academic_id or not id_card_number:
+            return None, 'الرقم الأكاديمي ورقم البطاقة مطلوبان'
+        if not full_name:
+            return None, 'الاسم مطلوب (full_name أو first_name/last_name)'
+        for field, value in (('academic_id', academic_id), ('id_card_number', id_card_number), ('full_name', full_name)):
+            if len(value) > cls.MAX_LENGTHS[field]:
+                return None, f'{field} أطول من {cls.MAX_LENGTHS[field]} حرفاً'
+        if academic_id in academic_ids:
+            return None, f'الرقم الأكاديمي {academic_id} مستخدم مسبقاً'
+        if id_card_number in id_card_numbers:
+            return None, f'رقم البطاقة {id_card_number} مستخدم مسبقاً'
+        
+        role = cls.resolve(lookups['role'], row.get('role') or cls.DEFAULT_ROLE)
+        if role is None:
+            return None, f'الدور غير موجود: {row.get("role")}'
+        
+        major = level = None
+        if row.get('major'):
+            major = cls.resolve(lookups['major'], row['major'])
+            if major is None:
+                return None, f'التخصص غير موجود: {row["major"]}'
+        if row.get('level'):
+            level = cls.resolve(lookups['level'], row['level'])
+            if level is None:
+                return None, f'المستوى غير موجود: {row["level"]}'
+        
+        # حجز المعرفات لمنع التكرار داخل الملف نفسه
+        academic_ids.add(academic_id)
+        id_card_numbers.add(id_card_number)
+        
+        return User(
+            academic_id=academic_id,
+            id_card_number=id_card_number,
+            full_name=full_name,
+            role=role,
+            major=major,
+            level=level,
+        ), None
+    
+    @classmethod
+    def insert_batch(cls, pending, result, inserted=None):
+        """
+        إدراج دفعة في معاملة واحدة
+        عند تعارض مع بيانات أُضيفت أثناء الاستيراد تُعاد الدفعة صفاً صفاً
+        inserted: قائمة اختيارية تُضاف إليها معرفات الصفوف المدرجة
+        """
+        from .models import User
+        
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user in pending])
+            result['created'] += len(pending)
+            if inserted is not None:
+                inserted.extend(user.academic_id for _, user in pending)
+            return
+        except IntegrityError:
+            pass
+        
+        for row_num, user in pending:
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create([user])
+                result['created'] += 1
+                if inserted is not None:
+                    inserted.append(user.academic_id)
+            except IntegrityError as e:
+                cls.add_error(result, row_num, user.academic_id, str(e))
+    
+    @staticmethod
+    def add_error(result, row_num, academic_id, message):
+        result['failed'] += 1
+        result['errors'].append({'row': row_num, 'academic_id': academic_id, 'error': message})
+    
+    @classmethod
+    def import_rows(cls, rows, skip_errors=True, dry_run=False, validate_only=False, batch_size=None, progress=None):
+        """
+        استيراد الصفوف: أزواج (رقم السطر، قاموس بأسماء أعمدة صغيرة)
+        skip_errors=False: أي خطأ يلغي الاستيراد كاملاً (تُحذف الصفوف التي أُدرجت)
+        dry_run: تنفيذ كامل داخل معاملة تُلغى في النهاية (للتحقق وقياس الأداء)
+        validate_only: التحقق من الصفوف دون أي كتابة
+        progress: دالة اختيارية (result) تُستدعى بعد كل دفعة
+        Returns: (result, error_message)
+        result: total, created, failed, skipped, errors [{'row', 'academic_id', 'error'}], duration, rate
+        """
+        batch_size = batch_size or cls.get_batch_size()
+        result = {'total': 0, 'created': 0, 'failed': 0, 'skipped': 0, 'errors': [], 'duration': 0, 'rate': 0}
+        started = time.monotonic()
+        
+        rows = iter(rows)
+        first_row = next(rows, None)
+        if first_row is None:
+            return result, None
+        missing = [column for column in cls.REQUIRED_COLUMNS if column not in first_row[1]]
+        if missing:
+            return None, f'الأعمدة المطلوبة مفقودة: {", ".join(missing)}'
+        
+        lookups = cls.load_lookups()
+        academic_ids, id_card_numbers = cls.load_existing_identifiers()
+        # المعرفات المدرجة في هذا الاستيراد (للإلغاء عند skip_errors=False)
+        inserted = [] if not (skip_errors or dry_run or validate_only) else None
+        
+        def insert(pending):
+            if validate_only:
+                result['skipped'] += len(pending)
+            else:
+                cls.insert_batch(pending, result, inserted)
+            if progress:
+                progress(result)
+        
+        try:
+            # كل دفعة تُكتب في معاملة مستقلة؛ التشغيل التجريبي وحده يحتاج معاملة شاملة
+            with transaction.atomic() if dry_run else nullcontext():
+                pending = []
+                for row_num, row in chain([first_row], rows):
+                    result['total'] += 1
+                    user, error = cls.build_user(row, lookups, academic_ids, id_card_numbers)
+                    if error:
+                        cls.add_error(result, row_num, row.get('academic_id', ''), error)
+                        continue
+                    
+                    pending.append((row_num, user))
+                    if len(pending) >= batch_size:
+                        insert(pending)
+                        pending = []
+                
+                if pending:
+                    insert(pending)
+                
+                if dry_run:
+                    raise cls.Rollback()
+        except cls.Rollback:
+            pass
+        
+        if inserted is not None and result['failed']:
+            cls.delete_inserted(inserted, batch_size)
+            # لم يُحفظ أي صف: الصفوف السليمة تُحتسب متخطاة
+            result['skipped'] = result['created']
+            result['created'] = 0
+        
+        result['duration'] = time.monotonic() - started
+        result['rate'] = result['total'] / result['duration'] if result['duration'] else 0
+        return result, None
+    
+    @classmethod
+    def delete_inserted(cls, academic_ids, batch_size):
+        """إلغاء الصفوف المدرجة عند فشل استيراد لا يقبل الأخطاء"""
+        from .models import User
+        
+        for start in range(0, len(academic_ids), batch_size):
+            User.objects.filter(academic_id__in=academic_ids[start:start + batch_size]).delete()
+    
+    @classmethod
+    def import_file(cls, file_obj, filename, skip_errors=True, dry_run=False, progress=None, **options):
+        """
+        استيراد ملف مرفوع؛ بقية الخيارات تمرر إلى import_rows
+        
+        مع skip_errors=False يُقرأ الملف مرتين: تحقق كامل دون كتابة، ثم إدراج على
+        دفعات بمعاملات قصيرة فقط إذا خلا الملف من الأخطاء، بدل معاملة واحدة طويلة
+        تخفي التقدم عن صفحة المتابعة.
+        """
+        try:
+            if not skip_errors and not dry_run:
+                rows, error = cls.iter_rows(file_obj, filename)
+                if error:
+                    return None, error
+                result, error = cls.import_rows(rows, validate_only=True, progress=progress, **options)
+                if result is None or result['failed'] or not result['total']:
+                    return result, error
+                file_obj.seek(0)
+            
+            rows, error = cls.iter_rows(file_obj, filename)
+            if error:
+                return None, error
+            return cls.import_rows(
+                rows, skip_errors=skip_errors, dry_run=dry_run, progress=progress, **options
+            )
+        except (UnicodeDecodeError, csv.Error, zipfile.BadZipFile) as e:
+            return None, f'تعذر قراءة الملف: {e}'
+
+
+class UserImportJobService:
+    """
+    مهام الاستيراد في الخلفية (UserImportJob)
+    
+    الملفات الصغيرة تُستورد مباشرة داخل الطلب، والأكبر من USER_IMPORT_INLINE_MAX_SIZE
+    تنتظر run_import_worker فلا يتجاوز الطلب مهلة الخادم. التقدم يُحفظ في المهمة
+    بعد كل دفعة، وتقرير الأخطاء يُكتب كملف CSV عند الانتهاء.
+    """
+    
+    ERROR_COLUMNS = ('row', 'academic_id', 'error')
+    
+    @classmethod
+    def get_inline_max_size(cls):
+        return getattr(settings, 'USER_IMPORT_INLINE_MAX_SIZE', 100 * 1024)
+    
+    @classmethod
+    def create(cls, uploaded_file, user=None, skip_errors=True):
+        """إنشاء مهمة استيراد، ومعالجتها فوراً إذا كان الملف صغيراً"""
+        from .models import UserImportJob
+        
+        job = UserImportJob.objects.create(
+            file=uploaded_file,
+            original_name=uploaded_file.name,
+            skip_errors=skip_errors,
+            created_by=user,
+        )
+        if uploaded_file.size <= cls.get_inline_max_size():
+            cls.process_job(job)
+        return job
+    
+    @classmethod
+    def process_job(cls, job):
+        """
+        معالجة مهمة واحدة
+        Returns: الحالة النهائية، أو None إذا سبقنا معالج آخر إليها
+        """
+        from .models import UserImportJob
+        
+        now = timezone.now()
+        claimed = UserImportJob.objects.filter(pk=job.pk, status='pending').update(
+            status='processing',
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1
+        )
+        if not claimed:
+            return None
+        job.refresh_from_db()
+        
+        def report(result):
+            # تحديث مباشر دون save() لتقليل الكتابة أثناء الاستيراد
+            UserImportJob.objects.filter(pk=job.pk).update(
+                processed_rows=result['total'],
+                created_count=result['created'],
+                failed_count=result['failed'],
+                heartbeat_at=timezone.now(),
+            )
+        
+        try:
+            with job.file.open('rb') as file_obj:
+                job.total_rows = UserImportService.count_rows(file_obj, job.original_name)
+                UserImportJob.objects.filter(pk=job.pk).update(total_rows=job.total_rows)
+                result, error = UserImportService.import_file(
+                    file_obj, job.original_name, skip_errors=job.skip_errors, progress=report
+                )
+        except Exception as e:
+            result, error = None, str(e)
+        
+        if result is None:
+            job.status = 'failed'
+            job.last_error = error
+        else:
+            job.status = 'completed'
+            job.last_error = None
+            job.processed_rows = result['total']
+            job.created_count = result['created']
+            job.failed_count = result['failed']
+            job.skipped_count = result['skipped']
+            job.duration = result['duration']
+            if result['errors']:
+                cls.save_error_report(job, result['errors'])
+        
+        job.finished_at = timezone.now()
+        job.save()
+        return job.status
+    
+    @classmethod
+    def save_error_report(cls, job, errors):
+        """كتابة أخطاء الصفوف كملف CSV مرفق بالمهمة"""
+        from django.core.files.base import ContentFile
+        
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=cls.ERROR_COLUMNS)
+        writer.writeheader()
+        writer.writerows(errors)
+        # BOM ليعرض Excel الحروف العربية بشكل صحيح
+        content = ContentFile(output.getvalue().encode('utf-8-sig'))
+        job.error_file.save(f'{Path(job.original_name).stem}_errors.csv', content, save=False)
+    
+    @classmethod
+    def reclaim_stale(cls, now=None):
+        """
+        استعادة المهام العالقة في processing بعد توقف معالجها (قتل، نفاد ذاكرة، نشر)
+        
+        المهمة عالقة إذا لم يصل منها تحديث تقدم منذ USER_IMPORT_JOB_STALE_MINUTES.
+        تُعاد إلى الانتظار إذا لم يُنشأ أي مستخدم بعد ولم تتجاوز الحد الأقصى
+        للمحاولات، وإلا تُعلّم كفاشلة: إعادة ملف مُدرج جزئياً تكرر الأخطاء.
+        Returns: (عدد المعادة، عدد الفاشلة)
+        """
+        from .models import UserImportJob
+        
+        now = now or timezone.now()
+        stale = UserImportJob.objects.filter(
+            status='processing',
+            heartbeat_at__lt=now - timedelta(minutes=getattr(settings, 'USER_IMPORT_JOB_STALE_MINUTES', 10))
+        )
+        requeued = stale.filter(
+            created_count=0,
+            attempts__lt=getattr(settings, 'USER_IMPORT_JOB_MAX_ATTEMPTS', 3)
+        ).update(status='pending', last_error='توقف المعالج أثناء الاستيراد، أعيدت المهمة إلى الانتظار')
+        failed = stale.update(
+            status='failed',
+            finished_at=now,
+            last_error='توقف المعالج أثناء الاستيراد؛ راجع المستخدمين المنشئين قبل إعادة رفع الملف'
+        )
+        return requeued, failed
+    
+    @classmethod
+    def process_pending(cls, limit=5):
+        """معالجة أقدم المهام المعلقة، يعيد عدد المهام لكل حالة"""
+        from .models import UserImportJob
+        
+        stats = {}
+        cls.reclaim_stale()
+        jobs = UserImportJob.objects.filter(status='pending').order_by('created_at')[:limit]
+        for job in jobs:
+            status = cls.process_job(job)
+            if status:
+                stats[status] = stats.get(status, 0) + 1
+        return stats
@@ -33,5 +33,11 @@ urlpatterns = [
     path('admin/users/', views.UserListView.as_view(), name='admin_user_list'),
     path('admin/users/create/', views.UserCreateView.as_view(), name='admin_user_create'),
     path('admin/users/import/', views.UserBulkImportView.as_view(), name='admin_user_import'),
+    path('admin/users/import/template/', views.UserImportTemplateView.as_view(), name='admin_user_import_template'),
+    path('admin/users/import/jobs/<int:pk>/', views.UserImportJobView.as_view(), name='admin_user_import_job'),
+    path('admin/users/import/jobs/<int:pk>/progress/', views.UserImportJobProgressView.as_view(), name='admin_user_import_job_progress'),
+    path('admin/users/import/jobs/<int:pk>/errors/', views.UserImportJobErrorsView.as_view(), name='admin_user_import_job_errors'),
     path('admin/users/promote/', views.StudentPromotionView.as_view(), name='admin_user_promote'),
+    path('admin/users/promote/stats/', views.PromotionStatsView.as_view(), name='admin_user_promote_stats'),
+    path('admin/users/promote/<int:pk>/undo/', views.StudentPromotionUndoView.as_view(), name='admin_user_promote_undo'),
 ]
@@ -11,16 +11,20 @@ from django.contrib import messages
 from django.views import View
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, HttpResponseForbidden
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
 from django.db import models
 from datetime import timedelta
+from pathlib import Path
 import csv
-import io
 
-from .models import User, Role, Major, Level, Semester, VerificationCode, PasswordResetToken, UserActivity
+from .models import (
+    User, Role, Major, Level, Semester, VerificationCode, PasswordResetToken, UserActivity,
+    PromotionBatch, UserImportJob
+)
+from .services import ActivityLogger, UserImportService, UserImportJobService
 from .forms import (
     LoginForm, ActivationStep1Form, ActivationStep2Form, OTPVerificationForm,
     SetPasswordActivationForm, PasswordResetRequestForm, ProfileUpdateForm,
@@ -76,7 +80,7 @@ class LoginView(View):
             login(request, user)
             
             # تسجيل النشاط
-            UserActivity.objects.create(
+            ActivityLogger.log(
                 user=user,
                 activity_type='login',
                 ip_address=self.get_client_ip(request),
@@ -111,7 +115,7 @@ class LogoutView(View):
     def get(self, request):
         if request.user.is_authenticated:
             # تسجيل النشاط
-            UserActivity.objects.create(
+            ActivityLogger.log(
                 user=request.user,
                 activity_type='logout',
                 ip_address=request.META.get('REMOTE_ADDR'),
@@ -411,7 +415,7 @@ class ProfileUpdateView(LoginRequiredMixin, View):
         if form.is_valid():
             form.save()
             
-            UserActivity.objects.create(
+            ActivityLogger.log(
                 user=request.user,
                 activity_type='profile_update',
                 description='تم تحديث الملف الشخصي',
@@ -441,7 +445,7 @@ class ChangePasswordView(LoginRequiredMixin, View):
             # الحفاظ على الجلسة
             update_session_auth_hash(request, request.user)
             
-            UserActivity.objects.create(
+            ActivityLogger.log(
                 user=request.user,
                 activity_type='password_change',
                 description='تم تغيير كلمة المرور',
@@ -469,6 +473,10 @@ class AdminDashboardView(LoginRequiredMixin, AdminRequiredMixin, TemplateView):
         context['total_majors'] = Major.objects.filter(is_active=True).count()
         context['current_semester'] = Semester.objects.filter(is_current=True).first()
         context['recent_activities'] = UserActivity.objects.all()[:20]
+        context['activity_log_stats'] = ActivityLogger.get_stats()
+        
+        from courses.services import PromotionService
+        context['level_stats'] = PromotionService.get_promotion_stats()
         return context
 
 
@@ -538,100 +546,213 @@ class UserCreateView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
 
 
 class UserBulkImportView(LoginRequiredMixin, AdminRequiredMixin, View):
-    """استيراد المستخدمين بالجملة"""
-    template_name = 'admin_panel/users/bulk_import.html'
+    """استيراد المستخدمين بالجملة (الملفات الكبيرة تُعالج في الخلفية)"""
+    template_name = 'admin_panel/users/import.html'
+    
+    def get_context(self, form):
+        return {
+            'form': form,
+            'jobs': UserImportJob.objects.select_related('created_by')[:10],
+        }
     
     def get(self, request):
         form = UserBulkImportForm()
-        return render(request, self.template_name, {'form': form})
+        return render(request, self.template_name, self.get_context(form))
     
     def post(self, request):
         form = UserBulkImportForm(request.POST, request.FILES)
-        if form.is_valid():
-            csv_file = form.cleaned_data['csv_file']
-            decoded_file = csv_file.read().decode('utf-8')
-            reader = csv.DictReader(io.StringIO(decoded_file))
-            
-            created_count = 0
-            errors = []
-            
-            for row_num, row in enumerate(reader, start=2):
-                try:
-                    role = Role.objects.get(role_name=row.get('role', 'Student'))
-                    major = None
-                    level = None
-                    
-                    if row.get('major'):
-                        major = Major.objects.get(major_name=row['major'])
-                    if row.get('level'):
-                        level = Level.objects.get(level_name=row['level'])
-                    
-                    User.objects.create(
-                        academic_id=row['academic_id'],
-                        id_card_number=row['id_card_number'],
-                        full_name=row['full_name'],
-                        role=role,
-                        major=major,
-                        level=level
-                    )
-                    created_count += 1
-                except Exception as e:
-                    errors.append(f'خطأ في السطر {row_num}: {str(e)}')
-            
-            if created_count > 0:
-                messages.success(request, f'تم استيراد {created_count} مستخدم بنجاح.')
-            if errors:
-                for error in errors[:5]:  # عرض أول 5 أخطاء فقط
-                    messages.warning(request, error)
-            
-            return redirect('accounts:admin_user_list')
+        if not form.is_valid():
+            return render(request, self.template_name, self.get_context(form))
         
-        return render(request, self.template_name, {'form': form})
+        csv_file = form.cleaned_data['csv_file']
+        job = UserImportJobService.create(
+            csv_file, user=request.user, skip_errors=form.cleaned_data['skip_errors']
+        )
+        
+        AuditLog.log(
+            user=request.user,
+            action='import',
+            model_name='UserImportJob',
+            object_id=job.pk,
+            object_repr=job.original_name,
+            changes={
+                'status': job.status,
+                'created': job.created_count,
+                'failed': job.failed_count,
+            },
+            request=request
+        )
+        
+        if job.status == 'pending':
+            messages.info(request, 'تمت جدولة الاستيراد، يمكنك متابعة التقدم في هذه الصفحة.')
+        elif job.status == 'failed':
+            messages.error(request, job.last_error)
+        elif job.created_count:
+            messages.success(
+                request,
+                f'تم استيراد {job.created_count} مستخدم خلال {job.duration:.1f} ثانية '
+                f'({job.throughput:.0f} صف/ثانية).'
+            )
+        elif job.skipped_count:
+            messages.warning(request, 'لم يتم استيراد أي مستخدم بسبب وجود أخطاء في الملف.')
+        return redirect('accounts:admin_user_import_job', pk=job.pk)
+
+
+class UserImportJobView(LoginRequiredMixin, AdminRequiredMixin, View):
+    """متابعة مهمة استيراد"""
+    template_name = 'admin_panel/users/import_job.html'
+    
+    def get(self, request, pk):
+        job = get_object_or_404(UserImportJob, pk=pk)
+        return render(request, self.template_name, {'job': job})
+
+
+class UserImportJobProgressView(LoginRequiredMixin, AdminRequiredMixin, View):
+    """جزء التقدم (يُحدّث دورياً عبر HTMX حتى انتهاء المهمة)"""
+    template_name = 'admin_panel/users/partials/import_job_progress.html'
+    
+    def get(self, request, pk):
+        job = get_object_or_404(UserImportJob, pk=pk)
+        return render(request, self.template_name, {'job': job})
+
+
+class UserImportJobErrorsView(LoginRequiredMixin, AdminRequiredMixin, View):
+    """تحميل تقرير أخطاء الاستيراد"""
+    
+    def get(self, request, pk):
+        job = get_object_or_404(UserImportJob, pk=pk)
+        if not job.error_file:
+            raise Http404('لا يوجد تقرير أخطاء لهذه المهمة.')
+        return FileResponse(
+            job.error_file.open('rb'),
+            as_attachment=True,
+            filename=f'{Path(job.original_name).stem}_errors.csv',
+            content_type='text/csv; charset=utf-8',
+        )
+
+
+class UserImportTemplateView(LoginRequiredMixin, AdminRequiredMixin, View):
+    """تحميل قالب CSV للاستيراد"""
+    
+    def get(self, request):
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="users_import_template.csv"'
+        response.write('\ufeff')  # BOM ليعرض Excel الحروف العربية بشكل صحيح
+        writer = csv.writer(response)
+        writer.writerow(UserImportService.TEMPLATE_COLUMNS)
+        writer.writerow(['441001234', '1234567890', 'student', 'أحمد', 'محمد', 'علوم الحاسب', '1'])
+        return response
 
 
 class StudentPromotionView(LoginRequiredMixin, AdminRequiredMixin, View):
-    """ترقية الطلاب الجماعية"""
-    template_name = 'admin_panel/users/promotion.html'
+    """ترقية الطلاب الجماعية (مع تشغيل تجريبي وسجل دفعات قابل للتراجع)"""
+    template_name = 'admin_panel/users/promote.html'
+    
+    def get_context(self, form, **extra):
+        from courses.services import PromotionService
+        
+        context = {
+            'form': form,
+            'levels': PromotionService.get_promotion_stats(),
+            'batches': PromotionBatch.objects.select_related(
+                'from_level', 'major', 'performed_by'
+            )[:10],
+        }
+        context.update(extra)
+        return context
     
     def get(self, request):
         form = StudentPromotionForm()
-        return render(request, self.template_name, {'form': form})
+        return render(request, self.template_name, self.get_context(form))
     
     def post(self, request):
+        from courses.services import PromotionService
+        
         form = StudentPromotionForm(request.POST)
-        if form.is_valid():
-            from_level = form.cleaned_data['from_level']
-            to_level = form.cleaned_data['to_level']
-            major = form.cleaned_data.get('major')
-            
-            # بناء الاستعلام
-            students = User.objects.filter(
-                role__role_name='Student',
-                level=from_level,
-                account_status='active'
+        if not form.is_valid():
+            return render(request, self.template_name, self.get_context(form))
+        
+        from_level = None if form.cleaned_data['rollover'] else form.cleaned_data['from_level']
+        major = form.cleaned_data.get('major')
+        
+        # تشغيل تجريبي: عرض الأعداد دون تعديل
+        if 'dry_run' in request.POST:
+            rows, total = PromotionService.preview(from_level=from_level, major=major)
+            return render(request, self.template_name, self.get_context(
+                form, preview=rows, preview_total=total
+            ))
+        
+        batch, error = PromotionService.promote(from_level=from_level, major=major, user=request.user)
+        if batch is None:
+            messages.error(request, error)
+            return render(request, self.template_name, self.get_context(form))
+        
+        # تسجيل في سجل التدقيق
+        AuditLog.log(
+            user=request.user,
+            action='promote',
+            model_name='User',
+            object_id=batch.pk,
+            changes={
+                'mode': batch.mode,
+                'from_level': str(from_level) if from_level else 'all',
+                'major': str(major) if major else 'all',
+                'count': batch.student_count,
+                'duration': round(batch.duration, 2),
+            },
+            request=request
+        )
+        
+        if error:
+            messages.error(request, error)
+        else:
+            messages.success(
+                request,
+                f'تم ترقية {batch.student_count} طالب خلال {batch.duration:.1f} ثانية '
+                f'({batch.throughput:.0f} طالب/ثانية).'
             )
-            
-            if major:
-                students = students.filter(major=major)
-            
-            # تنفيذ الترقية
-            count = students.update(level=to_level)
-            
-            # تسجيل في سجل التدقيق
+        return redirect('accounts:admin_user_promote')
+
+
+class PromotionStatsView(LoginRequiredMixin, AdminRequiredMixin, View):
+    """إحصائيات الطلاب حسب المستوى (JSON)"""
+    
+    def get(self, request):
+        from courses.services import PromotionService
+        
+        return JsonResponse({'levels': [
+            {
+                'level_id': row['level'].pk,
+                'level_name': row['level'].level_name,
+                'level_number': row['level'].level_number,
+                'student_count': row['student_count'],
+                'next_level_id': row['next_level'].pk if row['next_level'] else None,
+                'next_level_name': row['next_level'].level_name if row['next_level'] else None,
+            }
+            for row in PromotionService.get_promotion_stats()
+        ]})
+
+
+class StudentPromotionUndoView(LoginRequiredMixin, AdminRequiredMixin, View):
+    """التراجع عن دفعة ترقية"""
+    
+    def post(self, request, pk):
+        from courses.services import PromotionService
+        
+        batch = get_object_or_404(PromotionBatch, pk=pk)
+        count, error = PromotionService.undo(batch)
+        
+        if error:
+            messages.error(request, error)
+        else:
             AuditLog.log(
                 user=request.user,
-                action='promote',
-                model_name='User',
-                changes={
-                    'from_level': str(from_level),
-                    'to_level': str(to_level),
-                    'major': str(major) if major else 'all',
-                    'count': count
-                },
+                action='update',
+                model_name='PromotionBatch',
+                object_id=batch.pk,
+                changes={'undo': True, 'count': count},
                 request=request
             )
-            
-            messages.success(request, f'تم ترقية {count} طالب من {from_level} إلى {to_level}.')
-            return redirect('accounts:admin_user_list')
+            messages.success(request, f'تم إعادة {count} طالب إلى مستوياتهم السابقة.')
         
-        return render(request, self.template_name, {'form': form})
+        return redirect('accounts:admin_user_promote')
@@ -162,6 +162,78 @@ ALLOWED_FILE_EXTENSIONS = ['.pdf', '.doc', '.docx', '.ppt', '.pptx', '.txt', '.m
 ALLOWED_VIDEO_EXTENSIONS = ['.mp4', '.webm', '.avi', '.mov']
 ALLOWED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
 
+# Resumable Chunked Uploads (partial files live outside MEDIA_ROOT)
+CHUNKED_UPLOAD_DIR = os.getenv('CHUNKED_UPLOAD_DIR', str(BASE_DIR / 'uploads_partial'))
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.getenv('CHUNKED_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))  # bytes
+CHUNKED_UPLOAD_EXPIRY_HOURS = int(os.getenv('CHUNKED_UPLOAD_EXPIRY_HOURS', 24))
+
+# File Derivatives (previews...) generated by run_derivative_worker
+PREVIEW_MAX_SIZE = int(os.getenv('PREVIEW_MAX_SIZE', 320))  # pixels
+DERIVATIVE_JOB_MAX_ATTEMPTS = int(os.getenv('DERIVATIVE_JOB_MAX_ATTEMPTS', 3))
+DERIVATIVE_JOB_STALE_MINUTES = int(os.getenv('DERIVATIVE_JOB_STALE_MINUTES', 30))  # still processing -> worker presumed dead
+DERIVATIVE_WORKER_INTERVAL = int(os.getenv('DERIVATIVE_WORKER_INTERVAL', 10))  # seconds
+WEB_PDF_DERIVATIVES = os.getenv('WEB_PDF_DERIVATIVES', 'True').lower() == 'true'  # linearized PDFs (needs pikepdf)
+
+# File Delivery: 'django' (FileResponse / sendfile), 'nginx' (X-Accel-Redirect), 'apache' (X-Sendfile)
+FILE_DELIVERY_BACKEND = os.getenv('FILE_DELIVERY_BACKEND', 'django')
+FILE_DELIVERY_INTERNAL_PREFIX = os.getenv('FILE_DELIVERY_INTERNAL_PREFIX', '/protected-media/')
+
+# Download/View Counter Buffering
+FILE_COUNTER_FLUSH_INTERVAL = int(os.getenv('FILE_COUNTER_FLUSH_INTERVAL', 30))  # seconds
+FILE_COUNTER_FLUSH_THRESHOLD = int(os.getenv('FILE_COUNTER_FLUSH_THRESHOLD', 500))  # buffered hits
+
+# User Activity Logging Pipeline
+ACTIVITY_LOG_BATCH_SIZE = int(os.getenv('ACTIVITY_LOG_BATCH_SIZE', 200))
+ACTIVITY_LOG_FLUSH_INTERVAL = int(os.getenv('ACTIVITY_LOG_FLUSH_INTERVAL', 10))  # seconds
+ACTIVITY_LOG_MAX_BUFFER = int(os.getenv('ACTIVITY_LOG_MAX_BUFFER', 5000))
+ACTIVITY_LOG_OVERFLOW_POLICY = os.getenv('ACTIVITY_LOG_OVERFLOW_POLICY', 'drop')  # drop | block
+
+# Notification Retention
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 180))
+NOTIFICATION_PURGE_BATCH_SIZE = int(os.getenv('NOTIFICATION_PURGE_BATCH_SIZE', 1000))
+
+# File Upload Notification Coalescing (seconds)
+NOTIFICATION_COALESCE_WINDOW = int(os.getenv('NOTIFICATION_COALESCE_WINDOW', 120))
+NOTIFICATION_COALESCE_MAX_DELAY = int(os.getenv('NOTIFICATION_COALESCE_MAX_DELAY', 900))
+NOTIFICATION_JOB_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_JOB_MAX_ATTEMPTS', 5))
+NOTIFICATION_WORKER_INTERVAL = int(os.getenv('NOTIFICATION_WORKER_INTERVAL', 10))
+
+# Notification Email Channel (high/urgent priority)
+NOTIFICATION_EMAIL_BATCH_SIZE = int(os.getenv('NOTIFICATION_EMAIL_BATCH_SIZE', 50))
+NOTIFICATION_EMAIL_RATE_LIMIT = int(os.getenv('NOTIFICATION_EMAIL_RATE_LIMIT', 10))  # messages/second, 0 = unlimited
+NOTIFICATION_EMAIL_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_EMAIL_MAX_ATTEMPTS', 5))
+NOTIFICATION_EMAIL_CLAIM_MINUTES = int(os.getenv('NOTIFICATION_EMAIL_CLAIM_MINUTES', 10))  # claimed batch not marked -> worker presumed dead
+
+# Cache (set CACHE_BACKEND=django.core.cache.backends.redis.RedisCache to share it between workers)
+# Invalidation relies on version keys shared by all processes: `check --deploy` warns about
+# LocMemCache (courses.W001) unless CACHE_ALLOW_PROCESS_LOCAL is set (single process only)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 's-acm'),
+    }
+}
+CACHE_ALLOW_PROCESS_LOCAL = os.getenv('CACHE_ALLOW_PROCESS_LOCAL', 'False').lower() == 'true'
+COURSE_FILES_CACHE_TIMEOUT = int(os.getenv('COURSE_FILES_CACHE_TIMEOUT', 300))  # seconds (also max staleness of students' download counts)
+INSTRUCTOR_ANALYTICS_CACHE_TIMEOUT = int(os.getenv('INSTRUCTOR_ANALYTICS_CACHE_TIMEOUT', 300))  # seconds
+INSTRUCTOR_ANALYTICS_TREND_DAYS = int(os.getenv('INSTRUCTOR_ANALYTICS_TREND_DAYS', 14))
+STUDENT_CATALOG_CACHE_TIMEOUT = int(os.getenv('STUDENT_CATALOG_CACHE_TIMEOUT', 3600))  # seconds
+
+# Course Audience
+COURSE_AUDIENCE_BATCH_SIZE = int(os.getenv('COURSE_AUDIENCE_BATCH_SIZE', 1000))
+
+# Student Promotion
+PROMOTION_CHUNK_SIZE = int(os.getenv('PROMOTION_CHUNK_SIZE', 500))
+PROMOTION_STATS_CACHE_TIMEOUT = int(os.getenv('PROMOTION_STATS_CACHE_TIMEOUT', 60))  # seconds
+
+# Bulk User Import
+USER_IMPORT_BATCH_SIZE = int(os.getenv('USER_IMPORT_BATCH_SIZE', 1000))
+USER_IMPORT_DIR = os.getenv('USER_IMPORT_DIR', str(BASE_DIR / 'imports'))  # outside MEDIA_ROOT (personal data)
+USER_IMPORT_INLINE_MAX_SIZE = int(os.getenv('USER_IMPORT_INLINE_MAX_SIZE', 100 * 1024))  # bytes; larger files go to run_import_worker
+USER_IMPORT_WORKER_INTERVAL = int(os.getenv('USER_IMPORT_WORKER_INTERVAL', 5))  # seconds
+USER_IMPORT_JOB_STALE_MINUTES = int(os.getenv('USER_IMPORT_JOB_STALE_MINUTES', 10))  # no progress -> worker presumed dead
+USER_IMPORT_JOB_MAX_ATTEMPTS = int(os.getenv('USER_IMPORT_JOB_MAX_ATTEMPTS', 3))
+
 # Session Settings
 SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
@@ -23,11 +23,8 @@ def user_notifications(request):
     إضافة عدد الإشعارات غير المقروءة
     """
     if request.user.is_authenticated:
-        from notifications.models import Notification
-        unread_count = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).count()
+        from notifications.models import NotificationManager
+        unread_count = NotificationManager.get_unread_count(request.user)
         return {
             'unread_notifications_count': unread_count
         }
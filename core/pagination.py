@@ -0,0 +1,120 @@
+"""
+ترقيم الصفحات بالمؤشر (Keyset / Cursor Pagination)
+S-ACM - Smart Academic Content Management System
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class CursorPage:
+    """
+    صفحة ناتجة عن الترقيم بالمؤشر
+    تحاكي واجهة Page في Django بالقدر الذي تحتاجه القوالب
+    """
+
+    def __init__(self, object_list, next_cursor=None, cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    ترقيم تنازلي على المفتاح المركب (created_at, id)
+
+    - لا يستخدم OFFSET: كل صفحة تبدأ من آخر صف في الصفحة السابقة
+    - لا يحسب COUNT(*): يجلب صفاً إضافياً لمعرفة وجود صفحة تالية
+    """
+
+    def __init__(self, queryset, per_page, time_field='created_at'):
+        self.time_field = time_field
+        self.queryset = queryset.order_by(f'-{time_field}', '-id')
+        self.per_page = per_page
+
+    @staticmethod
+    def encode_cursor(timestamp, pk):
+        """ترميز المؤشر كنص آمن للاستخدام في الروابط"""
+        raw = f'{timestamp.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """فك ترميز المؤشر، يعيد None إذا كان غير صالح"""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            timestamp, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(timestamp), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+    def get_page(self, cursor=None):
+        """الحصول على الصفحة التي تلي المؤشر المحدد"""
+        queryset = self.queryset
+        position = self.decode_cursor(cursor)
+
+        if position:
+            timestamp, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{self.time_field}__lt': timestamp}) |
+                Q(**{self.time_field: timestamp, 'id__lt': pk})
+            )
+        else:
+            cursor = None
+
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            last = rows[-1]
+            next_cursor = self.encode_cursor(getattr(last, self.time_field), last.pk)
+
+        return CursorPage(rows, next_cursor=next_cursor, cursor=cursor)
+
+
+class CursorPaginationMixin:
+    """
+    Mixin لـ ListView يستبدل ترقيم OFFSET بترقيم المؤشر
+
+    يدعم أجزاء HTMX للتمرير اللانهائي عبر fragment_template_name
+    """
+    cursor_param = 'cursor'
+    cursor_time_field = 'created_at'
+    fragment_template_name = None
+
+    def is_fragment_request(self):
+        return bool(self.fragment_template_name) and self.request.headers.get('HX-Request') == 'true'
+
+    def get_template_names(self):
+        if self.is_fragment_request():
+            return [self.fragment_template_name]
+        return super().get_template_names()
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, time_field=self.cursor_time_field)
+        page = paginator.get_page(self.request.GET.get(self.cursor_param))
+        return paginator, page, page.object_list, page.has_other_pages()
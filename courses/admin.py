@@ -4,7 +4,7 @@
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Course, CourseMajor, InstructorCourse, LectureFile
+from .models import Course, CourseMajor, InstructorCourse, LectureFile, FileDerivativeJob
 
 
 class CourseMajorInline(admin.TabularInline):
@@ -119,3 +119,21 @@ class LectureFileAdmin(admin.ModelAdmin):
         queryset.update(is_deleted=False, deleted_at=None)
         self.message_user(request, f"تم استعادة {queryset.count()} ملف/ملفات")
     restore.short_description = "استعادة الملفات المحذوفة"
+
+
+@admin.register(FileDerivativeJob)
+class FileDerivativeJobAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'kind', 'status', 'attempts', 'created_at', 'processed_at']
+    list_filter = ['status', 'kind', 'created_at']
+    search_fields = ['content_hash', 'source_name']
+    readonly_fields = ['content_hash', 'kind', 'source_name', 'output_name', 'attempts', 'last_error', 'created_at', 'claimed_at', 'processed_at']
+    
+    actions = ['retry_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        count = queryset.exclude(status='done').update(status='pending', attempts=0, last_error=None)
+        self.message_user(request, f"تمت إعادة {count} مهمة/مهام إلى الطابور")
+    retry_jobs.short_description = "إعادة المهام غير المكتملة إلى الطابور"
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,38 @@
+"""
+فحوص النظام (System Checks) الخاصة بالمقررات
+S-ACM - Smart Academic Content Management System
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    نسخ الذاكرة المؤقتة (ملفات المقرر، كتالوج الطلاب، إحصائيات المدرس...) تُرفع
+    من أي عملية: عمال gunicorn الآخرون و run_derivative_worker و run_notification_worker.
+    مع LocMemCache لكل عملية نسختها الخاصة فتبقى الأجزاء القديمة حتى انتهاء صلاحيتها.
+    فحص نشر فقط (check --deploy) كي لا يمنع التشغيل المحلي أو الاختبارات.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHE_BACKENDS:
+        return []
+    if getattr(settings, 'CACHE_ALLOW_PROCESS_LOCAL', False):
+        return []
+    return [Warning(
+        'The default cache is process-local (LocMemCache).',
+        hint=(
+            'Cache invalidation (course files, student catalog, dashboard fragments, '
+            'instructor analytics) bumps version keys that must be visible to every web '
+            'worker and background worker. Set CACHE_BACKEND to a shared backend such as '
+            'django.core.cache.backends.redis.RedisCache, or set '
+            'CACHE_ALLOW_PROCESS_LOCAL=True for a single-process deployment.'
+        ),
+        id='courses.W001',
+    )]
@@ -9,10 +9,29 @@ from django.core.exceptions import ValidationError
 from django.conf import settings
 from pathlib import Path
 
-from .models import Course, CourseMajor, InstructorCourse, LectureFile
+from .models import Course, CourseMajor, InstructorCourse, LectureFile, UploadSession
 from accounts.models import Major, Level, Semester
 
 
+def get_allowed_upload_extensions():
+    """قائمة امتدادات الملفات المسموح برفعها"""
+    return (
+        getattr(settings, 'ALLOWED_FILE_EXTENSIONS', []) +
+        getattr(settings, 'ALLOWED_VIDEO_EXTENSIONS', []) +
+        getattr(settings, 'ALLOWED_IMAGE_EXTENSIONS', [])
+    )
+
+
+def get_instructor_courses(user):
+    """المقررات التي يمكن للمستخدم رفع ملفات إليها"""
+    if user.is_admin():
+        return Course.objects.filter(is_active=True)
+    return Course.objects.filter(
+        instructor_courses__instructor=user,
+        is_active=True
+    )
+
+
 class CourseForm(forms.ModelForm):
     """نموذج إنشاء/تحديث المقرر"""
     
@@ -109,17 +128,13 @@ class LectureFileForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
+        # خطأ سجله LectureFileUploadHandler أثناء الاستقبال
+        self.upload_error = kwargs.pop('upload_error', None)
         super().__init__(*args, **kwargs)
         
         # تحديد المقررات المتاحة للمدرس
         if self.user:
-            if self.user.is_admin():
-                self.fields['course'].queryset = Course.objects.filter(is_active=True)
-            else:
-                self.fields['course'].queryset = Course.objects.filter(
-                    instructor_courses__instructor=self.user,
-                    is_active=True
-                )
+            self.fields['course'].queryset = get_instructor_courses(self.user)
     
     def clean(self):
         cleaned_data = super().clean()
@@ -128,7 +143,7 @@ class LectureFileForm(forms.ModelForm):
         external_link = cleaned_data.get('external_link')
         
         # التحقق من وجود محتوى
-        if content_type == 'local_file' and not local_file:
+        if content_type == 'local_file' and not local_file and not self.upload_error:
             if not self.instance.pk or not self.instance.local_file:
                 raise ValidationError('يجب رفع ملف عند اختيار "ملف محلي".')
         
@@ -140,6 +155,9 @@ class LectureFileForm(forms.ModelForm):
     def clean_local_file(self):
         local_file = self.cleaned_data.get('local_file')
         
+        if self.upload_error:
+            raise ValidationError(self.upload_error)
+        
         if local_file:
             # التحقق من حجم الملف
             max_size = getattr(settings, 'MAX_UPLOAD_SIZE', 50 * 1024 * 1024)
@@ -148,11 +166,7 @@ class LectureFileForm(forms.ModelForm):
             
             # التحقق من امتداد الملف
             ext = Path(local_file.name).suffix.lower()
-            allowed_extensions = (
-                getattr(settings, 'ALLOWED_FILE_EXTENSIONS', []) +
-                getattr(settings, 'ALLOWED_VIDEO_EXTENSIONS', []) +
-                getattr(settings, 'ALLOWED_IMAGE_EXTENSIONS', [])
-            )
+            allowed_extensions = get_allowed_upload_extensions()
             
             if allowed_extensions and ext not in allowed_extensions:
                 raise ValidationError(f'نوع الملف غير مسموح. الأنواع المسموحة: {", ".join(allowed_extensions)}')
@@ -160,6 +174,50 @@ class LectureFileForm(forms.ModelForm):
         return local_file
 
 
+class UploadSessionForm(forms.ModelForm):
+    """نموذج بدء جلسة رفع مجزأ (البيانات الوصفية للملف قبل إرسال محتواه)"""
+    
+    class Meta:
+        model = UploadSession
+        fields = ['course', 'title', 'description', 'file_type', 'is_visible', 'filename', 'total_size', 'checksum']
+    
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        
+        if self.user:
+            self.fields['course'].queryset = get_instructor_courses(self.user)
+    
+    def clean_filename(self):
+        filename = Path(self.cleaned_data['filename']).name
+        
+        ext = Path(filename).suffix.lower()
+        allowed_extensions = get_allowed_upload_extensions()
+        if allowed_extensions and ext not in allowed_extensions:
+            raise ValidationError(f'نوع الملف غير مسموح. الأنواع المسموحة: {", ".join(allowed_extensions)}')
+        
+        return filename
+    
+    def clean_total_size(self):
+        total_size = self.cleaned_data['total_size']
+        
+        max_size = getattr(settings, 'MAX_UPLOAD_SIZE', 50 * 1024 * 1024)
+        if total_size <= 0:
+            raise ValidationError('الملف فارغ.')
+        if total_size > max_size:
+            raise ValidationError(f'حجم الملف يتجاوز الحد المسموح ({max_size // (1024*1024)} MB).')
+        
+        return total_size
+    
+    def clean_checksum(self):
+        checksum = (self.cleaned_data.get('checksum') or '').lower()
+        
+        if checksum and (len(checksum) != 64 or any(c not in '0123456789abcdef' for c in checksum)):
+            raise ValidationError('بصمة SHA-256 غير صالحة.')
+        
+        return checksum
+
+
 class CourseSearchForm(forms.Form):
     """نموذج البحث في المقررات"""
     
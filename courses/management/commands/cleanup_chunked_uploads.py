@@ -0,0 +1,33 @@
+"""
+Management Command لتنظيف جلسات الرفع المجزأ المهجورة
+S-ACM - Smart Academic Content Management System
+"""
+
+from django.core.management.base import BaseCommand
+
+from courses.services import ChunkedUploadService, FileService
+
+
+class Command(BaseCommand):
+    help = 'حذف جلسات الرفع المجزأ المهجورة وملفاتها الجزئية'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='عرض ما سيتم حذفه دون تنفيذ'
+        )
+
+    def handle(self, *args, **options):
+        expiry = ChunkedUploadService.get_expiry()
+        self.stdout.write(f'جاري تنظيف جلسات الرفع غير النشطة منذ {expiry}...\n')
+
+        stats = ChunkedUploadService.cleanup_abandoned(dry_run=options['dry_run'])
+
+        self.stdout.write(f'  - جلسات: {stats["sessions"]}')
+        self.stdout.write(
+            f'  - ملفات جزئية: {stats["files"]} ({FileService.get_file_size_display(stats["bytes"])})'
+        )
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('\n✓ تم تنظيف جلسات الرفع بنجاح!'))
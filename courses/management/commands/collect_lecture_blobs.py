@@ -0,0 +1,51 @@
+"""
+Management Command لصيانة التخزين المعنون بالمحتوى لملفات المحاضرات
+S-ACM - Smart Academic Content Management System
+"""
+
+from django.core.management.base import BaseCommand
+
+from courses.services import LectureBlobService, FileService
+
+
+class Command(BaseCommand):
+    help = 'نقل الملفات القديمة إلى التخزين المعنون بالمحتوى وحذف النسخ غير المرجعية'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--adopt',
+            action='store_true',
+            help='حساب البصمة للملفات المرفوعة سابقاً ونقلها إلى cas/'
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=None,
+            help='عدم حذف النسخ الأحدث من هذا العدد من الثواني (الافتراضي: ساعة)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='عرض النتائج دون تعديل'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if options['adopt']:
+            self.stdout.write('جاري نقل الملفات القديمة...\n')
+            stats = LectureBlobService.adopt_legacy_files(dry_run=dry_run)
+            self.stdout.write(f'  - ملفات منقولة: {stats["adopted"]}')
+            self.stdout.write(f'  - منها مكررة (دون نسخة جديدة): {stats["deduplicated"]}')
+            self.stdout.write(f'  - ملفات مفقودة من القرص: {stats["missing"]}')
+
+        self.stdout.write('جاري البحث عن النسخ غير المرجعية...\n')
+        removed, freed = LectureBlobService.collect_orphans(
+            dry_run=dry_run,
+            grace_seconds=options['grace']
+        )
+        label = 'نسخ مستهدفة' if dry_run else 'نسخ محذوفة'
+        self.stdout.write(f'  - {label}: {removed} ({FileService.get_file_size_display(freed)})')
+
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS('\n✓ تمت صيانة التخزين بنجاح!'))
@@ -0,0 +1,21 @@
+"""
+Management Command لإعادة بناء جدول جمهور المقررات
+S-ACM - Smart Academic Content Management System
+"""
+
+from django.core.management.base import BaseCommand
+
+from courses.services import CourseAudienceService
+
+
+class Command(BaseCommand):
+    help = 'إعادة حساب جدول course_audience (بعد تعديلات جماعية تمت خارج التطبيق)'
+
+    def handle(self, *args, **options):
+        self.stdout.write('جاري إعادة حساب جمهور المقررات...\n')
+
+        added, removed = CourseAudienceService.rebuild()
+
+        self.stdout.write(f'  - صفوف مضافة: {added}')
+        self.stdout.write(f'  - صفوف محذوفة: {removed}')
+        self.stdout.write(self.style.SUCCESS('\n✓ تم تحديث جمهور المقررات بنجاح!'))
@@ -0,0 +1,69 @@
+"""
+Management Command لتوليد الملفات المشتقة (صور المعاينة...)
+S-ACM - Smart Academic Content Management System
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from courses.services import DerivativeService
+
+
+class Command(BaseCommand):
+    help = 'معالجة طابور الملفات المشتقة (صور المعاينة...) للملفات المرفوعة'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='معالجة المهام المعلقة مرة واحدة ثم الخروج'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'DERIVATIVE_WORKER_INTERVAL', 10),
+            help='الفاصل الزمني بين دورات المعالجة بالثواني'
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='جدولة المشتقات لجميع الملفات المرفوعة سابقاً قبل البدء'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='عدد المهام في كل دورة'
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            count = DerivativeService.enqueue_existing()
+            self.stdout.write(f'تمت جدولة المشتقات لـ {count} ملف.')
+        
+        if options['once']:
+            self.run_cycle(options['batch_size'])
+            return
+
+        self.stdout.write(f'بدء معالج الملفات المشتقة (كل {options["interval"]} ثانية)...')
+        try:
+            while True:
+                # متابعة المعالجة دون انتظار ما دامت هناك مهام متراكمة
+                if not self.run_cycle(options['batch_size']):
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\nتم إيقاف معالج الملفات المشتقة.')
+
+    def run_cycle(self, batch_size):
+        stats = DerivativeService.process_pending(limit=batch_size)
+        processed = sum(stats.values())
+        if processed:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ تمت معالجة {processed} مهمة '
+                f'({stats.get("done", 0)} ناجحة، {stats.get("skipped", 0)} غير مدعومة، '
+                f'{stats.get("failed", 0)} فاشلة)'
+            ))
+        # المهام المعادة إلى الانتظار بعد خطأ تنتظر الدورة التالية
+        return processed - stats.get('pending', 0)
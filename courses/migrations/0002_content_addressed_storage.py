@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:36
+
+import courses.models
+import courses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecturefile',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True, verbose_name='بصمة المحتوى (SHA-256)'),
+        ),
+        migrations.AddField(
+            model_name='lecturefile',
+            name='original_filename',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='اسم الملف الأصلي'),
+        ),
+        migrations.AlterField(
+            model_name='lecturefile',
+            name='local_file',
+            field=models.FileField(blank=True, null=True, storage=courses.storage.ContentAddressedStorage(), upload_to=courses.models.lecture_file_path, verbose_name='الملف المحلي'),
+        ),
+    ]
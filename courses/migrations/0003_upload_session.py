@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:38
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_content_addressed_storage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255, verbose_name='عنوان الملف')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='وصف الملف')),
+                ('file_type', models.CharField(choices=[('Lecture', 'محاضرة'), ('Summary', 'ملخص'), ('Exam', 'اختبار'), ('Assignment', 'واجب'), ('Reference', 'مرجع'), ('Other', 'أخرى')], default='Lecture', max_length=50, verbose_name='تصنيف الملف')),
+                ('is_visible', models.BooleanField(default=True, verbose_name='مرئي للطلاب')),
+                ('filename', models.CharField(max_length=255, verbose_name='اسم الملف')),
+                ('total_size', models.BigIntegerField(verbose_name='الحجم الكلي (بايت)')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='بصمة SHA-256 المتوقعة')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='البايتات المستلمة')),
+                ('status', models.CharField(choices=[('uploading', 'قيد الرفع'), ('completed', 'مكتمل'), ('aborted', 'ملغى')], default='uploading', max_length=20, verbose_name='الحالة')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر نشاط')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='courses.course', verbose_name='المقرر')),
+                ('lecture_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.lecturefile', verbose_name='الملف الناتج')),
+                ('uploader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='رافع الملف')),
+            ],
+            options={
+                'verbose_name': 'جلسة رفع',
+                'verbose_name_plural': 'جلسات الرفع',
+                'db_table': 'upload_sessions',
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='upload_sess_status_7188ee_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileDerivativeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='بصمة المحتوى')),
+                ('kind', models.CharField(choices=[('preview', 'صورة معاينة')], max_length=20, verbose_name='نوع المشتق')),
+                ('source_name', models.CharField(max_length=255, verbose_name='مسار الملف الأصلي')),
+                ('output_name', models.CharField(blank=True, max_length=255, verbose_name='مسار الملف المشتق')),
+                ('status', models.CharField(choices=[('pending', 'قيد الانتظار'), ('processing', 'قيد المعالجة'), ('done', 'تمت المعالجة'), ('skipped', 'غير مدعوم'), ('failed', 'فشلت')], default='pending', max_length=10, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='آخر خطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإضافة')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ المعالجة')),
+            ],
+            options={
+                'verbose_name': 'مهمة ملف مشتق',
+                'verbose_name_plural': 'مهام الملفات المشتقة',
+                'db_table': 'file_derivative_jobs',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='file_deriva_status_238c81_idx')],
+                'unique_together': {('content_hash', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_file_derivative_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='filederivativejob',
+            name='kind',
+            field=models.CharField(choices=[('preview', 'صورة معاينة'), ('web_pdf', 'PDF محسن للويب')], max_length=20, verbose_name='نوع المشتق'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_course_audience(apps, schema_editor):
+    """بناء جمهور المقررات الحالي: طلاب نشطون بتخصص المقرر ومستواه"""
+    User = apps.get_model('accounts', 'User')
+    CourseAudience = apps.get_model('courses', 'CourseAudience')
+    pairs = User.objects.filter(
+        role__role_name='Student',
+        account_status='active',
+        major__major_courses__course__level_id=models.F('level_id'),
+    ).values_list('major__major_courses__course_id', 'pk').distinct()
+    CourseAudience.objects.bulk_create(
+        (CourseAudience(course_id=course_id, student_id=student_id) for course_id, student_id in pairs),
+        batch_size=1000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_file_derivative_web_pdf'),
+        ('accounts', '0002_activity_time_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseAudience',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audience', to='courses.course', verbose_name='المقرر')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audience_courses', to=settings.AUTH_USER_MODEL, verbose_name='الطالب')),
+            ],
+            options={
+                'verbose_name': 'طالب في جمهور مقرر',
+                'verbose_name_plural': 'جمهور المقررات',
+                'db_table': 'course_audience',
+                'unique_together': {('course', 'student')},
+            },
+        ),
+        migrations.RunPython(populate_course_audience, migrations.RunPython.noop),
+    ]
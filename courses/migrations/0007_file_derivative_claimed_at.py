@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_course_audience'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filederivativejob',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='تاريخ بدء المعالجة'),
+        ),
+    ]
@@ -8,6 +8,9 @@ from django.conf import settings
 from django.core.validators import FileExtensionValidator
 from pathlib import Path
 import os
+import uuid
+
+from .storage import lecture_file_storage
 
 
 class Course(models.Model):
@@ -71,6 +74,25 @@ class Course(models.Model):
     def __str__(self):
         return f"{self.course_code} - {self.course_name}"
     
+    def save(self, *args, **kwargs):
+        level_changed = False
+        if self.pk:
+            old_level_id = Course.objects.filter(pk=self.pk).values_list('level_id', flat=True).first()
+            level_changed = old_level_id is not None and old_level_id != self.level_id
+        super().save(*args, **kwargs)
+        
+        from .services import CourseAudienceService, StudentCatalogCache
+        if level_changed:
+            CourseAudienceService.refresh_courses([self.pk])
+        StudentCatalogCache.bump()
+    
+    def delete(self, *args, **kwargs):
+        from .services import StudentCatalogCache
+        
+        result = super().delete(*args, **kwargs)
+        StudentCatalogCache.bump()
+        return result
+    
     def get_majors(self):
         """الحصول على التخصصات المرتبطة بالمقرر"""
         return self.course_majors.all()
@@ -114,6 +136,22 @@ class CourseMajor(models.Model):
     
     def __str__(self):
         return f"{self.course.course_code} - {self.major.major_name}"
+    
+    def save(self, *args, **kwargs):
+        from .services import CourseAudienceService, StudentCatalogCache
+        
+        super().save(*args, **kwargs)
+        CourseAudienceService.refresh_courses([self.course_id])
+        StudentCatalogCache.bump()
+    
+    def delete(self, *args, **kwargs):
+        from .services import CourseAudienceService, StudentCatalogCache
+        
+        course_id = self.course_id
+        result = super().delete(*args, **kwargs)
+        CourseAudienceService.refresh_courses([course_id])
+        StudentCatalogCache.bump()
+        return result
 
 
 class InstructorCourse(models.Model):
@@ -152,10 +190,45 @@ class InstructorCourse(models.Model):
         return f"{self.instructor.full_name} - {self.course.course_code}"
 
 
+class CourseAudience(models.Model):
+    """
+    جدول جمهور المقرر (Course_Audience)
+    الطلاب النشطون الذين يدرسون المقرر (التخصص ضمن تخصصات المقرر والمستوى نفسه)
+    
+    جدول محسوب مسبقاً يُحدّث عبر CourseAudienceService عند الترقية وتغيير
+    التخصص أو المستوى أو حالة الحساب وتعديل تخصصات المقرر، فيصبح عدّ الطلاب
+    وإرسال الإشعارات بحثاً مفهرساً بدل ربط المستخدمين بالتخصصات في كل مرة.
+    """
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='audience',
+        verbose_name='المقرر'
+    )
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='audience_courses',
+        verbose_name='الطالب'
+    )
+    
+    class Meta:
+        db_table = 'course_audience'
+        unique_together = ('course', 'student')
+        verbose_name = 'طالب في جمهور مقرر'
+        verbose_name_plural = 'جمهور المقررات'
+    
+    def __str__(self):
+        return f"{self.course_id} - {self.student_id}"
+
+
 def lecture_file_path(instance, filename):
     """
     تحديد مسار حفظ الملفات بشكل منظم
     media/uploads/courses/{course_code}/{file_type}/{filename}
+    
+    ContentAddressedStorage يستبدل هذا الاسم بمسار مشتق من البصمة،
+    ويبقى الاسم الأصلي في LectureFile.original_filename
     """
     # استخدام pathlib للتوافق مع جميع أنظمة التشغيل
     course_code = instance.course.course_code
@@ -210,13 +283,27 @@ class LectureFile(models.Model):
         default='local_file',
         verbose_name='نوع المحتوى'
     )
-    # للملفات المحلية
+    # للملفات المحلية (تخزين معنون بالمحتوى - انظر courses/storage.py)
     local_file = models.FileField(
         upload_to=lecture_file_path,
+        storage=lecture_file_storage,
         blank=True,
         null=True,
         verbose_name='الملف المحلي'
     )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+        verbose_name='بصمة المحتوى (SHA-256)'
+    )
+    original_filename = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        verbose_name='اسم الملف الأصلي'
+    )
     # للروابط الخارجية (YouTube, Google Drive, etc.)
     external_link = models.URLField(
         max_length=512,
@@ -294,9 +381,22 @@ class LectureFile(models.Model):
         return f"{self.title} - {self.course.course_code}"
     
     def save(self, *args, **kwargs):
+        replaced_name = None
+        new_content = False
+        
         # تحديث معلومات الملف عند الحفظ
         if self.local_file:
             self.content_type = 'local_file'
+            if not self.local_file._committed:
+                # ملف جديد: حفظه الآن ليصبح اسمه المعنون بالمحتوى معروفاً
+                if self.pk:
+                    replaced_name = LectureFile.objects.filter(
+                        pk=self.pk
+                    ).values_list('local_file', flat=True).first()
+                self.original_filename = Path(self.local_file.name).name
+                new_content = True
+                self.local_file.save(self.local_file.name, self.local_file.file, save=False)
+            self.content_hash = self.local_file.storage.hash_from_name(self.local_file.name)
             if hasattr(self.local_file, 'size'):
                 self.file_size = self.local_file.size
             if hasattr(self.local_file, 'name'):
@@ -304,6 +404,43 @@ class LectureFile(models.Model):
         elif self.external_link:
             self.content_type = 'external_link'
         super().save(*args, **kwargs)
+        
+        # تحرير الملف السابق إن كان قديماً (خارج cas/) ولم يعد له مراجع
+        # النسخ المعنونة غير المرجعية يحذفها collect_lecture_blobs بعد مهلة السماح
+        if replaced_name and replaced_name != self.local_file.name:
+            self.local_file.storage.release(replaced_name)
+        
+        # جدولة توليد المشتقات (المعاينة...) للمحتوى الجديد
+        from .services import CourseFileCache, DerivativeService, InstructorAnalyticsService
+        if new_content and self.content_hash:
+            DerivativeService.enqueue(self)
+        
+        CourseFileCache.bump(self.course_id)
+        InstructorAnalyticsService.bump(course_ids=[self.course_id], uploader_ids=[self.uploader_id])
+    
+    def delete(self, *args, **kwargs):
+        from .services import CourseFileCache, InstructorAnalyticsService
+        
+        name = self.local_file.name if self.local_file else None
+        result = super().delete(*args, **kwargs)
+        CourseFileCache.bump(self.course_id)
+        InstructorAnalyticsService.bump(course_ids=[self.course_id], uploader_ids=[self.uploader_id])
+        # الملفات القديمة تُحذف هنا عند انعدام المراجع، والنسخ المعنونة
+        # (وكذلك الحذف الجماعي عبر QuerySet) يحذفها لاحقاً collect_lecture_blobs
+        if name:
+            self.local_file.storage.release(name)
+        return result
+    
+    def get_reference_count(self):
+        """عدد ملفات المحاضرات التي تشترك في المحتوى نفسه"""
+        if not self.content_hash:
+            return 1 if self.local_file else 0
+        return LectureFile.objects.filter(content_hash=self.content_hash).count()
+    
+    def get_preview_url(self):
+        """رابط صورة المعاينة إن كانت قد وُلدت"""
+        from .services import DerivativeService
+        return DerivativeService.get_url(self.content_hash, 'preview')
     
     def get_content_url(self):
         """الحصول على رابط المحتوى (محلي أو خارجي)"""
@@ -314,14 +451,14 @@ class LectureFile(models.Model):
         return None
     
     def increment_download(self):
-        """زيادة عداد التحميلات"""
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+        """زيادة عداد التحميلات (تُكتب لاحقاً عبر FileCounterBuffer)"""
+        from .services import FileCounterBuffer
+        FileCounterBuffer.increment(self.pk, 'download_count')
     
     def increment_view(self):
-        """زيادة عداد المشاهدات"""
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+        """زيادة عداد المشاهدات (تُكتب لاحقاً عبر FileCounterBuffer)"""
+        from .services import FileCounterBuffer
+        FileCounterBuffer.increment(self.pk, 'view_count')
     
     def soft_delete(self):
         """حذف ناعم للملف"""
@@ -355,7 +492,221 @@ class LectureFile(models.Model):
         return self.file_extension and self.file_extension.lower() in image_extensions
 
 
-class CourseManager(models.Manager):
+class UploadSession(models.Model):
+    """
+    جلسة رفع مجزأ قابلة للاستئناف
+    تُرسل البيانات على أجزاء متتالية، وعند اكتمالها يُنشأ LectureFile
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'قيد الرفع'),
+        ('completed', 'مكتمل'),
+        ('aborted', 'ملغى'),
+    ]
+    
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    uploader = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name='رافع الملف'
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name='المقرر'
+    )
+    title = models.CharField(
+        max_length=255,
+        verbose_name='عنوان الملف'
+    )
+    description = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='وصف الملف'
+    )
+    file_type = models.CharField(
+        max_length=50,
+        choices=LectureFile.FILE_TYPE_CHOICES,
+        default='Lecture',
+        verbose_name='تصنيف الملف'
+    )
+    is_visible = models.BooleanField(
+        default=True,
+        verbose_name='مرئي للطلاب'
+    )
+    filename = models.CharField(
+        max_length=255,
+        verbose_name='اسم الملف'
+    )
+    total_size = models.BigIntegerField(
+        verbose_name='الحجم الكلي (بايت)'
+    )
+    checksum = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='بصمة SHA-256 المتوقعة'
+    )
+    offset = models.BigIntegerField(
+        default=0,
+        verbose_name='البايتات المستلمة'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='uploading',
+        verbose_name='الحالة'
+    )
+    lecture_file = models.ForeignKey(
+        LectureFile,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='الملف الناتج'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الإنشاء'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='آخر نشاط'
+    )
+    
+    class Meta:
+        db_table = 'upload_sessions'
+        verbose_name = 'جلسة رفع'
+        verbose_name_plural = 'جلسات الرفع'
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.total_size})"
+    
+    @property
+    def is_complete(self):
+        return self.offset >= self.total_size
+
+
+class FileDerivativeJob(models.Model):
+    """
+    جدول مهام الملفات المشتقة (File_Derivative_Jobs)
+    المشتقات (صور المعاينة...) تُولد خارج مسار الطلب عبر run_derivative_worker
+    وتُخزن حسب بصمة المحتوى، فالملفات المتطابقة تشترك في مهمة واحدة
+    """
+    KIND_CHOICES = [
+        ('preview', 'صورة معاينة'),
+        ('web_pdf', 'PDF محسن للويب'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'قيد الانتظار'),
+        ('processing', 'قيد المعالجة'),
+        ('done', 'تمت المعالجة'),
+        ('skipped', 'غير مدعوم'),
+        ('failed', 'فشلت'),
+    ]
+    
+    content_hash = models.CharField(
+        max_length=64,
+        verbose_name='بصمة المحتوى'
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        verbose_name='نوع المشتق'
+    )
+    source_name = models.CharField(
+        max_length=255,
+        verbose_name='مسار الملف الأصلي'
+    )
+    output_name = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='مسار الملف المشتق'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='الحالة'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد المحاولات'
+    )
+    last_error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='آخر خطأ'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الإضافة'
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ بدء المعالجة'
+    )
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ المعالجة'
+    )
+    
+    class Meta:
+        db_table = 'file_derivative_jobs'
+        verbose_name = 'مهمة ملف مشتق'
+        verbose_name_plural = 'مهام الملفات المشتقة'
+        unique_together = ['content_hash', 'kind']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.content_hash[:12]}"
+
+
+class CourseQuerySet(models.QuerySet):
+    """
+    استعلامات المقررات مع منطق الأرشفة كتعبير SQL
+    """
+    
+    def for_student(self, student):
+        """
+        مقررات الطالب (الحالية والمؤرشفة) في استعلام واحد مع الحقل المحسوب is_archived
+        
+        المنطق:
+        - حالي: فصل المقرر هو الفصل الحالي ومستواه هو مستوى الطالب
+        - مؤرشف: فصل المقرر غير حالي ومستوى الطالب أعلى من مستوى المقرر
+        """
+        from accounts.models import Level
+        
+        if not student.level_id or not student.major_id:
+            return self.none()
+        
+        # رقم مستوى الطالب كاستعلام فرعي بدل تحميل student.level
+        student_level_number = Level.objects.filter(pk=student.level_id).values('level_number')[:1]
+        archived = models.Q(semester__is_current=False, level__level_number__lt=models.Subquery(student_level_number))
+        current = models.Q(semester__is_current=True, level_id=student.level_id)
+        
+        return self.filter(
+            models.Exists(CourseMajor.objects.filter(course=models.OuterRef('pk'), major_id=student.major_id)),
+            current | archived,
+            is_active=True,
+        ).annotate(
+            is_archived=models.ExpressionWrapper(archived, output_field=models.BooleanField())
+        )
+
+
+class CourseManager(models.Manager.from_queryset(CourseQuerySet)):
     """
     مدير مخصص للمقررات مع استعلامات شائعة
     """
@@ -365,30 +716,14 @@ class CourseManager(models.Manager):
         الحصول على المقررات الحالية للطالب
         استعلام المواد الحالية (التبويب الرئيسي)
         """
-        if not student.level or not student.major:
-            return self.none()
-        
-        return self.filter(
-            semester__is_current=True,
-            level=student.level,
-            course_majors__major=student.major,
-            is_active=True
-        ).distinct()
+        return self.for_student(student).filter(is_archived=False)
     
     def get_archived_courses_for_student(self, student):
         """
         الحصول على المقررات المؤرشفة للطالب
         استعلام مواد الأرشيف (تبويب الأرشيف)
         """
-        if not student.level or not student.major:
-            return self.none()
-        
-        return self.filter(
-            semester__is_current=False,
-            level__level_number__lt=student.level.level_number,
-            course_majors__major=student.major,
-            is_active=True
-        ).distinct()
+        return self.for_student(student).filter(is_archived=True)
     
     def get_courses_for_instructor(self, instructor):
         """
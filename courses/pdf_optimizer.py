@@ -0,0 +1,36 @@
+"""
+إنتاج نسخ PDF محسنة للويب (Linearized / Fast Web View)
+S-ACM - Smart Academic Content Management System
+
+ملف PDF الخطي يضع كائنات الصفحة الأولى وجدول المراجع في بدايته،
+فيعرض المتصفح (مع طلبات Range) الصفحة الأولى قبل اكتمال التحميل.
+"""
+
+# PDF Linearization (qpdf)
+try:
+    import pikepdf
+    PIKEPDF_AVAILABLE = True
+except ImportError:
+    PIKEPDF_AVAILABLE = False
+
+
+def linearize_pdf(source_path, output_path):
+    """
+    حفظ نسخة خطية مضغوطة من ملف PDF
+    Returns: True عند النجاح، False إذا كان الملف خطياً أصلاً أو تعذر تحسينه
+    """
+    if not PIKEPDF_AVAILABLE:
+        return False
+
+    with pikepdf.open(source_path) as pdf:
+        if pdf.is_linearized:
+            # الأصل يُعرض تدريجياً بالفعل، لا حاجة لنسخة ثانية
+            return False
+        pdf.save(
+            output_path,
+            linearize=True,
+            compress_streams=True,
+            object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            recompress_flate=True,
+        )
+    return True
@@ -0,0 +1,97 @@
+"""
+توليد صور المعاينة لملفات المحاضرات
+S-ACM - Smart Academic Content Management System
+
+- PDF: الصفحة الأولى (pdfplumber)
+- PPTX: الصورة المصغرة المضمنة في الملف، أو أول صورة في الشرائح
+- الصور: نسخة مصغرة (Pillow)
+"""
+
+import io
+import zipfile
+from pathlib import Path
+
+# Image Processing
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# PDF Rendering
+try:
+    import pdfplumber
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+
+
+def _open_pdf_first_page(path, max_size):
+    if not PDF_AVAILABLE:
+        return None
+    with pdfplumber.open(path) as pdf:
+        if not pdf.pages:
+            return None
+        page = pdf.pages[0]
+        # دقة تكفي للحجم المطلوب دون تصيير الصفحة بدقتها الكاملة
+        resolution = max(36, int(72 * max_size / max(page.width, page.height)))
+        return page.to_image(resolution=resolution).original.copy()
+
+
+def _open_pptx_thumbnail(path):
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        candidates = [name for name in names if name.startswith('docProps/thumbnail.')]
+        if not candidates:
+            candidates = sorted(
+                name for name in names
+                if name.startswith('ppt/media/') and Path(name).suffix.lower() in IMAGE_EXTENSIONS
+            )
+        if not candidates:
+            return None
+        return Image.open(io.BytesIO(archive.read(candidates[0])))
+
+
+def _open_image(path):
+    image = Image.open(path)
+    image.draft('RGB', (2048, 2048))  # تصغير JPEG أثناء فك الترميز
+    return ImageOps.exif_transpose(image)
+
+
+def can_render(extension):
+    """هل يمكن توليد معاينة لهذا النوع في البيئة الحالية؟"""
+    if not PIL_AVAILABLE:
+        return False
+    if extension == '.pdf':
+        return PDF_AVAILABLE
+    return extension == '.pptx' or extension in IMAGE_EXTENSIONS
+
+
+def render_preview(source_path, output_path, max_size=320, image_format='WEBP'):
+    """
+    توليد صورة معاينة وحفظها في output_path
+    Returns: True عند النجاح، False إذا لم يمكن استخراج معاينة
+    """
+    extension = Path(source_path).suffix.lower()
+    if not can_render(extension):
+        return False
+
+    if extension == '.pdf':
+        image = _open_pdf_first_page(source_path, max_size)
+    elif extension == '.pptx':
+        image = _open_pptx_thumbnail(source_path)
+    else:
+        image = _open_image(source_path)
+
+    if image is None:
+        return False
+
+    image.thumbnail((max_size, max_size))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    image.save(output_path, format=image_format, quality=80)
+    return True
@@ -4,11 +4,34 @@ S-ACM - Smart Academic Content Management System
 """
 
 import os
+import atexit
+import hashlib
+import logging
+import mimetypes
+import shutil
+import threading
+import time
+import uuid
+from collections import defaultdict
 from pathlib import Path
+from urllib.parse import quote
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
 from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q, Case, When, Value, Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+from django.utils import timezone
 from django.utils.text import slugify
-from datetime import datetime
+from datetime import datetime, timedelta
+
+
+logger = logging.getLogger(__name__)
 
 
 class FileService:
@@ -102,6 +125,1310 @@ class FileService:
             return f"{size_bytes / (1024 * 1024):.1f} ميجابايت"
 
 
+class LectureBlobService:
+    """
+    صيانة التخزين المعنون بالمحتوى لملفات المحاضرات
+    
+    - adopt_legacy_files: نقل الملفات المرفوعة قبل التخزين المعنون إلى cas/
+    - collect_orphans: حذف النسخ التي لم يعد أي LectureFile يشير إليها
+    """
+    
+    # مهلة قبل حذف النسخ اليتيمة: الملف يُكتب قبل حفظ صف LectureFile
+    ORPHAN_GRACE_SECONDS = 3600
+    
+    @classmethod
+    def get_storage(cls):
+        from .models import LectureFile
+        return LectureFile._meta.get_field('local_file').storage
+    
+    @classmethod
+    def adopt_legacy_files(cls, dry_run=False):
+        """
+        حساب البصمة لكل ملف قديم ونقله إلى مساره المعنون
+        Returns: dict بعدد الملفات المنقولة والمكررة والمفقودة
+        """
+        from .models import LectureFile
+        
+        storage = cls.get_storage()
+        stats = {'adopted': 0, 'deduplicated': 0, 'missing': 0}
+        
+        legacy = LectureFile.objects.filter(
+            content_type='local_file',
+            content_hash__isnull=True
+        ).exclude(local_file='').exclude(local_file__isnull=True).only('pk', 'local_file', 'original_filename')
+        
+        for file_obj in legacy.iterator():
+            old_name = file_obj.local_file.name
+            if not storage.exists(old_name):
+                stats['missing'] += 1
+                continue
+            
+            with storage.open(old_name) as content:
+                digest = storage.compute_hash(File(content))
+                new_name = storage.hashed_name(digest, old_name)
+                if storage.exists(new_name):
+                    stats['deduplicated'] += 1
+                elif not dry_run:
+                    new_name = storage.save(old_name, File(content))
+            
+            stats['adopted'] += 1
+            if dry_run:
+                continue
+            
+            LectureFile.objects.filter(pk=file_obj.pk).update(
+                local_file=new_name,
+                content_hash=storage.hash_from_name(new_name),
+                original_filename=file_obj.original_filename or Path(old_name).name
+            )
+            storage.release(old_name)
+        
+        return stats
+    
+    @classmethod
+    def collect_orphans(cls, dry_run=False, grace_seconds=None):
+        """
+        حذف النسخ غير المرجعية تحت cas/ والمشتقات التي لم يعد محتواها موجوداً
+        Returns: (عدد الملفات, البايتات المحررة)
+        """
+        from .models import LectureFile
+        from .storage import CAS_ROOT
+        
+        if grace_seconds is None:
+            grace_seconds = cls.ORPHAN_GRACE_SECONDS
+        
+        storage = cls.get_storage()
+        referenced = set(
+            LectureFile.objects.filter(
+                local_file__startswith=f'{CAS_ROOT}/'
+            ).values_list('local_file', flat=True)
+        )
+        referenced_hashes = set(
+            LectureFile.objects.filter(
+                content_hash__isnull=False
+            ).values_list('content_hash', flat=True)
+        )
+        cutoff = time.time() - grace_seconds
+        removed = freed = 0
+        
+        roots = [Path(storage.path(CAS_ROOT)), Path(storage.path(DerivativeService.DERIVATIVE_ROOT))]
+        for path in (p for root in roots if root.exists() for p in root.rglob('*')):
+            if not path.is_file():
+                continue
+            name = path.relative_to(storage.location).as_posix()
+            stat_result = path.stat()
+            if stat_result.st_mtime > cutoff:
+                continue
+            # الأصل مرجعي بمساره، والمشتق مرجعي ببصمة محتواه
+            if name in referenced or path.stem[:64] in referenced_hashes:
+                continue
+            removed += 1
+            freed += stat_result.st_size
+            if not dry_run:
+                storage.delete(name)
+        
+        return removed, freed
+
+
+class AssembledUpload(File):
+    """
+    ملف مكتمل التجميع على القرص
+    يوفر temporary_file_path ليُنقل بـ rename بدل نسخه عند الحفظ
+    """
+    
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class ChunkedUploadService:
+    """
+    خدمة الرفع المجزأ القابل للاستئناف (على نمط بروتوكول tus)
+    
+    - البيانات تُلحق بملف جزئي خارج MEDIA_ROOT عند الإزاحة المسجلة فقط
+    - عند الاكتمال يُتحقق من الحجم والبصمة ثم يُنشأ LectureFile
+    - الجلسات المهجورة تُنظف عبر cleanup_chunked_uploads
+    """
+    
+    READ_SIZE = 64 * 1024
+    
+    @classmethod
+    def get_upload_dir(cls):
+        return Path(getattr(settings, 'CHUNKED_UPLOAD_DIR', Path(settings.BASE_DIR) / 'uploads_partial'))
+    
+    @classmethod
+    def get_chunk_size(cls):
+        return getattr(settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024)
+    
+    @classmethod
+    def get_expiry(cls):
+        return timedelta(hours=getattr(settings, 'CHUNKED_UPLOAD_EXPIRY_HOURS', 24))
+    
+    @classmethod
+    def get_part_path(cls, session):
+        return cls.get_upload_dir() / f'{session.pk}.part'
+    
+    @classmethod
+    def receive_chunk(cls, session, stream, offset, length, chunk_checksum=None):
+        """
+        استلام جزء من العميل إلى ملف مؤقت خاص بالطلب دون قفل الجلسة
+        فالرفع البطيء لا يحجز صف الجلسة ولا اتصال قاعدة البيانات
+        Returns: (chunk_path, error_message)
+        """
+        from .uploadhandlers import matches_signature
+        
+        upload_dir = cls.get_upload_dir()
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        path = upload_dir / f'{session.pk}.{uuid.uuid4().hex}.chunk'
+        
+        hasher = hashlib.sha256() if chunk_checksum else None
+        received = 0
+        error = None
+        
+        with open(path, 'wb') as f:
+            while received < length:
+                data = stream.read(min(cls.READ_SIZE, length - received))
+                if not data:
+                    break
+                if offset == 0 and received == 0:
+                    if not matches_signature(Path(session.filename).suffix.lower(), data):
+                        error = 'محتوى الملف لا يطابق امتداده.'
+                        break
+                if hasher:
+                    hasher.update(data)
+                f.write(data)
+                received += len(data)
+        
+        if not error and received != length:
+            error = 'انقطع الاتصال قبل استلام الجزء كاملاً.'
+        if not error and hasher and hasher.hexdigest() != chunk_checksum:
+            error = 'بصمة الجزء غير مطابقة.'
+        
+        if error:
+            path.unlink(missing_ok=True)
+            return None, error
+        return path, None
+    
+    @classmethod
+    def commit_chunk(cls, session, chunk_path):
+        """
+        نقل جزء مستلم إلى الملف الجزئي عند session.offset وتقديم الإزاحة
+        يجب استدعاؤها والجلسة مقفلة (select_for_update) بعد التحقق من الإزاحة
+        Returns: الإزاحة الجديدة
+        """
+        path = cls.get_part_path(session)
+        
+        try:
+            with open(path, 'r+b' if path.exists() else 'wb') as f, open(chunk_path, 'rb') as chunk:
+                # تجاهل أي بايتات كُتبت بعد آخر إزاحة مؤكدة (انقطاع أثناء الكتابة)
+                f.seek(session.offset)
+                f.truncate()
+                shutil.copyfileobj(chunk, f, cls.READ_SIZE)
+                received = f.tell() - session.offset
+        finally:
+            chunk_path.unlink(missing_ok=True)
+        
+        session.offset += received
+        session.save(update_fields=['offset', 'updated_at'])
+        return session.offset
+    
+    @classmethod
+    def complete(cls, session):
+        """
+        التحقق من الملف المجمع وإنشاء LectureFile منه
+        Returns: (lecture_file, error_message)
+        """
+        from .models import LectureFile
+        
+        path = cls.get_part_path(session)
+        if not path.exists() or path.stat().st_size != session.total_size:
+            cls.abort(session)
+            return None, 'حجم الملف المجمع غير مطابق.'
+        
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(cls.READ_SIZE), b''):
+                hasher.update(data)
+        digest = hasher.hexdigest()
+        
+        if session.checksum and digest != session.checksum:
+            cls.abort(session)
+            return None, 'بصمة الملف غير مطابقة، يرجى إعادة الرفع.'
+        
+        with open(path, 'rb') as f:
+            content = AssembledUpload(f, name=session.filename)
+            content.sha256 = digest
+            
+            with transaction.atomic():
+                lecture_file = LectureFile(
+                    course=session.course,
+                    uploader=session.uploader,
+                    title=session.title,
+                    description=session.description,
+                    file_type=session.file_type,
+                    is_visible=session.is_visible,
+                    content_type='local_file',
+                    local_file=content,
+                )
+                lecture_file.save()
+                
+                session.status = 'completed'
+                session.lecture_file = lecture_file
+                session.save(update_fields=['status', 'lecture_file', 'updated_at'])
+        
+        # إن وُجد المحتوى مسبقاً في التخزين لم يُنقل الملف الجزئي
+        path.unlink(missing_ok=True)
+        return lecture_file, None
+    
+    @classmethod
+    def abort(cls, session):
+        """إلغاء الجلسة وحذف ملفها الجزئي"""
+        cls.get_part_path(session).unlink(missing_ok=True)
+        session.status = 'aborted'
+        session.save(update_fields=['status', 'updated_at'])
+    
+    @classmethod
+    def cleanup_abandoned(cls, now=None, dry_run=False):
+        """
+        حذف الجلسات التي لم تنشط خلال CHUNKED_UPLOAD_EXPIRY_HOURS مع ملفاتها الجزئية
+        Returns: dict بعدد الجلسات والملفات والبايتات المحررة
+        """
+        from .models import UploadSession
+        
+        cutoff = (now or timezone.now()) - cls.get_expiry()
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+        stats = {'sessions': stale.count(), 'files': 0, 'bytes': 0}
+        
+        live_ids = {
+            str(pk) for pk in UploadSession.objects.filter(
+                status='uploading',
+                updated_at__gte=cutoff
+            ).values_list('pk', flat=True)
+        }
+        
+        upload_dir = cls.get_upload_dir()
+        if upload_dir.exists():
+            for path in [*upload_dir.glob('*.part'), *upload_dir.glob('*.chunk')]:
+                if path.name.split('.')[0] in live_ids:
+                    continue
+                stats['files'] += 1
+                stats['bytes'] += path.stat().st_size
+                if not dry_run:
+                    path.unlink(missing_ok=True)
+        
+        if not dry_run:
+            stale.delete()
+        
+        return stats
+
+
+class DerivativeService:
+    """
+    توليد الملفات المشتقة (صور المعاينة...) خارج مسار الطلب
+    
+    المشتقات تُخزن حسب بصمة المحتوى:
+        media/derivatives/{kind}/{hash[:2]}/{hash}{ext}
+    فالمحتوى المكرر لا يُعالج إلا مرة واحدة، ومساراتها ثابتة وقابلة للتخزين المؤقت.
+    """
+    
+    DERIVATIVE_ROOT = 'derivatives'
+    OUTPUT_EXTENSIONS = {
+        'preview': '.webp',
+        'web_pdf': '.pdf',
+    }
+    
+    @classmethod
+    def get_max_attempts(cls):
+        return getattr(settings, 'DERIVATIVE_JOB_MAX_ATTEMPTS', 3)
+    
+    @classmethod
+    def get_storage(cls):
+        from .models import LectureFile
+        return LectureFile._meta.get_field('local_file').storage
+    
+    @classmethod
+    def get_output_name(cls, content_hash, kind):
+        return str(
+            Path(cls.DERIVATIVE_ROOT) / kind / content_hash[:2] /
+            f'{content_hash}{cls.OUTPUT_EXTENSIONS[kind]}'
+        )
+    
+    @classmethod
+    def get_existing_name(cls, content_hash, kind):
+        """مسار المشتق في التخزين إن كان قد وُلد، وإلا None"""
+        if not content_hash:
+            return None
+        name = cls.get_output_name(content_hash, kind)
+        return name if cls.get_storage().exists(name) else None
+    
+    @classmethod
+    def get_url(cls, content_hash, kind):
+        """رابط المشتق إن كان موجوداً على القرص"""
+        name = cls.get_existing_name(content_hash, kind)
+        return cls.get_storage().url(name) if name else None
+    
+    @classmethod
+    def get_kinds_for(cls, extension):
+        """أنواع المشتقات الممكنة لامتداد معين"""
+        from . import previews, pdf_optimizer
+        
+        kinds = []
+        if previews.can_render(extension):
+            kinds.append('preview')
+        if (extension == '.pdf' and pdf_optimizer.PIKEPDF_AVAILABLE and
+                getattr(settings, 'WEB_PDF_DERIVATIVES', True)):
+            kinds.append('web_pdf')
+        return kinds
+    
+    @classmethod
+    def enqueue(cls, file_obj):
+        """جدولة المشتقات لملف (مهمة واحدة لكل بصمة ونوع)"""
+        from .models import FileDerivativeJob
+        
+        storage = cls.get_storage()
+        extension = Path(file_obj.local_file.name).suffix.lower()
+        for kind in cls.get_kinds_for(extension):
+            job, created = FileDerivativeJob.objects.get_or_create(
+                content_hash=file_obj.content_hash,
+                kind=kind,
+                defaults={'source_name': file_obj.local_file.name}
+            )
+            # مشتق حُذف من القرص (تنظيف المخزن): إعادة توليده
+            if not created and job.status == 'done' and not storage.exists(job.output_name):
+                FileDerivativeJob.objects.filter(pk=job.pk).update(
+                    status='pending',
+                    attempts=0,
+                    source_name=file_obj.local_file.name
+                )
+    
+    @classmethod
+    def enqueue_existing(cls):
+        """جدولة المشتقات لكل الملفات الحالية (بعد تفعيل نوع مشتق جديد)"""
+        from .models import LectureFile
+        
+        files = LectureFile.objects.filter(
+            is_deleted=False,
+            content_hash__isnull=False
+        ).only('pk', 'local_file', 'content_hash')
+        count = 0
+        for file_obj in files.iterator():
+            cls.enqueue(file_obj)
+            count += 1
+        return count
+    
+    @classmethod
+    def render(cls, kind, source_path, output_path):
+        from . import previews, pdf_optimizer
+        
+        if kind == 'preview':
+            return previews.render_preview(
+                source_path,
+                output_path,
+                max_size=getattr(settings, 'PREVIEW_MAX_SIZE', 320)
+            )
+        if kind == 'web_pdf':
+            return pdf_optimizer.linearize_pdf(source_path, output_path)
+        return False
+    
+    @classmethod
+    def get_source_name(cls, job):
+        """مسار المصدر، أو أي ملف آخر بالبصمة نفسها إن حُذف الأصلي"""
+        from .models import LectureFile
+        
+        storage = cls.get_storage()
+        if storage.exists(job.source_name):
+            return job.source_name
+        return LectureFile.objects.filter(
+            content_hash=job.content_hash
+        ).values_list('local_file', flat=True).first()
+    
+    @classmethod
+    def process_job(cls, job):
+        """
+        معالجة مهمة واحدة
+        Returns: الحالة النهائية، أو None إذا سبقنا معالج آخر إليها
+        """
+        from .models import FileDerivativeJob, LectureFile
+        
+        claimed_at = timezone.now()
+        claimed = FileDerivativeJob.objects.filter(pk=job.pk, status='pending').update(
+            status='processing',
+            attempts=F('attempts') + 1,
+            claimed_at=claimed_at
+        )
+        if not claimed:
+            return None
+        job.refresh_from_db()
+        
+        storage = cls.get_storage()
+        output_name = cls.get_output_name(job.content_hash, job.kind)
+        status, error = 'done', None
+        
+        try:
+            source_name = cls.get_source_name(job)
+            if not source_name:
+                status, error = 'failed', 'الملف الأصلي غير موجود'
+            elif not storage.exists(output_name):
+                output_path = storage.path(output_name)
+                temp_path = f'{output_path}.tmp'
+                Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                if cls.render(job.kind, storage.path(source_name), temp_path):
+                    os.replace(temp_path, output_path)
+                else:
+                    status = 'skipped'
+        except Exception as e:
+            error = str(e)
+            status = 'failed' if job.attempts >= cls.get_max_attempts() else 'pending'
+        
+        # معالج بطيء استُعيدت مهمته (reclaim_stale) لا يكتب فوق نتيجة من تسلّمها بعده
+        updated = FileDerivativeJob.objects.filter(
+            pk=job.pk,
+            status='processing',
+            claimed_at=claimed_at
+        ).update(
+            status=status,
+            last_error=error,
+            output_name=output_name if status == 'done' else '',
+            processed_at=timezone.now()
+        )
+        if not updated:
+            return None
+        
+        # صفحات المقررات المخزنة مؤقتاً تعرض صورة المعاينة الجديدة
+        if status == 'done' and job.kind == 'preview':
+            CourseFileCache.bump(*set(
+                LectureFile.objects.filter(
+                    content_hash=job.content_hash
+                ).values_list('course_id', flat=True)
+            ))
+        return status
+    
+    @classmethod
+    def reclaim_stale(cls, now=None):
+        """
+        استعادة المهام العالقة في processing بعد توقف معالجها (قتل، نفاد ذاكرة، نشر)
+        
+        المهمة عالقة إذا تجاوزت معالجتها DERIVATIVE_JOB_STALE_MINUTES. التوليد يكتب
+        إلى ملف مؤقت ثم يستبدله، فإعادة المهمة آمنة ما دامت ضمن حد المحاولات.
+        Returns: (عدد المعادة، عدد الفاشلة)
+        """
+        from .models import FileDerivativeJob
+        
+        now = now or timezone.now()
+        stale = FileDerivativeJob.objects.filter(
+            status='processing',
+            claimed_at__lt=now - timedelta(minutes=getattr(settings, 'DERIVATIVE_JOB_STALE_MINUTES', 30))
+        )
+        requeued = stale.filter(
+            attempts__lt=cls.get_max_attempts()
+        ).update(status='pending', last_error='توقف المعالج أثناء التوليد، أعيدت المهمة إلى الانتظار')
+        failed = stale.update(
+            status='failed',
+            processed_at=now,
+            last_error='توقف المعالج أثناء التوليد في كل المحاولات'
+        )
+        return requeued, failed
+    
+    @classmethod
+    def process_pending(cls, limit=20):
+        """معالجة أقدم المهام المعلقة، يعيد عدد المهام لكل حالة"""
+        from .models import FileDerivativeJob
+        
+        stats = defaultdict(int)
+        cls.reclaim_stale()
+        jobs = FileDerivativeJob.objects.filter(status='pending').order_by('created_at')[:limit]
+        for job in jobs:
+            status = cls.process_job(job)
+            if status:
+                stats[status] += 1
+        return dict(stats)
+
+
+class CourseFileCache:
+    """
+    نسخة ملفات المقرر (files-version) لتخزين الأجزاء المعروضة مؤقتاً
+    
+    تتغير النسخة عند رفع ملف أو تعديله أو حذفه أو تبديل ظهوره، فتصبح
+    مفاتيح الأجزاء القديمة غير مستخدمة دون الحاجة لحذفها.
+    
+    كتابة عدادات التحميل (FileCounterBuffer) لا تغير النسخة عمداً، وإلا لأُبطلت
+    أجزاء المقررات النشطة في كل دورة كتابة. لذا فعدد التحميلات في صفحة المقرر
+    للطالب قد يتأخر حتى COURSE_FILES_CACHE_TIMEOUT (لوحة المدرس غير مخزنة).
+    """
+    
+    # اسم المجموعة في السياق -> قيمة file_type
+    GROUPS = {
+        'lectures': 'Lecture',
+        'summaries': 'Summary',
+        'exams': 'Exam',
+        'assignments': 'Assignment',
+        'references': 'Reference',
+        'others': 'Other',
+    }
+    
+    @classmethod
+    def get_timeout(cls):
+        return getattr(settings, 'COURSE_FILES_CACHE_TIMEOUT', 300)
+    
+    @staticmethod
+    def get_version_key(course_id):
+        return f'course:{course_id}:files_version'
+    
+    @classmethod
+    def get_version(cls, course_id):
+        key = cls.get_version_key(course_id)
+        version = cache.get(key)
+        if version is None:
+            # قيمة زمنية لا تتكرر حتى لو فُقد المفتاح من الذاكرة المؤقتة
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+    
+    @classmethod
+    def get_versions(cls, course_ids):
+        """نسخ عدة مقررات في طلب واحد للذاكرة المؤقتة"""
+        keys = {cls.get_version_key(course_id): course_id for course_id in course_ids}
+        versions = cache.get_many(keys)
+        for key in keys.keys() - versions.keys():
+            versions[key] = cls.get_version(keys[key])
+        return [versions[key] for key in keys]
+    
+    @classmethod
+    def bump(cls, *course_ids):
+        version = time.time_ns()
+        cache.set_many({cls.get_version_key(course_id): version for course_id in course_ids}, None)
+    
+    @classmethod
+    def get_file_groups(cls, course):
+        """
+        الملفات المرئية للمقرر في استعلام واحد، مجمعة حسب التصنيف
+        Returns: dict فيه 'all' وكل مجموعة من GROUPS
+        """
+        files = list(
+            course.files.filter(is_visible=True, is_deleted=False)
+            .select_related('uploader')
+            .order_by('-upload_date')
+        )
+        
+        groups = {name: [] for name in cls.GROUPS}
+        names_by_type = {file_type: name for name, file_type in cls.GROUPS.items()}
+        for file_obj in files:
+            groups[names_by_type.get(file_obj.file_type, 'others')].append(file_obj)
+        
+        groups['all'] = files
+        return groups
+
+
+class StudentCatalogCache:
+    """
+    قائمة مقررات الطالب (الحالية والمؤرشفة) مخزنة مؤقتاً لكل دفعة
+    
+    المفتاح (التخصص، المستوى، الفصل الحالي) فيشترك طلاب الدفعة الواحدة في
+    مدخل واحد. النسخة العامة تتغير عند تعديل المقررات أو تخصصاتها أو الفصل الحالي.
+    """
+    
+    VERSION_KEY = 'catalog:version'
+    
+    @classmethod
+    def get_timeout(cls):
+        return getattr(settings, 'STUDENT_CATALOG_CACHE_TIMEOUT', 3600)
+    
+    @classmethod
+    def get_version(cls):
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, time.time_ns(), None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+    
+    @classmethod
+    def bump(cls):
+        cache.set(cls.VERSION_KEY, time.time_ns(), None)
+    
+    @classmethod
+    def get_current_semester_id(cls, version):
+        """معرف الفصل الحالي (0 إن لم يوجد)، مخزن تحت نسخة الفهرس نفسها"""
+        from accounts.models import Semester
+        
+        key = f'catalog:current_semester:v{version}'
+        semester_id = cache.get(key)
+        if semester_id is None:
+            semester_id = Semester.objects.filter(is_current=True).values_list('pk', flat=True).first() or 0
+            cache.set(key, semester_id, cls.get_timeout())
+        return semester_id
+    
+    @classmethod
+    def get_cohort_key(cls, student):
+        """
+        مفتاح دفعة الطالب (يُستخدم أيضاً لأجزاء القوالب المشتركة)
+        Returns: None للطالب بلا تخصص أو مستوى
+        """
+        if not student.major_id or not student.level_id:
+            return None
+        version = cls.get_version()
+        semester_id = cls.get_current_semester_id(version)
+        return f'{student.major_id}:{student.level_id}:{semester_id}:v{version}'
+    
+    @classmethod
+    def get_catalog(cls, student):
+        """
+        Returns: {'current': [Course...], 'archived': [Course...]}
+        """
+        from .models import Course
+        
+        cohort_key = cls.get_cohort_key(student)
+        if cohort_key is None:
+            return {'current': [], 'archived': []}
+        
+        key = f'catalog:{cohort_key}'
+        catalog = cache.get(key)
+        if catalog is None:
+            catalog = {
+                'current': list(
+                    Course.objects.get_current_courses_for_student(student).select_related('level')
+                ),
+                'archived': list(
+                    Course.objects.get_archived_courses_for_student(student).select_related('level')
+                ),
+            }
+            cache.set(key, catalog, cls.get_timeout())
+        return catalog
+
+
+class InstructorAnalyticsService:
+    """
+    إحصائيات المدرس (الملفات، التحميلات، المشاهدات) بتجميع داخل قاعدة البيانات
+    
+    الإجماليات تُحسب باستعلامات GROUP BY واحدة بدل المرور على الملفات في Python،
+    وتُخزن مؤقتاً تحت نسخ لكل مقرر ولكل رافع تتغير عند كتابة عدادات ملفاتها أو
+    تعديلها، فلا يُبطل تحميل ملف في مقرر إحصائيات بقية المدرسين.
+    """
+    
+    TREND_ACTIVITIES = ('download', 'view')
+    
+    @classmethod
+    def get_timeout(cls):
+        return getattr(settings, 'INSTRUCTOR_ANALYTICS_CACHE_TIMEOUT', 300)
+    
+    @classmethod
+    def get_trend_days(cls):
+        return getattr(settings, 'INSTRUCTOR_ANALYTICS_TREND_DAYS', 14)
+    
+    @staticmethod
+    def get_version_key(scope, pk):
+        return f'analytics:{scope}:{pk}:version'
+    
+    @classmethod
+    def get_versions(cls, scope, ids):
+        """نسخ عدة مقررات أو رافعين ('course' / 'uploader') في طلب واحد للذاكرة المؤقتة"""
+        keys = [cls.get_version_key(scope, pk) for pk in ids]
+        versions = cache.get_many(keys)
+        missing = [key for key in keys if key not in versions]
+        if missing:
+            version = time.time_ns()
+            for key in missing:
+                cache.add(key, version, None)
+            versions.update(cache.get_many(missing))
+        return [versions.get(key) for key in keys]
+    
+    @classmethod
+    def bump(cls, course_ids=(), uploader_ids=()):
+        """إبطال إحصائيات المقررات والرافعين المحددين (تبقى المفاتيح القديمة حتى تنتهي صلاحيتها)"""
+        version = time.time_ns()
+        keys = [cls.get_version_key('course', pk) for pk in course_ids]
+        keys += [cls.get_version_key('uploader', pk) for pk in uploader_ids if pk]
+        if keys:
+            cache.set_many(dict.fromkeys(keys, version), None)
+    
+    @classmethod
+    def _cached(cls, name, versions, compute):
+        # النسخ كلها جزء من المفتاح (مختصرة ببصمة لتبقى ضمن حد طول المفتاح)
+        digest = hashlib.md5(':'.join(map(str, versions)).encode()).hexdigest()
+        key = f'analytics:{name}:{digest}'
+        result = cache.get(key)
+        if result is None:
+            result = compute()
+            cache.set(key, result, cls.get_timeout())
+        return result
+    
+    @classmethod
+    def compute_course_totals(cls, course_ids):
+        """
+        إجماليات كل مقرر في استعلام واحد مجمع حسب course_id
+        Returns: {course_id: {'files', 'visible_files', 'downloads', 'views'}}
+        """
+        from .models import LectureFile
+        
+        empty = {'files': 0, 'visible_files': 0, 'downloads': 0, 'views': 0}
+        totals = {course_id: dict(empty) for course_id in course_ids}
+        rows = (
+            LectureFile.objects
+            .filter(course_id__in=course_ids, is_deleted=False)
+            .values('course_id')
+            .annotate(
+                files=Count('id'),
+                visible_files=Count('id', filter=Q(is_visible=True)),
+                downloads=Coalesce(Sum('download_count'), 0),
+                views=Coalesce(Sum('view_count'), 0),
+            )
+            .order_by()
+        )
+        for row in rows:
+            totals[row.pop('course_id')] = row
+        return totals
+    
+    @classmethod
+    def get_course_totals(cls, course_id):
+        return cls._cached(
+            f'course:{course_id}',
+            cls.get_versions('course', [course_id]),
+            lambda: cls.compute_course_totals([course_id])[course_id]
+        )
+    
+    @staticmethod
+    def get_instructor_course_ids(instructor):
+        from .models import InstructorCourse
+        
+        return sorted(
+            InstructorCourse.objects.filter(instructor=instructor)
+            .values_list('course_id', flat=True)
+        )
+    
+    @classmethod
+    def compute_instructor_summary(cls, instructor, course_ids=None):
+        from .models import LectureFile
+        
+        if course_ids is None:
+            course_ids = cls.get_instructor_course_ids(instructor)
+        uploads = LectureFile.objects.filter(uploader=instructor, is_deleted=False).aggregate(
+            files=Count('id'),
+            downloads=Coalesce(Sum('download_count'), 0),
+            views=Coalesce(Sum('view_count'), 0),
+        )
+        return {
+            'courses': cls.compute_course_totals(course_ids),
+            'uploads': uploads,
+        }
+    
+    @classmethod
+    def get_instructor_summary(cls, instructor):
+        """
+        إحصائيات لوحة تحكم المدرس
+        Returns: {'courses': {course_id: totals}, 'uploads': إجماليات ملفاته المرفوعة}
+        """
+        course_ids = cls.get_instructor_course_ids(instructor)
+        return cls._cached(
+            f'instructor:{instructor.pk}',
+            cls.get_versions('course', course_ids) + cls.get_versions('uploader', [instructor.pk]) + course_ids,
+            lambda: cls.compute_instructor_summary(instructor, course_ids)
+        )
+    
+    @classmethod
+    def compute_trends(cls, instructor, days):
+        """
+        التحميلات والمشاهدات اليومية لملفات مقررات المدرس من سجل النشاط
+        Returns: قائمة [{'day', 'download', 'view'}] لكل يوم في الفترة (بما فيها الأيام الخالية)
+        """
+        from accounts.models import UserActivity
+        from .models import LectureFile
+        
+        today = timezone.localdate()
+        start = today - timedelta(days=days - 1)
+        since = timezone.make_aware(datetime.combine(start, datetime.min.time()))
+        
+        files = LectureFile.objects.filter(course__instructor_courses__instructor=instructor)
+        rows = (
+            UserActivity.objects
+            .filter(
+                activity_type__in=cls.TREND_ACTIVITIES,
+                activity_time__gte=since,
+                file_id__in=files.values('pk'),
+            )
+            .annotate(day=TruncDate('activity_time'))
+            .values('day', 'activity_type')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        
+        series = {
+            start + timedelta(days=offset): dict.fromkeys(cls.TREND_ACTIVITIES, 0)
+            for offset in range(days)
+        }
+        for row in rows:
+            if row['day'] in series:
+                series[row['day']][row['activity_type']] = row['total']
+        return [{'day': day, **counts} for day, counts in series.items()]
+    
+    @classmethod
+    def get_trends(cls, instructor, days=None):
+        days = days or cls.get_trend_days()
+        course_ids = cls.get_instructor_course_ids(instructor)
+        return cls._cached(
+            f'trends:{instructor.pk}:{timezone.localdate().isoformat()}:{days}',
+            cls.get_versions('course', course_ids) + course_ids,
+            lambda: cls.compute_trends(instructor, days)
+        )
+
+
+class FileCounterBuffer:
+    """
+    مخزن مؤقت لعدادات التحميل والمشاهدة
+    
+    يجمع الزيادات في ذاكرة العملية بدلاً من كتابة صف lectures_files في كل طلب،
+    ثم يطبقها دورياً بعبارات UPDATE مجمعة تعتمد على F() فلا تضيع أي زيادة.
+    
+    الكتابة تتم في خيط خلفي لكل عملية (كل FILE_COUNTER_FLUSH_INTERVAL ثانية،
+    أو فوراً عند بلوغ FILE_COUNTER_FLUSH_THRESHOLD)، فلا ينفذ طلب التحميل أي UPDATE.
+    عند فشل الكتابة تُعاد الزيادات إلى المخزن للمحاولة التالية.
+    الزيادات غير المكتوبة تضيع فقط إذا قُتلت العملية (SIGKILL) قبل الدورة التالية.
+    """
+    
+    FIELDS = ('download_count', 'view_count')
+    
+    _lock = threading.Lock()
+    _pending = defaultdict(lambda: defaultdict(int))
+    _pending_hits = 0
+    _last_flush = time.monotonic()
+    _wakeup = threading.Event()
+    _flusher = None
+    _flusher_pid = None
+    
+    @classmethod
+    def get_flush_interval(cls):
+        return getattr(settings, 'FILE_COUNTER_FLUSH_INTERVAL', 30)
+    
+    @classmethod
+    def get_flush_threshold(cls):
+        return getattr(settings, 'FILE_COUNTER_FLUSH_THRESHOLD', 500)
+    
+    @classmethod
+    def increment(cls, file_id, field):
+        """تسجيل زيادة واحدة للعداد المحدد (دون أي كتابة في قاعدة البيانات)"""
+        if field not in cls.FIELDS:
+            raise ValueError(f'Unknown counter field: {field}')
+        
+        with cls._lock:
+            cls._pending[field][file_id] += 1
+            cls._pending_hits += 1
+            due = cls._pending_hits >= cls.get_flush_threshold()
+        
+        cls.ensure_flusher()
+        if due:
+            cls._wakeup.set()
+    
+    @classmethod
+    def ensure_flusher(cls):
+        """تشغيل خيط الكتابة الخلفي مرة لكل عملية (وبعد fork في خوادم preload)"""
+        pid = os.getpid()
+        if cls._flusher_pid == pid and cls._flusher.is_alive():
+            return
+        with cls._lock:
+            if cls._flusher_pid == pid and cls._flusher.is_alive():
+                return
+            cls._flusher = threading.Thread(
+                target=cls._run_flusher, name='file-counter-flusher', daemon=True
+            )
+            cls._flusher_pid = pid
+            cls._flusher.start()
+    
+    @classmethod
+    def _run_flusher(cls):
+        while True:
+            cls._wakeup.wait(cls.get_flush_interval())
+            cls._wakeup.clear()
+            if cls._safe_flush() is None:
+                # تهدئة بعد الفشل حتى لا تعيد الزيادات المستعادة إيقاظ الخيط فوراً
+                time.sleep(cls.get_flush_interval())
+            # اتصال هذا الخيط يخضع لـ CONN_MAX_AGE كاتصالات الطلبات
+            close_old_connections()
+    
+    @classmethod
+    def get_pending(cls, file_id, field):
+        """الزيادات التي لم تُكتب بعد لملف معين"""
+        with cls._lock:
+            return cls._pending[field].get(file_id, 0)
+    
+    @classmethod
+    def restore(cls, pending):
+        """إعادة زيادات لم تُكتب إلى المخزن"""
+        with cls._lock:
+            for field, deltas in pending.items():
+                for file_id, delta in deltas.items():
+                    cls._pending[field][file_id] += delta
+                    cls._pending_hits += delta
+    
+    @classmethod
+    def flush(cls):
+        """
+        تطبيق الزيادات المتراكمة على قاعدة البيانات
+        عبارة UPDATE واحدة لكل عداد: count = count + CASE id WHEN ... END
+        """
+        from courses.models import LectureFile
+        
+        with cls._lock:
+            pending = cls._pending
+            cls._pending = defaultdict(lambda: defaultdict(int))
+            cls._pending_hits = 0
+            cls._last_flush = time.monotonic()
+        
+        updated = 0
+        flushed_ids = set()
+        try:
+            for field in list(pending):
+                deltas = pending[field]
+                flushed_ids.update(deltas)
+                if deltas:
+                    increment = Case(
+                        *[When(pk=file_id, then=Value(delta)) for file_id, delta in deltas.items()],
+                        default=Value(0)
+                    )
+                    updated += LectureFile.objects.filter(pk__in=list(deltas)).update(
+                        **{field: F(field) + increment}
+                    )
+                # العداد كُتب: لا يُعاد عند فشل العداد التالي
+                del pending[field]
+        except Exception:
+            cls.restore(pending)
+            raise
+        finally:
+            if updated:
+                owners = list(LectureFile.objects.filter(pk__in=flushed_ids).values_list('course_id', 'uploader_id'))
+                InstructorAnalyticsService.bump(
+                    course_ids={course_id for course_id, _ in owners},
+                    uploader_ids={uploader_id for _, uploader_id in owners}
+                )
+        return updated
+    
+    @classmethod
+    def _safe_flush(cls):
+        """كتابة المخزن دون رفع الاستثناء (الزيادات تبقى للمحاولة التالية)"""
+        try:
+            return cls.flush()
+        except Exception:
+            logger.exception('Flushing file counters failed; deltas kept for the next attempt')
+            return None
+
+
+# كتابة الزيادات المتبقية عند إيقاف العملية
+atexit.register(FileCounterBuffer._safe_flush)
+
+
+class FileDeliveryBackend:
+    """
+    الواجهة الأساسية لتسليم الملفات المحلية
+    
+    تتحقق الـ View من الصلاحيات وتسجل الإحصائيات، ثم يتولى الـ backend
+    إنشاء الاستجابة التي تنقل بايتات الملف.
+    """
+    
+    def get_content_type(self, file_obj):
+        content_type, _ = mimetypes.guess_type(file_obj.local_file.name)
+        return content_type or 'application/octet-stream'
+    
+    def get_filename(self, file_obj):
+        return file_obj.original_filename or Path(file_obj.local_file.name).name
+    
+    def get_storage(self, file_obj):
+        return file_obj.local_file.storage
+    
+    def serve(self, request, file_obj, as_attachment=True, name=None):
+        """
+        تسليم الملف، أو ملف آخر من التخزين نفسه عبر name (مثل نسخة مشتقة)
+        مع الإبقاء على نوع المحتوى واسم الملف الأصليين
+        """
+        raise NotImplementedError
+
+
+class DjangoFileDelivery(FileDeliveryBackend):
+    """
+    التسليم من داخل Django (للتطوير)
+    
+    FileResponse يمرر الملف إلى wsgi.file_wrapper، فيستخدم gunicorn
+    os.sendfile للنقل دون نسخ عبر ذاكرة Python.
+    يدعم طلبات Range (206) والطلبات الشرطية (ETag / If-Modified-Since).
+    """
+    
+    CHUNK_SIZE = 64 * 1024
+    
+    @staticmethod
+    def make_etag(stat_result):
+        """ETag قوي مشتق من حجم الملف ووقت تعديله"""
+        return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+    
+    @staticmethod
+    def parse_range(header, size):
+        """
+        تحليل ترويسة Range لنطاق واحد
+        يعيد (start, end) أو None لتجاهل الترويسة، أو False إذا كان النطاق غير قابل للتحقيق
+        """
+        if not header or not header.startswith('bytes=') or ',' in header:
+            return None
+        
+        start, _, end = header[len('bytes='):].strip().partition('-')
+        try:
+            if not start:
+                # bytes=-N: آخر N بايت
+                length = int(end)
+                if length <= 0:
+                    return False
+                return max(size - length, 0), size - 1
+            start = int(start)
+            end = int(end) if end else size - 1
+        except ValueError:
+            return None
+        
+        if start >= size or end < start:
+            return False
+        return start, min(end, size - 1)
+    
+    def iter_range(self, path, start, length):
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    
+    def serve_path(self, request, path, content_type, filename, as_attachment=True):
+        """تسليم ملف من مسار محلي مع دعم Range والطلبات الشرطية"""
+        stat_result = os.stat(path)
+        size = stat_result.st_size
+        etag = self.make_etag(stat_result)
+        last_modified = int(stat_result.st_mtime)
+        
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            byte_range = None
+            if_range = request.headers.get('If-Range')
+            if not if_range or if_range == etag:
+                byte_range = self.parse_range(request.headers.get('Range'), size)
+            
+            if byte_range is False:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+            elif byte_range:
+                start, end = byte_range
+                response = StreamingHttpResponse(
+                    self.iter_range(path, start, end - start + 1),
+                    status=206,
+                    content_type=content_type
+                )
+                response['Content-Range'] = f'bytes {start}-{end}/{size}'
+                response['Content-Length'] = str(end - start + 1)
+                response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+            else:
+                response = FileResponse(
+                    open(path, 'rb'),
+                    content_type=content_type,
+                    as_attachment=as_attachment,
+                    filename=filename
+                )
+        
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+    
+    def serve(self, request, file_obj, as_attachment=True, name=None):
+        return self.serve_path(
+            request,
+            self.get_storage(file_obj).path(name or file_obj.local_file.name),
+            self.get_content_type(file_obj),
+            self.get_filename(file_obj),
+            as_attachment=as_attachment
+        )
+
+
+class InternalRedirectDelivery(FileDeliveryBackend):
+    """
+    تسليم الملف عبر خادم الواجهة بترويسة داخلية
+    تعيد Django استجابة فارغة ويقوم الخادم ببث الملف
+    """
+    header_name = None
+    
+    def get_header_value(self, storage, name):
+        raise NotImplementedError
+    
+    def serve(self, request, file_obj, as_attachment=True, name=None):
+        response = HttpResponse(content_type=self.get_content_type(file_obj))
+        response[self.header_name] = self.get_header_value(
+            self.get_storage(file_obj), name or file_obj.local_file.name
+        )
+        response['Content-Disposition'] = content_disposition_header(
+            as_attachment, self.get_filename(file_obj)
+        )
+        return response
+
+
+class XAccelRedirectDelivery(InternalRedirectDelivery):
+    """
+    nginx: X-Accel-Redirect إلى موقع internal يشير إلى MEDIA_ROOT
+    
+        location /protected-media/ {
+            internal;
+            alias /path/to/media/;
+        }
+    """
+    header_name = 'X-Accel-Redirect'
+    
+    def get_header_value(self, storage, name):
+        prefix = getattr(settings, 'FILE_DELIVERY_INTERNAL_PREFIX', '/protected-media/')
+        return prefix.rstrip('/') + '/' + quote(name.replace(os.sep, '/'))
+
+
+class XSendfileDelivery(InternalRedirectDelivery):
+    """
+    Apache/lighttpd: X-Sendfile بالمسار المطلق للملف
+    المسار مرمّز URL ويفكه mod_xsendfile (XSendFileUnescape On)
+    """
+    header_name = 'X-Sendfile'
+    
+    def get_header_value(self, storage, name):
+        return quote(storage.path(name))
+
+
+FILE_DELIVERY_BACKENDS = {
+    'django': DjangoFileDelivery,
+    'nginx': XAccelRedirectDelivery,
+    'apache': XSendfileDelivery,
+}
+
+
+def get_file_delivery_backend():
+    """الحصول على backend التسليم المحدد في FILE_DELIVERY_BACKEND"""
+    name = getattr(settings, 'FILE_DELIVERY_BACKEND', 'django')
+    if name not in FILE_DELIVERY_BACKENDS:
+        raise ImproperlyConfigured(
+            f'FILE_DELIVERY_BACKEND غير معروف: {name!r}. '
+            f'القيم المتاحة: {", ".join(FILE_DELIVERY_BACKENDS)}'
+        )
+    return FILE_DELIVERY_BACKENDS[name]()
+
+
+def is_new_download(response):
+    """
+    هل يمثل الرد تحميلاً جديداً؟
+    ردود 304 وأجزاء Range اللاحقة (استئناف / تقديم الفيديو) لا تُحتسب
+    """
+    if response.status_code == 206:
+        return response.get('Content-Range', '').startswith('bytes 0-')
+    return response.status_code < 400 and response.status_code != 304
+
+
+class CourseAudienceService:
+    """
+    صيانة جدول جمهور المقررات (course_audience)
+    
+    الطالب ضمن جمهور المقرر إذا كان نشطاً وتخصصه من تخصصات المقرر ومستواه
+    هو مستوى المقرر. يُعاد حساب الأزواج (المقرر، الطالب) للنطاق المتغير فقط
+    ثم يُحذف الزائد ويُضاف الناقص، فلا تُلمس الصفوف التي لم تتغير.
+    """
+    
+    STUDENT_ROLE = 'Student'
+    
+    @classmethod
+    def get_batch_size(cls):
+        return getattr(settings, 'COURSE_AUDIENCE_BATCH_SIZE', 1000)
+    
+    @classmethod
+    def get_students(cls, course):
+        """طلاب المقرر النشطون (بحث مفهرس في course_audience)"""
+        from accounts.models import User
+        return User.objects.filter(audience_courses__course=course)
+    
+    @classmethod
+    def get_students_count(cls, course):
+        return course.audience.count()
+    
+    @classmethod
+    def compute_pairs(cls, student_ids=None, course_ids=None):
+        """
+        الأزواج (course_id, student_id) المستحقة، مقيدة اختيارياً بطلاب أو مقررات
+        شرطا التخصص والمستوى في filter() واحد ليشيرا إلى نفس صف course_majors
+        """
+        from accounts.models import User
+        
+        students = User.objects.filter(role__role_name=cls.STUDENT_ROLE, account_status='active')
+        if student_ids is not None:
+            students = students.filter(pk__in=student_ids)
+        
+        course_filters = {'major__major_courses__course__level_id': F('level_id')}
+        if course_ids is not None:
+            course_filters['major__major_courses__course_id__in'] = course_ids
+        
+        return set(
+            students.filter(**course_filters)
+            .values_list('major__major_courses__course_id', 'pk')
+        )
+    
+    @classmethod
+    def sync(cls, existing, desired):
+        """
+        مطابقة صفوف النطاق الحالية مع الأزواج المستحقة
+        existing: QuerySet لصفوف CourseAudience ضمن النطاق
+        """
+        from .models import CourseAudience
+        
+        current = {
+            (course_id, student_id): pk
+            for pk, course_id, student_id in existing.values_list('pk', 'course_id', 'student_id')
+        }
+        stale = [pk for pair, pk in current.items() if pair not in desired]
+        missing = [
+            CourseAudience(course_id=course_id, student_id=student_id)
+            for course_id, student_id in desired if (course_id, student_id) not in current
+        ]
+        
+        batch_size = cls.get_batch_size()
+        with transaction.atomic():
+            for start in range(0, len(stale), batch_size):
+                CourseAudience.objects.filter(pk__in=stale[start:start + batch_size]).delete()
+            CourseAudience.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+        
+        return len(missing), len(stale)
+    
+    @classmethod
+    def refresh_courses(cls, course_ids):
+        """إعادة حساب جمهور مقررات محددة (تعديل تخصصات المقرر أو مستواه)"""
+        from .models import CourseAudience
+        
+        course_ids = list(course_ids)
+        if not course_ids:
+            return 0, 0
+        return cls.sync(
+            CourseAudience.objects.filter(course_id__in=course_ids),
+            cls.compute_pairs(course_ids=course_ids)
+        )
+    
+    @classmethod
+    def refresh_students(cls, student_ids):
+        """
+        إعادة حساب مقررات طلاب محددين (ترقية، تغيير تخصص أو مستوى أو حالة حساب)
+        Returns: (added, removed)
+        """
+        from .models import CourseAudience
+        
+        student_ids = list(student_ids)
+        added = removed = 0
+        batch_size = cls.get_batch_size()
+        for start in range(0, len(student_ids), batch_size):
+            batch = student_ids[start:start + batch_size]
+            batch_added, batch_removed = cls.sync(
+                CourseAudience.objects.filter(student_id__in=batch),
+                cls.compute_pairs(student_ids=batch)
+            )
+            added += batch_added
+            removed += batch_removed
+        return added, removed
+    
+    @classmethod
+    def rebuild(cls):
+        """إعادة بناء الجدول كاملاً (للإصلاح بعد تعديلات جماعية خارج التطبيق)"""
+        from .models import CourseAudience
+        return cls.sync(CourseAudience.objects.all(), cls.compute_pairs())
+
+
 class NotificationService:
     """خدمة الإشعارات"""
     
@@ -111,18 +1438,11 @@ class NotificationService:
         إرسال إشعار عند رفع ملف جديد
         """
         from notifications.models import Notification
-        from accounts.models import User
         
         course = file_obj.course
         
-        # الحصول على جميع الطلاب المسجلين في التخصصات المرتبطة بالمقرر
-        majors = course.course_majors.values_list('major_id', flat=True)
-        students = User.objects.filter(
-            role__role_name='student',
-            major_id__in=majors,
-            level=course.level,
-            account_status='active'
-        )
+        # طلاب المقرر من جدول الجمهور المحسوب مسبقاً
+        students = CourseAudienceService.get_students(course)
         
         # إنشاء إشعار لكل طالب
         notifications = []
@@ -186,104 +1506,271 @@ class ArchiveService:
         - و مستوى الطالب أعلى من مستوى المقرر
         - فإن المقرر يعتبر مؤرشفاً
         """
-        from accounts.models import Semester
-        
-        # الحصول على الفصل الحالي
-        current_semester = Semester.objects.filter(is_current=True).first()
-        
-        if not current_semester:
-            return False
-        
-        # التحقق من مستوى الطالب مقارنة بمستوى المقرر
-        if student.level and course.level:
-            student_level_number = student.level.level_number
-            course_level_number = course.level.level_number
-            
-            if student_level_number > course_level_number:
-                return True
+        from courses.models import Course
         
-        return False
+        return Course.objects.for_student(student).filter(pk=course.pk, is_archived=True).exists()
     
     @classmethod
     def get_student_courses(cls, student, archived=False):
         """
-        الحصول على مقررات الطالب (الحالية أو المؤرشفة)
+        الحصول على مقررات الطالب (الحالية أو المؤرشفة) في استعلام واحد
         """
         from courses.models import Course
         
-        # الحصول على المقررات المرتبطة بتخصص الطالب
-        courses = Course.objects.filter(
-            course_majors__major=student.major,
-            is_active=True
-        ).distinct()
-        
-        result = []
-        for course in courses:
-            is_archived = cls.is_archived_for_student(course, student)
-            
-            if archived and is_archived:
-                result.append(course)
-            elif not archived and not is_archived:
-                # فقط المقررات التي تطابق مستوى الطالب
-                if course.level == student.level:
-                    result.append(course)
-        
-        return result
+        return Course.objects.for_student(student).filter(is_archived=archived)
 
 
 class PromotionService:
-    """خدمة ترقية الطلاب"""
+    """
+    خدمة ترقية الطلاب
+    
+    الترقية تتم على دفعات صغيرة بترتيب المفتاح الأساسي، كل دفعة في معاملة
+    قصيرة، فلا يُقفل جدول users طوال العملية. كل طالب مُرقى يُسجل في
+    PromotionBatchItem لإمكانية التراجع عن الدفعة كاملة.
+    """
+    
+    STUDENT_ROLE = 'Student'
+    STATS_CACHE_KEY = 'promotion:stats'
     
     @classmethod
-    def promote_students(cls, from_level):
+    def get_chunk_size(cls):
+        return getattr(settings, 'PROMOTION_CHUNK_SIZE', 500)
+    
+    @classmethod
+    def get_students(cls, major=None):
+        """الطلاب النشطون القابلون للترقية"""
+        from accounts.models import User
+        
+        students = User.objects.filter(role__role_name=cls.STUDENT_ROLE, account_status='active')
+        if major:
+            students = students.filter(major=major)
+        return students
+    
+    @classmethod
+    def get_next_levels(cls):
         """
-        ترقية جميع طلاب مستوى معين إلى المستوى التالي
+        المستوى التالي لكل مستوى في استعلام واحد
+        Returns: (levels مرتبة تصاعدياً، {level_id: next_level أو None})
         """
-        from accounts.models import User, Level
+        from accounts.models import Level
         
-        # الحصول على المستوى التالي
-        try:
-            next_level = Level.objects.get(level_number=from_level.level_number + 1)
-        except Level.DoesNotExist:
-            return 0, "لا يوجد مستوى تالي"
-        
-        # ترقية الطلاب
-        students = User.objects.filter(
-            role__role_name='student',
-            level=from_level,
-            account_status='active'
+        levels = list(Level.objects.order_by('level_number'))
+        by_number = {level.level_number: level for level in levels}
+        return levels, {level.pk: by_number.get(level.level_number + 1) for level in levels}
+    
+    @classmethod
+    def get_plan(cls, from_level=None):
+        """
+        خطوات الترقية [(from_level, to_level)]
+        بدون from_level: جميع المستويات بترتيب تنازلي (الأعلى أولاً) كي لا يُرقى الطالب مرتين
+        """
+        levels, next_levels = cls.get_next_levels()
+        if from_level is not None:
+            next_level = next_levels.get(from_level.pk)
+            return [(from_level, next_level)] if next_level else []
+        return [
+            (level, next_levels[level.pk])
+            for level in reversed(levels) if next_levels[level.pk]
+        ]
+    
+    @classmethod
+    def preview(cls, from_level=None, major=None):
+        """
+        تشغيل تجريبي: عدد الطلاب الذين ستتم ترقيتهم لكل (تخصص، مستوى) دون أي تعديل
+        Returns: (rows, total) حيث rows قائمة {'major', 'from_level', 'to_level', 'count'}
+        """
+        plan = cls.get_plan(from_level)
+        targets = {level.pk: (level, next_level) for level, next_level in plan}
+        
+        counts = (
+            cls.get_students(major)
+            .filter(level_id__in=targets)
+            .values('major__major_name', 'level_id')
+            .annotate(count=Count('id'))
+            .order_by('-level__level_number', 'major__major_name')
         )
+        rows = [
+            {
+                'major': row['major__major_name'] or 'بدون تخصص',
+                'from_level': targets[row['level_id']][0],
+                'to_level': targets[row['level_id']][1],
+                'count': row['count'],
+            }
+            for row in counts
+        ]
+        return rows, sum(row['count'] for row in rows)
+    
+    @classmethod
+    def _promote_level(cls, batch, from_level, to_level, major, chunk_size, progress, done):
+        from accounts.models import User, PromotionBatchItem
         
-        count = students.update(level=next_level)
+        students = cls.get_students(major).filter(level=from_level)
+        last_pk = 0
+        while True:
+            chunk = list(
+                students.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not chunk:
+                return done
+            last_pk = chunk[-1]
+            
+            with transaction.atomic():
+                # إعادة التحقق من المستوى داخل المعاملة (قد يتغير بعد القراءة)
+                promoted = list(
+                    User.objects.select_for_update()
+                    .filter(pk__in=chunk, level=from_level)
+                    .values_list('pk', flat=True)
+                )
+                User.objects.filter(pk__in=promoted).update(level=to_level)
+                PromotionBatchItem.objects.bulk_create([
+                    PromotionBatchItem(batch=batch, student_id=pk, from_level=from_level, to_level=to_level)
+                    for pk in promoted
+                ])
+                done += len(promoted)
+                batch.student_count = done
+                batch.save(update_fields=['student_count'])
+            
+            CourseAudienceService.refresh_students(promoted)
+            if progress:
+                progress(batch, from_level, to_level, done)
+    
+    @classmethod
+    def promote(cls, from_level=None, major=None, user=None, chunk_size=None, progress=None):
+        """
+        تنفيذ الترقية وتسجيلها كدفعة قابلة للتراجع
+        from_level=None: ترحيل جميع المستويات (rollover)
+        progress: دالة اختيارية (batch, from_level, to_level, done) تُستدعى بعد كل دفعة
+        Returns: (batch, error_message)
+        """
+        from accounts.models import PromotionBatch
+        
+        plan = cls.get_plan(from_level)
+        if not plan:
+            return None, "لا يوجد مستوى تالي"
         
-        return count, None
+        batch = PromotionBatch.objects.create(
+            mode='level' if from_level is not None else 'rollover',
+            from_level=from_level,
+            major=major,
+            performed_by=user,
+        )
+        chunk_size = chunk_size or cls.get_chunk_size()
+        started = time.monotonic()
+        done = 0
+        error = None
+        
+        try:
+            for level, next_level in plan:
+                done = cls._promote_level(batch, level, next_level, major, chunk_size, progress, done)
+            batch.status = 'completed'
+        except Exception as e:
+            # الدفعات المنفذة قبل الخطأ تبقى مسجلة ويمكن التراجع عنها
+            batch.status = 'failed'
+            batch.last_error = str(e)
+            error = f"توقفت الترقية بعد {batch.student_count} طالب: {e}"
+        
+        batch.duration = time.monotonic() - started
+        batch.save(update_fields=['status', 'student_count', 'duration', 'last_error'])
+        cls.invalidate_stats()
+        return batch, error
     
     @classmethod
-    def get_promotion_stats(cls):
+    def undo(cls, batch, chunk_size=None, progress=None):
         """
-        الحصول على إحصائيات الترقية
+        إعادة طلاب الدفعة إلى مستوياتهم السابقة
+        الطالب الذي تغير مستواه بعد الترقية لا يُعاد
+        Returns: (عدد الطلاب المعادين، error_message)
         """
-        from accounts.models import User, Level
+        from accounts.models import User
         
-        levels = Level.objects.all().order_by('level_number')
-        stats = []
+        if not batch.can_undo:
+            return 0, "لا يمكن التراجع عن هذه الدفعة"
         
-        for level in levels:
-            student_count = User.objects.filter(
-                role__role_name='student',
-                level=level,
-                account_status='active'
-            ).count()
+        chunk_size = chunk_size or cls.get_chunk_size()
+        restored = 0
+        last_pk = 0
+        while True:
+            items = list(
+                batch.items.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'student_id', 'from_level_id', 'to_level_id')[:chunk_size]
+            )
+            if not items:
+                break
+            last_pk = items[-1][0]
             
-            try:
-                next_level = Level.objects.get(level_number=level.level_number + 1)
-            except Level.DoesNotExist:
-                next_level = None
+            groups = defaultdict(list)
+            for _, student_id, from_level_id, to_level_id in items:
+                groups[(from_level_id, to_level_id)].append(student_id)
             
-            stats.append({
-                'level': level,
-                'student_count': student_count,
-                'next_level': next_level
-            })
+            with transaction.atomic():
+                for (from_level_id, to_level_id), student_ids in groups.items():
+                    restored += User.objects.filter(
+                        pk__in=student_ids, level_id=to_level_id
+                    ).update(level_id=from_level_id)
+            
+            CourseAudienceService.refresh_students(item[1] for item in items)
+            if progress:
+                progress(batch, restored)
+        
+        batch.status = 'undone'
+        batch.undone_at = timezone.now()
+        batch.save(update_fields=['status', 'undone_at'])
+        cls.invalidate_stats()
+        return restored, None
+    
+    @classmethod
+    def promote_students(cls, from_level):
+        """
+        ترقية جميع طلاب مستوى معين إلى المستوى التالي
+        """
+        batch, error = cls.promote(from_level=from_level)
+        if batch is None:
+            return 0, error
+        return batch.student_count, error
+    
+    @classmethod
+    def get_stats_timeout(cls):
+        return getattr(settings, 'PROMOTION_STATS_CACHE_TIMEOUT', 60)
+    
+    @classmethod
+    def compute_promotion_stats(cls):
+        """
+        عدد الطلاب النشطين في كل مستوى باستعلام مجمع واحد (levels LEFT JOIN users)
+        والمستوى التالي يُحدد في الذاكرة
+        """
+        from accounts.models import Level
         
+        levels = list(
+            Level.objects.annotate(
+                student_count=Count('students', filter=Q(
+                    students__role__role_name=cls.STUDENT_ROLE,
+                    students__account_status='active',
+                ))
+            ).order_by('level_number')
+        )
+        by_number = {level.level_number: level for level in levels}
+        
+        return [
+            {
+                'level': level,
+                'student_count': level.student_count,
+                'next_level': by_number.get(level.level_number + 1),
+            }
+            for level in levels
+        ]
+    
+    @classmethod
+    def get_promotion_stats(cls):
+        """
+        الحصول على إحصائيات الترقية (مخزنة مؤقتاً لفترة قصيرة)
+        تُستخدم في صفحة الترقية ولوحة تحكم الأدمن
+        """
+        stats = cache.get(cls.STATS_CACHE_KEY)
+        if stats is None:
+            stats = cls.compute_promotion_stats()
+            cache.set(cls.STATS_CACHE_KEY, stats, cls.get_stats_timeout())
         return stats
+    
+    @classmethod
+    def invalidate_stats(cls):
+        cache.delete(cls.STATS_CACHE_KEY)
@@ -0,0 +1,94 @@
+"""
+التخزين المعنون بالمحتوى (Content-Addressed Storage) لملفات المحاضرات
+S-ACM - Smart Academic Content Management System
+
+كل ملف يُحفظ باسم مشتق من SHA-256 لمحتواه:
+    media/cas/{hash[:2]}/{hash[2:4]}/{hash}{ext}
+الملفات المتطابقة تشترك في نسخة واحدة على القرص، وعدد المراجع هو عدد
+صفوف LectureFile التي تشير إلى المسار نفسه.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+CAS_ROOT = 'cas'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage يحدد اسم الملف من بصمة محتواه
+
+    - الرفع المكرر لا يكتب شيئاً على القرص
+    - لا تصادم في الأسماء: الاسم المطلوب من upload_to يُتجاهل
+    - النسخ غير المرجعية تُحذف فقط عبر collect_lecture_blobs بعد مهلة سماح،
+      لا في مسار الطلب: رفع مطابق قيد التنفيذ قد يكون حصل على الاسم قبل حفظ صفه
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    @classmethod
+    def compute_hash(cls, content):
+        """حساب SHA-256 للمحتوى على أجزاء"""
+        # إن كان معالج الرفع قد حسب البصمة أثناء الاستقبال
+        digest = getattr(content, 'sha256', None)
+        if digest:
+            return digest
+
+        hasher = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(cls.CHUNK_SIZE):
+            hasher.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def hashed_name(digest, filename):
+        """المسار المجزأ المقابل للبصمة مع الإبقاء على الامتداد"""
+        suffix = Path(filename).suffix.lower()
+        return str(Path(CAS_ROOT) / digest[:2] / digest[2:4] / f'{digest}{suffix}')
+
+    @staticmethod
+    def hash_from_name(name):
+        """استخراج البصمة من اسم ملف معنون بالمحتوى، أو None للمسارات القديمة"""
+        if not name:
+            return None
+        parts = Path(name).parts
+        if len(parts) != 4 or parts[0] != CAS_ROOT:
+            return None
+        # [:64] لأن سباق رفعين متطابقين قد يضيف لاحقة للاسم
+        return Path(name).stem[:64]
+
+    def _save(self, name, content):
+        name = self.hashed_name(self.compute_hash(content), name)
+        if self.exists(name):
+            # المحتوى موجود مسبقاً: لا حاجة للكتابة، لكن تحديث وقت التعديل يبدأ
+            # مهلة السماح من جديد فلا يحذفها collect_orphans قبل حفظ صف هذا الرفع
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
+
+    def release(self, name):
+        """
+        حذف ملف قديم (خارج cas/) من القرص إذا لم يعد أي LectureFile يشير إليه
+        النسخ المعنونة لا تُحذف هنا (انظر LectureBlobService.collect_orphans)
+        يعيد True إذا تم الحذف
+        """
+        from .models import LectureFile
+
+        if not name or self.hash_from_name(name):
+            return False
+        if LectureFile.objects.filter(local_file=name).exists():
+            return False
+        self.delete(name)
+        return True
+
+
+lecture_file_storage = ContentAddressedStorage()
@@ -0,0 +1,136 @@
+"""
+معالج رفع الملفات بالتدفق (Streaming Upload Handler)
+S-ACM - Smart Academic Content Management System
+
+يتحقق من الملف أثناء استقباله بدل المرور عليه لاحقاً:
+- حساب SHA-256 (يستخدمه التخزين المعنون بالمحتوى مباشرة)
+- مطابقة البايتات الأولى (magic bytes) مع امتداد الملف
+- إيقاف الاستقبال فور تجاوز MAX_UPLOAD_SIZE
+"""
+
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+
+from .forms import get_allowed_upload_extensions
+
+
+ZIP_SIGNATURE = b'PK\x03\x04'
+# أطول ما تحتاجه دوال التحقق من بداية الملف (_is_text تفحص 4096 بايت)
+SIGNATURE_BYTES = 4096
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+
+def _is_text(head):
+    return b'\x00' not in head[:4096]
+
+
+def _is_iso_media(head):
+    # MP4 / MOV: صندوق ftyp أو moov/mdat/free/wide في البداية
+    return head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide')
+
+
+def _is_riff(kind):
+    return lambda head: head[:4] == b'RIFF' and head[8:12] == kind
+
+
+# الامتداد -> دالة تتحقق من البايتات الأولى
+MAGIC_SIGNATURES = {
+    '.pdf': lambda head: head.lstrip()[:5] == b'%PDF-',
+    '.docx': lambda head: head.startswith(ZIP_SIGNATURE),
+    '.pptx': lambda head: head.startswith(ZIP_SIGNATURE),
+    '.doc': lambda head: head.startswith(OLE_SIGNATURE),
+    '.ppt': lambda head: head.startswith(OLE_SIGNATURE),
+    '.txt': _is_text,
+    '.md': _is_text,
+    '.mp4': _is_iso_media,
+    '.mov': _is_iso_media,
+    '.webm': lambda head: head.startswith(b'\x1a\x45\xdf\xa3'),
+    '.avi': _is_riff(b'AVI '),
+    '.jpg': lambda head: head.startswith(b'\xff\xd8\xff'),
+    '.jpeg': lambda head: head.startswith(b'\xff\xd8\xff'),
+    '.png': lambda head: head.startswith(b'\x89PNG\r\n\x1a\n'),
+    '.gif': lambda head: head[:6] in (b'GIF87a', b'GIF89a'),
+    '.webp': _is_riff(b'WEBP'),
+}
+
+
+def matches_signature(extension, head):
+    """هل تطابق البايتات الأولى امتداد الملف؟ (الامتدادات غير المعروفة تُقبل)"""
+    check = MAGIC_SIGNATURES.get(extension)
+    return check is None or check(head)
+
+
+class LectureFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    معالج رفع يكتب الملف إلى ملف مؤقت مع التحقق أثناء الاستقبال
+
+    عند الرفض يُسجل سبب الخطأ في request.upload_error ويتوقف حفظ الملف؛ يُستهلك
+    بقية الطلب دون تخزين فيعرض النموذج السبب كخطأ حقل عادي. الاستثناء الوحيد
+    طلب يعلن حجماً يتجاوز الحد بوضوح: يُقطع الاتصال فوراً (connection_reset)
+    ويرى المتصفح خطأ اتصال، والملفات الكبيرة ترفع أصلاً عبر الرفع المجزأ.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = getattr(settings, 'MAX_UPLOAD_SIZE', 50 * 1024 * 1024)
+        self.allowed_extensions = get_allowed_upload_extensions()
+
+    def reject(self, message, connection_reset=False):
+        if self.request is not None:
+            self.request.upload_error = message
+        if self.file is not None:
+            self.file.close()
+        raise StopUpload(connection_reset=connection_reset)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # الحجم المعلن للطلب كله يتجاوز الحد بوضوح: لا داعي لقراءة أي بايت
+        self.request_too_large = content_length > self.max_size + 1024 * 1024
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        self.file = None
+        self.hasher = hashlib.sha256()
+        self.received = 0
+        self.extension = Path(file_name).suffix.lower()
+        self.head = b''
+        self.signature_checked = False
+
+        if self.request_too_large:
+            self.reject(
+                f'حجم الملف يتجاوز الحد المسموح ({self.max_size // (1024*1024)} MB).',
+                connection_reset=True
+            )
+        if self.allowed_extensions and self.extension not in self.allowed_extensions:
+            self.reject(f'نوع الملف غير مسموح. الأنواع المسموحة: {", ".join(self.allowed_extensions)}')
+
+        super().new_file(field_name, file_name, *args, **kwargs)
+
+    def check_signature(self):
+        self.signature_checked = True
+        if not matches_signature(self.extension, self.head):
+            self.reject('محتوى الملف لا يطابق امتداده.')
+
+    def receive_data_chunk(self, raw_data, start):
+        # الجزء الأول قد يكون أقصر من التوقيع: تجميع البداية قبل التحقق
+        if not self.signature_checked:
+            self.head += raw_data[:SIGNATURE_BYTES - len(self.head)]
+            if len(self.head) >= SIGNATURE_BYTES:
+                self.check_signature()
+
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.reject(f'حجم الملف يتجاوز الحد المسموح ({self.max_size // (1024*1024)} MB).')
+
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        # ملف أصغر من SIGNATURE_BYTES
+        if not self.signature_checked:
+            self.check_signature()
+        uploaded = super().file_complete(file_size)
+        # يُستخدم من ContentAddressedStorage.compute_hash دون قراءة الملف مجدداً
+        uploaded.sha256 = self.hasher.hexdigest()
+        return uploaded
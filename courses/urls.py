@@ -17,12 +17,15 @@ urlpatterns = [
     # File Operations
     path('files/<int:pk>/download/', views.FileDownloadView.as_view(), name='file_download'),
     path('files/<int:pk>/view/', views.FileViewView.as_view(), name='file_view'),
+    path('files/<int:pk>/stream/', views.FileStreamView.as_view(), name='file_stream'),
     
     # Instructor URLs
     path('instructor/', views.InstructorDashboardView.as_view(), name='instructor_dashboard'),
     path('instructor/courses/', views.InstructorCourseListView.as_view(), name='instructor_course_list'),
     path('instructor/courses/<int:pk>/', views.InstructorCourseDetailView.as_view(), name='instructor_course_detail'),
     path('instructor/files/upload/', views.FileUploadView.as_view(), name='file_upload'),
+    path('instructor/uploads/', views.ChunkedUploadCreateView.as_view(), name='chunked_upload_create'),
+    path('instructor/uploads/<uuid:pk>/', views.ChunkedUploadView.as_view(), name='chunked_upload'),
     path('instructor/files/<int:pk>/update/', views.FileUpdateView.as_view(), name='file_update'),
     path('instructor/files/<int:pk>/delete/', views.FileDeleteView.as_view(), name='file_delete'),
     path('instructor/files/<int:pk>/toggle-visibility/', views.FileToggleVisibilityView.as_view(), name='file_toggle_visibility'),
@@ -9,16 +9,29 @@ from django.contrib import messages
 from django.views import View
 from django.views.generic import TemplateView, ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse, HttpResponse, FileResponse
-from django.db.models import Q, Count
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from pathlib import Path
+import base64
+import binascii
 import mimetypes
 
-from .models import Course, CourseMajor, InstructorCourse, LectureFile
-from .forms import CourseForm, LectureFileForm, CourseMajorFormSet
-from accounts.models import User, UserActivity, Major, Level, Semester
+from .models import Course, CourseMajor, InstructorCourse, LectureFile, UploadSession
+from .forms import CourseForm, LectureFileForm, CourseMajorFormSet, UploadSessionForm
+from .services import (
+    get_file_delivery_backend, is_new_download, ArchiveService,
+    ChunkedUploadService, CourseFileCache, DerivativeService,
+    InstructorAnalyticsService, CourseAudienceService, StudentCatalogCache,
+)
+from .uploadhandlers import LectureFileUploadHandler
+from accounts.models import User, Major, Level, Semester
+from accounts.services import ActivityLogger
 from accounts.views import AdminRequiredMixin, InstructorRequiredMixin, StudentRequiredMixin
 from notifications.models import NotificationManager
 from core.models import AuditLog
@@ -34,22 +47,28 @@ class StudentDashboardView(LoginRequiredMixin, StudentRequiredMixin, TemplateVie
         context = super().get_context_data(**kwargs)
         student = self.request.user
         
-        # المقررات الحالية
-        context['current_courses'] = Course.objects.get_current_courses_for_student(student)
-        
-        # المقررات المؤرشفة
-        context['archived_courses'] = Course.objects.get_archived_courses_for_student(student)
+        # المقررات الحالية والمؤرشفة (مخزنة مؤقتاً لكل دفعة)
+        catalog = StudentCatalogCache.get_catalog(student)
+        context['current_courses'] = catalog['current']
+        context['archived_courses'] = catalog['archived']
         
         # الإشعارات غير المقروءة
         from notifications.models import NotificationManager
         context['unread_notifications'] = NotificationManager.get_unread_count(student)
         
         # آخر الملفات المرفوعة
+        course_ids = [course.pk for course in catalog['current']]
         context['recent_files'] = LectureFile.objects.filter(
-            course__in=context['current_courses'],
+            course_id__in=course_ids,
             is_visible=True,
             is_deleted=False
-        ).order_by('-upload_date')[:5]
+        ).select_related('course').order_by('-upload_date')[:5]
+        
+        # أجزاء القالب المشتركة بين طلاب الدفعة: تُعرض مرة واحدة لكل دفعة
+        # ولكل نسخة من ملفات مقرراتها (الاستعلام أعلاه كسول لا يُنفذ عند وجودها)
+        context['cohort_key'] = StudentCatalogCache.get_cohort_key(student)
+        context['files_version'] = ':'.join(map(str, CourseFileCache.get_versions(course_ids)))
+        context['dashboard_cache_timeout'] = CourseFileCache.get_timeout()
         
         return context
 
@@ -63,13 +82,16 @@ class StudentCourseListView(LoginRequiredMixin, StudentRequiredMixin, ListView):
         student = self.request.user
         view_type = self.request.GET.get('view', 'current')
         
+        self.catalog = StudentCatalogCache.get_catalog(student)
         if view_type == 'archived':
-            return Course.objects.get_archived_courses_for_student(student)
-        return Course.objects.get_current_courses_for_student(student)
+            return self.catalog['archived']
+        return self.catalog['current']
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['view_type'] = self.request.GET.get('view', 'current')
+        context['current_courses'] = self.catalog['current']
+        context['archived_courses'] = self.catalog['archived']
         return context
 
 
@@ -79,18 +101,37 @@ class StudentCourseDetailView(LoginRequiredMixin, StudentRequiredMixin, DetailVi
     template_name = 'student_panel/courses/detail.html'
     context_object_name = 'course'
     
+    # قيمة ?type= في القالب -> اسم المجموعة
+    TYPE_FILTERS = {
+        'lecture': 'lectures',
+        'summary': 'summaries',
+        'exam': 'exams',
+        'assignment': 'assignments',
+        'reference': 'references',
+        'other': 'others',
+    }
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         course = self.object
         
-        # الملفات حسب النوع
-        files = course.files.filter(is_visible=True, is_deleted=False)
-        context['lectures'] = files.filter(file_type='Lecture')
-        context['summaries'] = files.filter(file_type='Summary')
-        context['exams'] = files.filter(file_type='Exam')
-        context['assignments'] = files.filter(file_type='Assignment')
-        context['references'] = files.filter(file_type='Reference')
-        context['others'] = files.filter(file_type='Other')
+        file_type = self.request.GET.get('type', '')
+        if file_type not in self.TYPE_FILTERS:
+            file_type = ''
+        
+        # الملفات حسب النوع: استعلام واحد عند الحاجة فقط
+        # (القالب يخزن الجزء المعروض حسب نسخة الملفات، فلا استعلام عند وجوده)
+        file_groups = SimpleLazyObject(lambda: CourseFileCache.get_file_groups(course))
+        for name in CourseFileCache.GROUPS:
+            context[name] = SimpleLazyObject(lambda name=name: file_groups[name])
+        context['all_files'] = SimpleLazyObject(lambda: file_groups['all'])
+        context['files'] = SimpleLazyObject(
+            lambda: file_groups[self.TYPE_FILTERS.get(file_type, 'all')]
+        )
+        context['file_type'] = file_type
+        context['files_version'] = CourseFileCache.get_version(course.pk)
+        context['files_cache_timeout'] = CourseFileCache.get_timeout()
+        context['is_archived'] = ArchiveService.is_archived_for_student(course, self.request.user)
         
         # المدرسين
         context['instructors'] = course.instructor_courses.select_related('instructor')
@@ -112,35 +153,55 @@ class FileDownloadView(LoginRequiredMixin, View):
                 messages.error(request, 'هذا الملف غير متاح حالياً.')
                 return redirect('courses:student_course_detail', pk=file_obj.course.pk)
         
-        # زيادة عداد التحميل
-        file_obj.increment_download()
-        
-        # تسجيل النشاط
-        UserActivity.objects.create(
-            user=user,
-            activity_type='download',
-            description=f'تحميل ملف: {file_obj.title}',
-            file_id=file_obj.id,
-            ip_address=request.META.get('REMOTE_ADDR')
-        )
-        
         # إذا كان رابط خارجي
         if file_obj.content_type == 'external_link':
-            return redirect(file_obj.external_link)
-        
+            response = redirect(file_obj.external_link)
         # إذا كان ملف محلي
-        if file_obj.local_file:
-            file_path = file_obj.local_file.path
-            content_type, _ = mimetypes.guess_type(file_path)
-            response = FileResponse(
-                open(file_path, 'rb'),
-                content_type=content_type or 'application/octet-stream'
+        elif file_obj.local_file:
+            response = get_file_delivery_backend().serve(request, file_obj, as_attachment=True)
+        else:
+            messages.error(request, 'الملف غير موجود.')
+            return redirect('courses:student_dashboard')
+        
+        # طلبات الاستئناف (Range) وردود 304 لا تُحتسب تحميلاً جديداً
+        if is_new_download(response):
+            file_obj.increment_download()
+            
+            # تسجيل النشاط
+            ActivityLogger.log(
+                user=user,
+                activity_type='download',
+                description=f'تحميل ملف: {file_obj.title}',
+                file_id=file_obj.id,
+                ip_address=request.META.get('REMOTE_ADDR')
             )
-            response['Content-Disposition'] = f'attachment; filename="{Path(file_path).name}"'
-            return response
         
-        messages.error(request, 'الملف غير موجود.')
-        return redirect('courses:student_dashboard')
+        return response
+
+
+class FileStreamView(LoginRequiredMixin, View):
+    """
+    بث الملف للعرض داخل المتصفح (PDF / فيديو)
+    يدعم Range لتمكين التقديم في الفيديو وتحميل صفحات PDF عند الطلب
+    """
+    
+    def get(self, request, pk):
+        file_obj = get_object_or_404(
+            LectureFile, pk=pk, is_deleted=False, content_type='local_file'
+        )
+        
+        if request.user.is_student() and not file_obj.is_visible:
+            raise Http404
+        
+        if not file_obj.local_file:
+            raise Http404
+        
+        # نسخة PDF الخطية إن وُلدت: تظهر الصفحة الأولى قبل اكتمال التحميل
+        name = None
+        if file_obj.is_pdf():
+            name = DerivativeService.get_existing_name(file_obj.content_hash, 'web_pdf')
+        
+        return get_file_delivery_backend().serve(request, file_obj, as_attachment=False, name=name)
 
 
 class FileViewView(LoginRequiredMixin, View):
@@ -153,7 +214,7 @@ class FileViewView(LoginRequiredMixin, View):
         file_obj.increment_view()
         
         # تسجيل النشاط
-        UserActivity.objects.create(
+        ActivityLogger.log(
             user=request.user,
             activity_type='view',
             description=f'عرض ملف: {file_obj.title}',
@@ -179,19 +240,30 @@ class InstructorDashboardView(LoginRequiredMixin, InstructorRequiredMixin, Templ
         context = super().get_context_data(**kwargs)
         instructor = self.request.user
         
-        # المقررات المعينة
-        context['my_courses'] = Course.objects.get_courses_for_instructor(instructor)
+        # المقررات المعينة مع إجماليات كل مقرر (استعلام مجمع واحد، مخزن مؤقتاً)
+        summary = InstructorAnalyticsService.get_instructor_summary(instructor)
+        my_courses = list(Course.objects.get_courses_for_instructor(instructor))
+        for course in my_courses:
+            course.stats = summary['courses'].get(course.pk, {})
+        context['my_courses'] = my_courses
         
         # إحصائيات
-        context['total_files'] = LectureFile.objects.filter(
-            uploader=instructor,
-            is_deleted=False
-        ).count()
-        
-        context['total_downloads'] = LectureFile.objects.filter(
-            uploader=instructor,
-            is_deleted=False
-        ).aggregate(total=Count('download_count'))['total'] or 0
+        context['total_files'] = summary['uploads']['files']
+        context['total_downloads'] = summary['uploads']['downloads']
+        context['total_views'] = summary['uploads']['views']
+        
+        # التفاعل اليومي مع ملفات المقررات
+        trends = InstructorAnalyticsService.get_trends(instructor)
+        peak = max((max(day['download'], day['view']) for day in trends), default=0)
+        context['trends'] = [
+            {
+                **day,
+                'download_pct': round(100 * day['download'] / peak) if peak else 0,
+                'view_pct': round(100 * day['view'] / peak) if peak else 0,
+            }
+            for day in trends
+        ]
+        context['trend_days'] = len(trends)
         
         # آخر الملفات المرفوعة
         context['recent_uploads'] = LectureFile.objects.filter(
@@ -231,21 +303,44 @@ class InstructorCourseDetailView(LoginRequiredMixin, InstructorRequiredMixin, De
         context['hidden_files'] = files.filter(is_visible=False)
         
         # إحصائيات
-        context['total_downloads'] = sum(f.download_count for f in files)
-        context['total_views'] = sum(f.view_count for f in files)
+        totals = InstructorAnalyticsService.get_course_totals(course.pk)
+        context['total_downloads'] = totals['downloads']
+        context['total_views'] = totals['views']
         
         # عدد الطلاب
-        context['students_count'] = User.objects.filter(
-            role__role_name='Student',
-            major__in=course.course_majors.values_list('major', flat=True),
-            level=course.level,
-            account_status='active'
-        ).count()
+        context['students_count'] = CourseAudienceService.get_students_count(course)
         
         return context
 
 
-class FileUploadView(LoginRequiredMixin, InstructorRequiredMixin, CreateView):
+class StreamingUploadMixin:
+    """
+    تثبيت LectureFileUploadHandler قبل قراءة جسم الطلب
+    
+    CsrfViewMiddleware يقرأ request.POST قبل الـ View، لذلك يُعفى dispatch
+    ويُطبق التحقق من CSRF بعد تبديل معالجات الرفع (نمط توثيق Django)
+    يجب أن يأتي أولاً في الوراثة ليُنسخ csrf_exempt إلى الـ View
+    """
+    
+    @method_decorator(csrf_exempt)
+    def dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+    
+    def post(self, request, *args, **kwargs):
+        request.upload_handlers = [LectureFileUploadHandler(request)]
+        return self.protected_post(request, *args, **kwargs)
+    
+    @method_decorator(csrf_protect)
+    def protected_post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+    
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['upload_error'] = getattr(self.request, 'upload_error', None)
+        return kwargs
+
+
+class FileUploadView(StreamingUploadMixin, LoginRequiredMixin, InstructorRequiredMixin, CreateView):
     """رفع ملف جديد"""
     model = LectureFile
     form_class = LectureFileForm
@@ -261,27 +356,14 @@ class FileUploadView(LoginRequiredMixin, InstructorRequiredMixin, CreateView):
         course_id = self.request.GET.get('course')
         if course_id:
             context['selected_course'] = get_object_or_404(Course, pk=course_id)
+        context['chunk_size'] = ChunkedUploadService.get_chunk_size()
         return context
     
     def form_valid(self, form):
         form.instance.uploader = self.request.user
         response = super().form_valid(form)
         
-        # تسجيل النشاط
-        UserActivity.objects.create(
-            user=self.request.user,
-            activity_type='upload',
-            description=f'رفع ملف: {self.object.title}',
-            file_id=self.object.id,
-            ip_address=self.request.META.get('REMOTE_ADDR')
-        )
-        
-        # إرسال إشعار للطلاب
-        if self.object.is_visible:
-            NotificationManager.create_file_upload_notification(
-                self.object,
-                self.object.course
-            )
+        record_file_upload(self.request, self.object)
         
         messages.success(self.request, f'تم رفع الملف "{self.object.title}" بنجاح.')
         return response
@@ -290,7 +372,169 @@ class FileUploadView(LoginRequiredMixin, InstructorRequiredMixin, CreateView):
         return reverse('courses:instructor_course_detail', kwargs={'pk': self.object.course.pk})
 
 
-class FileUpdateView(LoginRequiredMixin, InstructorRequiredMixin, UpdateView):
+def record_file_upload(request, file_obj):
+    """تسجيل النشاط وجدولة إشعار الطلاب بعد رفع ملف"""
+    ActivityLogger.log(
+        user=request.user,
+        activity_type='upload',
+        description=f'رفع ملف: {file_obj.title}',
+        file_id=file_obj.id,
+        ip_address=request.META.get('REMOTE_ADDR')
+    )
+    
+    # إرسال إشعار للطلاب
+    if file_obj.is_visible:
+        NotificationManager.queue_file_upload_notification(file_obj, file_obj.course)
+
+
+class ChunkedUploadCreateView(LoginRequiredMixin, InstructorRequiredMixin, View):
+    """
+    بدء جلسة رفع مجزأ
+    POST: البيانات الوصفية + filename + total_size + checksum (اختياري)
+    """
+    
+    def post(self, request):
+        form = UploadSessionForm(request.POST, user=request.user)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        
+        form.instance.uploader = request.user
+        session = form.save()
+        url = reverse('courses:chunked_upload', kwargs={'pk': session.pk})
+        
+        response = JsonResponse({
+            'id': str(session.pk),
+            'url': url,
+            'offset': 0,
+            'chunk_size': ChunkedUploadService.get_chunk_size(),
+        }, status=201)
+        response['Location'] = url
+        return response
+
+
+class ChunkedUploadView(LoginRequiredMixin, InstructorRequiredMixin, View):
+    """
+    نقطة استقبال الأجزاء
+    HEAD/GET: الإزاحة الحالية للاستئناف (410 للجلسة المكتملة أو الملغاة)
+    PATCH: جزء جديد (ترويسة Upload-Offset، واختيارياً Upload-Checksum: sha256 <base64>)
+    DELETE: إلغاء الرفع
+    """
+    
+    def get_session(self, pk, for_update=False):
+        queryset = UploadSession.objects.filter(uploader=self.request.user)
+        if for_update:
+            queryset = queryset.select_for_update()
+        return get_object_or_404(queryset, pk=pk)
+    
+    def session_response(self, session, status=200, **extra):
+        data = {
+            'id': str(session.pk),
+            'status': session.status,
+            'offset': session.offset,
+            'total_size': session.total_size,
+        }
+        data.update(extra)
+        response = JsonResponse(data, status=status)
+        response['Upload-Offset'] = str(session.offset)
+        response['Upload-Length'] = str(session.total_size)
+        response['Cache-Control'] = 'no-store'
+        return response
+    
+    def completed_response(self, session, status=200):
+        return self.session_response(
+            session,
+            status=status,
+            file_id=session.lecture_file_id,
+            redirect_url=reverse('courses:instructor_course_detail', kwargs={'pk': session.course_id}),
+        )
+    
+    def get(self, request, pk):
+        # الجلسة المكتملة أو الملغاة لا تُستأنف: 410 كي لا يعيد العميل الرفع إليها
+        session = self.get_session(pk)
+        if session.status == 'completed':
+            return self.completed_response(session, status=410)
+        if session.status != 'uploading':
+            return self.session_response(session, status=410, error='تم إلغاء جلسة الرفع.')
+        return self.session_response(session)
+    
+    def head(self, request, pk):
+        response = self.get(request, pk)
+        response.content = b''
+        return response
+    
+    def check_chunk(self, session, offset, length):
+        """استجابة الخطأ إن كان الجزء لا يُقبل عند الحالة الحالية للجلسة، وإلا None"""
+        if session.status == 'completed':
+            return self.completed_response(session)
+        if session.status != 'uploading':
+            return JsonResponse({'error': 'تم إلغاء جلسة الرفع.'}, status=410)
+        if offset != session.offset:
+            return self.session_response(session, status=409)
+        if length <= 0 or length > ChunkedUploadService.get_chunk_size():
+            return JsonResponse({'error': 'حجم الجزء غير صالح.'}, status=413)
+        if offset + length > session.total_size:
+            return JsonResponse({'error': 'الجزء يتجاوز حجم الملف المعلن.'}, status=413)
+        return None
+    
+    def patch(self, request, pk):
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return JsonResponse({'error': 'ترويسة Upload-Offset غير صالحة.'}, status=400)
+        
+        chunk_checksum = None
+        checksum_header = request.headers.get('Upload-Checksum')
+        if checksum_header:
+            algorithm, _, value = checksum_header.partition(' ')
+            try:
+                if algorithm.lower() != 'sha256':
+                    raise ValueError
+                chunk_checksum = base64.b64decode(value, validate=True).hex()
+            except (ValueError, binascii.Error):
+                return JsonResponse({'error': 'ترويسة Upload-Checksum غير مدعومة.'}, status=400)
+        
+        # التحقق المبدئي واستلام الجزء دون قفل: العميل البطيء لا يحجز صف الجلسة
+        session = self.get_session(pk)
+        error_response = self.check_chunk(session, offset, length)
+        if error_response:
+            return error_response
+        
+        chunk_path, error = ChunkedUploadService.receive_chunk(
+            session, request, offset, length, chunk_checksum=chunk_checksum
+        )
+        if error:
+            return self.session_response(session, status=400, error=error)
+        
+        with transaction.atomic():
+            session = self.get_session(pk, for_update=True)
+            # قد يكون طلب متزامن قد قدّم الإزاحة أو ألغى الجلسة أثناء الاستلام
+            error_response = self.check_chunk(session, offset, length)
+            if error_response:
+                chunk_path.unlink(missing_ok=True)
+                return error_response
+            
+            ChunkedUploadService.commit_chunk(session, chunk_path)
+            if not session.is_complete:
+                return self.session_response(session)
+            
+            file_obj, error = ChunkedUploadService.complete(session)
+            if error:
+                return self.session_response(session, status=422, error=error)
+        
+        record_file_upload(request, file_obj)
+        messages.success(request, f'تم رفع الملف "{file_obj.title}" بنجاح.')
+        return self.completed_response(session)
+    
+    def delete(self, request, pk):
+        with transaction.atomic():
+            session = self.get_session(pk, for_update=True)
+            if session.status == 'uploading':
+                ChunkedUploadService.abort(session)
+        return HttpResponse(status=204)
+
+
+class FileUpdateView(StreamingUploadMixin, LoginRequiredMixin, InstructorRequiredMixin, UpdateView):
     """تحديث ملف"""
     model = LectureFile
     form_class = LectureFileForm
@@ -349,7 +593,7 @@ class FileToggleVisibilityView(LoginRequiredMixin, InstructorRequiredMixin, View
         
         # إرسال إشعار إذا أصبح مرئياً
         if file_obj.is_visible:
-            NotificationManager.create_file_upload_notification(
+            NotificationManager.queue_file_upload_notification(
                 file_obj,
                 file_obj.course
             )
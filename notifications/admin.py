@@ -3,7 +3,7 @@
 """
 
 from django.contrib import admin
-from .models import Notification, NotificationRecipient
+from .models import Notification, NotificationRecipient, NotificationArchive, FileNotificationJob, EmailDelivery
 
 
 class NotificationRecipientInline(admin.TabularInline):
@@ -71,3 +71,41 @@ class NotificationRecipientAdmin(admin.ModelAdmin):
         queryset.update(is_read=False, read_at=None)
         self.message_user(request, f"تم تحديد {queryset.count()} إشعار/إشعارات كغير مقروءة")
     mark_as_unread.short_description = "تحديد كغير مقروء"
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ['title', 'notification_type', 'course', 'recipients_count', 'read_count', 'created_at', 'archived_at']
+    list_filter = ['notification_type', 'priority', 'archived_at']
+    search_fields = ['title']
+    readonly_fields = [f.name for f in NotificationArchive._meta.fields]
+    date_hierarchy = 'created_at'
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(FileNotificationJob)
+class FileNotificationJobAdmin(admin.ModelAdmin):
+    list_display = ['file', 'course', 'uploader', 'event', 'status', 'attempts', 'created_at', 'processed_at']
+    list_filter = ['status', 'event', 'created_at']
+    search_fields = ['file__title', 'course__course_code', 'uploader__full_name']
+    readonly_fields = ['course', 'uploader', 'file', 'event', 'attempts', 'last_error', 'created_at', 'processed_at', 'notification']
+    
+    actions = ['retry_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        count = queryset.filter(status='failed').update(status='pending', attempts=0, last_error=None)
+        self.message_user(request, f"تمت إعادة {count} مهمة/مهام إلى الطابور")
+    retry_jobs.short_description = "إعادة المهام الفاشلة إلى الطابور"
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(EmailDelivery)
+class EmailDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['recipient__user__full_name', 'recipient__user__email', 'recipient__notification__title']
+    readonly_fields = ['recipient', 'attempts', 'last_error', 'claimed_at', 'sent_at', 'created_at']
@@ -0,0 +1,68 @@
+"""
+Management Command لقياس أداء قناة البريد للإشعارات
+S-ACM - Smart Academic Content Management System
+"""
+
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+
+from notifications.services import NotificationEmailService
+
+
+class Command(BaseCommand):
+    help = 'مقارنة الإرسال باتصال لكل رسالة مع الإرسال على دفعات عبر اتصال واحد'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=1000,
+            help='عدد الرسائل المرسلة في كل تجربة'
+        )
+        parser.add_argument(
+            '--backend',
+            default='django.core.mail.backends.locmem.EmailBackend',
+            help='واجهة البريد المستخدمة (locmem أو console)'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        backend = options['backend']
+        batch_size = NotificationEmailService.get_batch_size()
+        
+        messages = [
+            EmailMessage(
+                subject=f'[S-ACM] إشعار تجريبي {i}',
+                body='نص الإشعار',
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[f'student{i}@example.com']
+            )
+            for i in range(count)
+        ]
+        
+        self.stdout.write(f'جاري قياس الأداء ({count} رسالة، {backend})...\n')
+        
+        # اتصال جديد لكل رسالة (السلوك الحالي لـ send_mail)
+        started = time.monotonic()
+        for message in messages:
+            connection = get_connection(backend)
+            connection.send_messages([message])
+        per_message = time.monotonic() - started
+        
+        # اتصال واحد ودفعات send_messages
+        started = time.monotonic()
+        connection = get_connection(backend)
+        connection.open()
+        try:
+            for i in range(0, count, batch_size):
+                NotificationEmailService.send_batch(messages[i:i + batch_size], connection)
+        finally:
+            connection.close()
+        batched = time.monotonic() - started
+        
+        self.stdout.write(f'  - اتصال لكل رسالة: {count / per_message:.0f} رسالة/ثانية')
+        self.stdout.write(f'  - دفعات من {batch_size} عبر اتصال واحد: {count / batched:.0f} رسالة/ثانية')
+        self.stdout.write(self.style.SUCCESS('\n✓ اكتمل القياس.'))
@@ -0,0 +1,65 @@
+"""
+Management Command لتنظيف الإشعارات القديمة والمنتهية
+S-ACM - Smart Academic Content Management System
+"""
+
+from django.core.management.base import BaseCommand
+
+from notifications.services import NotificationRetentionService
+
+
+class Command(BaseCommand):
+    help = 'حذف الإشعارات المنتهية والقديمة وسجلات مستلميها على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='مدة الاحتفاظ بالأيام (الافتراضي: NOTIFICATION_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='عدد الصفوف المحذوفة في كل معاملة (الافتراضي: NOTIFICATION_PURGE_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help='حفظ ملخص إحصائي لكل إشعار قبل حذفه'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='عرض عدد الصفوف المستهدفة دون حذف'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            days = NotificationRetentionService.get_retention_days()
+        
+        self.stdout.write(f'جاري تنظيف الإشعارات (مدة الاحتفاظ: {days} يوم)...\n')
+        
+        stats = NotificationRetentionService.purge(
+            days=days,
+            batch_size=options['batch_size'],
+            archive=options['archive'],
+            dry_run=options['dry_run']
+        )
+        
+        if options['dry_run']:
+            self.stdout.write(f'  - إشعارات مستهدفة: {stats["notifications"]}')
+            self.stdout.write(f'  - سجلات مستلمين مستهدفة: {stats["recipients"]}')
+            return
+        
+        self.stdout.write(f'  - إشعارات محذوفة: {stats["notifications"]}')
+        self.stdout.write(f'  - سجلات مستلمين محذوفة: {stats["recipients"]}')
+        if options['archive']:
+            self.stdout.write(f'  - إشعارات مؤرشفة: {stats["archived"]}')
+        self.stdout.write(
+            f'  - الزمن: {stats["elapsed"]:.2f} ثانية ({stats["rows_per_second"]:.0f} صف/ثانية)'
+        )
+        
+        self.stdout.write(self.style.SUCCESS('\n✓ تم تنظيف الإشعارات بنجاح!'))
@@ -0,0 +1,76 @@
+"""
+Management Command لمعالجة طابور إشعارات الملفات
+S-ACM - Smart Academic Content Management System
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notifications.services import FileNotificationDigestService, NotificationEmailService
+
+
+class Command(BaseCommand):
+    help = 'معالجة طابور إشعارات الملفات وإرسال رسائل البريد للإشعارات العاجلة'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='معالجة المهام المستحقة مرة واحدة ثم الخروج'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_WORKER_INTERVAL', 10),
+            help='الفاصل الزمني بين دورات المعالجة بالثواني'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='عرض مقاييس الطابور فقط'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+        
+        if options['once']:
+            self.run_cycle()
+            return
+        
+        self.stdout.write(f'بدء معالج الإشعارات (كل {options["interval"]} ثانية)...')
+        try:
+            while True:
+                self.run_cycle()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\nتم إيقاف معالج الإشعارات.')
+
+    def run_cycle(self):
+        created = FileNotificationDigestService.flush_due()
+        if created:
+            self.stdout.write(self.style.SUCCESS(f'✓ تم إرسال {created} إشعار/إشعارات.'))
+        
+        try:
+            stats = NotificationEmailService.send_pending()
+        except Exception as e:
+            self.stderr.write(f'تعذر الاتصال بخادم البريد: {e}')
+            return
+        if stats['sent'] or stats['retrying'] or stats['failed']:
+            self.stdout.write(
+                f'  - بريد: {stats["sent"]} مرسلة، {stats["retrying"]} ستُعاد محاولتها، '
+                f'{stats["failed"]} فاشلة '
+                f'({stats["messages_per_second"]:.1f} رسالة/ثانية)'
+            )
+
+    def print_stats(self):
+        stats = FileNotificationDigestService.get_queue_stats()
+        self.stdout.write(f'  - مهام معلقة: {stats["pending"]}')
+        self.stdout.write(f'  - مهام فاشلة: {stats["failed"]}')
+        self.stdout.write(f'  - عمر أقدم مهمة معلقة: {stats["oldest_pending_age"]:.0f} ثانية')
+        self.stdout.write(f'  - مهام معالجة خلال الساعة: {stats["processed_last_hour"]}')
+        self.stdout.write(f'  - متوسط التأخر: {stats["avg_lag_last_hour"]:.1f} ثانية')
+        self.stdout.write(f'  - أقصى تأخر: {stats["max_lag_last_hour"]:.1f} ثانية')
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:23
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_notification_created_at(apps, schema_editor):
+    """نسخ وقت الإشعار إلى سجلات المستلمين الموجودة"""
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationRecipient = apps.get_model('notifications', 'NotificationRecipient')
+    NotificationRecipient.objects.update(
+        created_at=models.Subquery(
+            Notification.objects.filter(pk=models.OuterRef('notification_id')).values('created_at')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationrecipient',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ الاستلام'),
+        ),
+        migrations.RunPython(copy_notification_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['-created_at', '-id'], name='notificatio_created_3298c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecipient',
+            index=models.Index(fields=['user', 'is_deleted', '-created_at', '-id'], name='notificatio_user_id_7fc3a9_idx'),
+        ),
+    ]
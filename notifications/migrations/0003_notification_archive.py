@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        ('notifications', '0002_recipient_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True, verbose_name='معرف الإشعار الأصلي')),
+                ('title', models.CharField(max_length=255, verbose_name='عنوان الإشعار')),
+                ('notification_type', models.CharField(choices=[('general', 'إشعار عام'), ('course', 'إشعار مقرر'), ('file_upload', 'رفع ملف جديد'), ('announcement', 'إعلان'), ('system', 'إشعار نظام')], max_length=20, verbose_name='نوع الإشعار')),
+                ('priority', models.CharField(choices=[('low', 'منخفضة'), ('normal', 'عادية'), ('high', 'عالية'), ('urgent', 'عاجلة')], max_length=10, verbose_name='الأولوية')),
+                ('sender_id', models.BigIntegerField(blank=True, null=True, verbose_name='معرف المرسل')),
+                ('recipients_count', models.PositiveIntegerField(default=0, verbose_name='عدد المستلمين')),
+                ('read_count', models.PositiveIntegerField(default=0, verbose_name='عدد القراء')),
+                ('created_at', models.DateTimeField(verbose_name='تاريخ الإنشاء')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ انتهاء الصلاحية')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الأرشفة')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_notifications', to='courses.course', verbose_name='المقرر المرتبط')),
+            ],
+            options={
+                'verbose_name': 'إشعار مؤرشف',
+                'verbose_name_plural': 'الإشعارات المؤرشفة',
+                'db_table': 'notification_archives',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='notificatio_created_413971_idx'), models.Index(fields=['course'], name='notificatio_course__d7ec5a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        ('notifications', '0003_notification_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileNotificationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإضافة')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ المعالجة')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_notification_jobs', to='courses.course', verbose_name='المقرر')),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_jobs', to='courses.lecturefile', verbose_name='الملف')),
+                ('notification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='file_jobs', to='notifications.notification', verbose_name='الإشعار الناتج')),
+                ('uploader', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='file_notification_jobs', to=settings.AUTH_USER_MODEL, verbose_name='رافع الملف')),
+            ],
+            options={
+                'verbose_name': 'مهمة إشعار ملف',
+                'verbose_name_plural': 'مهام إشعارات الملفات',
+                'db_table': 'file_notification_jobs',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['processed_at', 'course', 'uploader'], name='file_notifi_process_9f145c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_processed_and_dedupe(apps, schema_editor):
+    """تحديث حالة المهام المعالجة وحذف المهام المكررة لنفس الملف"""
+    FileNotificationJob = apps.get_model('notifications', 'FileNotificationJob')
+    FileNotificationJob.objects.filter(processed_at__isnull=False).update(status='done')
+    
+    keep_ids = FileNotificationJob.objects.values('file_id').annotate(
+        first_id=models.Min('id')
+    ).values('first_id')
+    FileNotificationJob.objects.exclude(id__in=keep_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        ('notifications', '0004_file_notification_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='filenotificationjob',
+            name='file_notifi_process_9f145c_idx',
+        ),
+        migrations.AddField(
+            model_name='filenotificationjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات'),
+        ),
+        migrations.AddField(
+            model_name='filenotificationjob',
+            name='event',
+            field=models.CharField(choices=[('file_upload', 'نشر ملف جديد')], default='file_upload', max_length=20, verbose_name='الحدث'),
+        ),
+        migrations.AddField(
+            model_name='filenotificationjob',
+            name='last_error',
+            field=models.TextField(blank=True, null=True, verbose_name='آخر خطأ'),
+        ),
+        migrations.AddField(
+            model_name='filenotificationjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'قيد الانتظار'), ('done', 'تمت المعالجة'), ('failed', 'فشلت')], default='pending', max_length=10, verbose_name='الحالة'),
+        ),
+        migrations.RunPython(mark_processed_and_dedupe, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='filenotificationjob',
+            unique_together={('file', 'event')},
+        ),
+        migrations.AddIndex(
+            model_name='filenotificationjob',
+            index=models.Index(fields=['status', 'course', 'uploader'], name='file_notifi_status_134b20_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filenotificationjob',
+            index=models.Index(fields=['status', 'created_at'], name='file_notifi_status_292d07_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_file_notification_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'قيد الانتظار'), ('sent', 'تم الإرسال'), ('failed', 'فشل')], default='pending', max_length=10, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='آخر خطأ')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='موعد المحاولة التالية')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت الإرسال')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('recipient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='email_delivery', to='notifications.notificationrecipient', verbose_name='المستلم')),
+            ],
+            options={
+                'verbose_name': 'رسالة بريد إشعار',
+                'verbose_name_plural': 'رسائل بريد الإشعارات',
+                'db_table': 'email_deliveries',
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='email_deliv_status_352c7d_idx')],
+            },
+        ),
+    ]
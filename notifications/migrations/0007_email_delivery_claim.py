@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_email_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emaildelivery',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='وقت حجز الرسالة للإرسال'),
+        ),
+        migrations.AlterField(
+            model_name='emaildelivery',
+            name='status',
+            field=models.CharField(choices=[('pending', 'قيد الانتظار'), ('sending', 'قيد الإرسال'), ('sent', 'تم الإرسال'), ('failed', 'فشل')], default='pending', max_length=10, verbose_name='الحالة'),
+        ),
+    ]
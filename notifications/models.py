@@ -5,6 +5,7 @@ S-ACM - Smart Academic Content Management System
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class Notification(models.Model):
@@ -93,6 +94,7 @@ class Notification(models.Model):
             models.Index(fields=['notification_type']),
             models.Index(fields=['created_at']),
             models.Index(fields=['course']),
+            models.Index(fields=['-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -137,6 +139,11 @@ class NotificationRecipient(models.Model):
         verbose_name='محذوف',
         help_text='حذف الإشعار من قائمة المستخدم فقط'
     )
+    # نسخة من وقت الإشعار لترقيم صندوق الوارد بالمؤشر دون JOIN
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='تاريخ الاستلام'
+    )
     
     class Meta:
         db_table = 'notification_recipients'
@@ -146,6 +153,7 @@ class NotificationRecipient(models.Model):
         indexes = [
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['user', 'is_deleted']),
+            models.Index(fields=['user', 'is_deleted', '-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -153,13 +161,254 @@ class NotificationRecipient(models.Model):
     
     def mark_as_read(self):
         """تحديد الإشعار كمقروء"""
-        from django.utils import timezone
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
             self.save(update_fields=['is_read', 'read_at'])
 
 
+class NotificationArchive(models.Model):
+    """
+    جدول أرشيف الإشعارات (Notification_Archives)
+    يحفظ ملخصاً إحصائياً للإشعار قبل حذفه بواسطة مهمة التنظيف
+    """
+    original_id = models.BigIntegerField(
+        unique=True,
+        verbose_name='معرف الإشعار الأصلي'
+    )
+    title = models.CharField(
+        max_length=255,
+        verbose_name='عنوان الإشعار'
+    )
+    notification_type = models.CharField(
+        max_length=20,
+        choices=Notification.NOTIFICATION_TYPES,
+        verbose_name='نوع الإشعار'
+    )
+    priority = models.CharField(
+        max_length=10,
+        choices=Notification.PRIORITY_CHOICES,
+        verbose_name='الأولوية'
+    )
+    course = models.ForeignKey(
+        'courses.Course',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_notifications',
+        verbose_name='المقرر المرتبط'
+    )
+    sender_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='معرف المرسل'
+    )
+    recipients_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد المستلمين'
+    )
+    read_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد القراء'
+    )
+    created_at = models.DateTimeField(
+        verbose_name='تاريخ الإنشاء'
+    )
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ انتهاء الصلاحية'
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الأرشفة'
+    )
+    
+    class Meta:
+        db_table = 'notification_archives'
+        verbose_name = 'إشعار مؤرشف'
+        verbose_name_plural = 'الإشعارات المؤرشفة'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['course']),
+        ]
+    
+    def __str__(self):
+        return self.title
+
+
+class FileNotificationJob(models.Model):
+    """
+    جدول مهام إشعارات الملفات (File_Notification_Jobs)
+    طابور دائم لإشعارات الملفات تعالجه مهمة run_notification_worker
+    خارج مسار الطلب، مع دمج الرفعات لكل (مقرر، رافع)
+    """
+    EVENT_CHOICES = [
+        ('file_upload', 'نشر ملف جديد'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'قيد الانتظار'),
+        ('done', 'تمت المعالجة'),
+        ('failed', 'فشلت'),
+    ]
+    
+    course = models.ForeignKey(
+        'courses.Course',
+        on_delete=models.CASCADE,
+        related_name='file_notification_jobs',
+        verbose_name='المقرر'
+    )
+    uploader = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='file_notification_jobs',
+        verbose_name='رافع الملف'
+    )
+    file = models.ForeignKey(
+        'courses.LectureFile',
+        on_delete=models.CASCADE,
+        related_name='notification_jobs',
+        verbose_name='الملف'
+    )
+    event = models.CharField(
+        max_length=20,
+        choices=EVENT_CHOICES,
+        default='file_upload',
+        verbose_name='الحدث'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='الحالة'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد المحاولات'
+    )
+    last_error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='آخر خطأ'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الإضافة'
+    )
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاريخ المعالجة'
+    )
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='file_jobs',
+        verbose_name='الإشعار الناتج'
+    )
+    
+    class Meta:
+        db_table = 'file_notification_jobs'
+        verbose_name = 'مهمة إشعار ملف'
+        verbose_name_plural = 'مهام إشعارات الملفات'
+        ordering = ['created_at']
+        # كل ملف يُعلن عنه مرة واحدة لكل حدث، فإعادة إظهاره لا تكرر الإشعار
+        unique_together = ('file', 'event')
+        indexes = [
+            models.Index(fields=['status', 'course', 'uploader']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.course.course_code} - {self.file.title}"
+
+
+class EmailDelivery(models.Model):
+    """
+    جدول رسائل البريد للإشعارات (Email_Deliveries)
+    طابور إرسال البريد للإشعارات ذات الأولوية العالية والعاجلة
+    """
+    EMAIL_PRIORITIES = ('high', 'urgent')
+    
+    STATUS_CHOICES = [
+        ('pending', 'قيد الانتظار'),
+        ('sending', 'قيد الإرسال'),
+        ('sent', 'تم الإرسال'),
+        ('failed', 'فشل'),
+    ]
+    
+    recipient = models.OneToOneField(
+        NotificationRecipient,
+        on_delete=models.CASCADE,
+        related_name='email_delivery',
+        verbose_name='المستلم'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='الحالة'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='عدد المحاولات'
+    )
+    last_error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='آخر خطأ'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='موعد المحاولة التالية'
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='وقت حجز الرسالة للإرسال'
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='وقت الإرسال'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاريخ الإنشاء'
+    )
+    
+    class Meta:
+        db_table = 'email_deliveries'
+        verbose_name = 'رسالة بريد إشعار'
+        verbose_name_plural = 'رسائل بريد الإشعارات'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient} ({self.get_status_display()})"
+    
+    @classmethod
+    def queue_for_notification(cls, notification):
+        """
+        إضافة رسالة بريد لكل مستلم لديه بريد إلكتروني
+        """
+        recipient_ids = NotificationRecipient.objects.filter(
+            notification=notification,
+            user__email__isnull=False
+        ).exclude(user__email='').values_list('pk', flat=True)
+        
+        deliveries = [cls(recipient_id=recipient_id) for recipient_id in recipient_ids]
+        cls.objects.bulk_create(deliveries, ignore_conflicts=True)
+        return len(deliveries)
+
+
 class NotificationManager:
     """
     مدير لإنشاء وإرسال الإشعارات
@@ -171,8 +420,6 @@ class NotificationManager:
         إنشاء إشعار عند رفع ملف جديد
         يرسل إلى جميع طلاب المقرر
         """
-        from accounts.models import User
-        
         notification = Notification.objects.create(
             sender=file_obj.uploader,
             title=f"ملف جديد في {course.course_name}",
@@ -182,22 +429,74 @@ class NotificationManager:
             file=file_obj
         )
         
-        # الحصول على جميع طلاب المقرر
-        students = User.objects.filter(
-            role__role_name='Student',
-            major__in=course.course_majors.values_list('major', flat=True),
-            level=course.level,
-            account_status='active'
+        NotificationManager.send_to_course_students(notification, course)
+        
+        return notification
+    
+    @staticmethod
+    def queue_file_upload_notification(file_obj, course, event='file_upload'):
+        """
+        إضافة مهمة إشعار للملف إلى الطابور دون تنفيذ الإرسال في الطلب
+        يعيد (job, created)؛ created=False إذا سبق الإعلان عن الملف لنفس الحدث
+        """
+        return FileNotificationJob.objects.get_or_create(
+            file=file_obj,
+            event=event,
+            defaults={
+                'course': course,
+                'uploader': file_obj.uploader,
+            }
+        )
+    
+    @staticmethod
+    def create_file_digest_notification(course, uploader, files):
+        """
+        إنشاء إشعار واحد لمجموعة ملفات رفعها نفس المدرس في نفس المقرر
+        """
+        if len(files) == 1:
+            return NotificationManager.create_file_upload_notification(files[0], course)
+        
+        titles = '\n'.join(f'- {file_obj.title}' for file_obj in files)
+        notification = Notification.objects.create(
+            sender=uploader,
+            title=f"{len(files)} ملفات جديدة في {course.course_name}",
+            body=f"تم رفع {len(files)} ملفات جديدة:\n{titles}",
+            notification_type='file_upload',
+            course=course
         )
         
-        # إنشاء سجلات المستلمين
+        NotificationManager.send_to_course_students(notification, course)
+        
+        return notification
+    
+    @staticmethod
+    def send_to_course_students(notification, course):
+        """
+        إنشاء سجلات المستلمين لجميع طلاب المقرر
+        """
+        from courses.services import CourseAudienceService
+        
+        # جميع طلاب المقرر (بحث مفهرس في جدول الجمهور)
+        students = CourseAudienceService.get_students(course).only('pk')
+        
+        return NotificationManager.add_recipients(notification, students)
+    
+    @staticmethod
+    def add_recipients(notification, users):
+        """
+        إنشاء سجلات المستلمين للإشعار
+        وإضافة رسائل البريد إلى الطابور إذا كانت أولوية الإشعار عالية
+        """
         recipients = [
-            NotificationRecipient(notification=notification, user=student)
-            for student in students
+            NotificationRecipient(notification=notification, user=user, created_at=notification.created_at)
+            for user in users
         ]
         NotificationRecipient.objects.bulk_create(recipients)
         
-        return notification
+        if notification.priority in EmailDelivery.EMAIL_PRIORITIES:
+            EmailDelivery.queue_for_notification(notification)
+        
+        return len(recipients)
     
     @staticmethod
     def create_course_notification(sender, course, title, body, send_to_all_department=False):
@@ -224,19 +523,10 @@ class NotificationManager:
             )
         else:
             # إرسال لطلاب المقرر فقط
-            students = User.objects.filter(
-                role__role_name='Student',
-                major__in=course.course_majors.values_list('major', flat=True),
-                level=course.level,
-                account_status='active'
-            )
+            from courses.services import CourseAudienceService
+            students = CourseAudienceService.get_students(course).only('pk')
         
-        # إنشاء سجلات المستلمين
-        recipients = [
-            NotificationRecipient(notification=notification, user=student)
-            for student in students
-        ]
-        NotificationRecipient.objects.bulk_create(recipients)
+        NotificationManager.add_recipients(notification, students)
         
         return notification
     
@@ -259,12 +549,7 @@ class NotificationManager:
             # إرسال لجميع المستخدمين النشطين
             users = User.objects.filter(account_status='active')
         
-        # إنشاء سجلات المستلمين
-        recipients = [
-            NotificationRecipient(notification=notification, user=user)
-            for user in users
-        ]
-        NotificationRecipient.objects.bulk_create(recipients)
+        NotificationManager.add_recipients(notification, users)
         
         return notification
     
@@ -294,7 +579,7 @@ class NotificationManager:
         if not include_read:
             queryset = queryset.filter(is_read=False)
         
-        queryset = queryset.order_by('-notification__created_at')
+        queryset = queryset.order_by('-created_at', '-id')
         
         if limit:
             queryset = queryset[:limit]
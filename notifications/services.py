@@ -3,8 +3,23 @@
 S-ACM - Smart Academic Content Management System
 """
 
-from django.db.models import Q
-from .models import Notification
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q, F, Avg, Count, DurationField, ExpressionWrapper, Min, Max
+from django.utils import timezone
+
+from .models import (
+    Notification, NotificationRecipient, NotificationArchive,
+    NotificationManager, FileNotificationJob, EmailDelivery
+)
+
+
+logger = logging.getLogger(__name__)
 
 
 class NotificationService:
@@ -50,18 +65,12 @@ class NotificationService:
         """
         إرسال إشعار عند رفع ملف جديد
         """
-        from accounts.models import User
+        from courses.services import CourseAudienceService
         
         course = file_obj.course
         
-        # الحصول على جميع الطلاب المسجلين في التخصصات المرتبطة بالمقرر
-        majors = course.course_majors.values_list('major_id', flat=True)
-        students = User.objects.filter(
-            role__role_name='student',
-            major_id__in=majors,
-            level=course.level,
-            account_status='active'
-        )
+        # طلاب المقرر من جدول الجمهور المحسوب مسبقاً
+        students = CourseAudienceService.get_students(course)
         
         return cls.bulk_create_notifications(
             users=students,
@@ -160,11 +169,519 @@ class NotificationService:
         """
         حذف الإشعارات القديمة
         """
-        from datetime import timedelta
-        from django.utils import timezone
+        return NotificationRetentionService.purge(days=days)
+
+
+class NotificationRetentionService:
+    """
+    خدمة الاحتفاظ بالإشعارات وتنظيفها
+    
+    تحذف على دفعات صغيرة مرتبة حسب المفتاح الأساسي، كل دفعة في معاملة
+    قصيرة مستقلة حتى لا تُقفل الجداول لفترات طويلة.
+    """
+    
+    @classmethod
+    def get_retention_days(cls):
+        return getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 180)
+    
+    @classmethod
+    def get_batch_size(cls):
+        return getattr(settings, 'NOTIFICATION_PURGE_BATCH_SIZE', 1000)
+    
+    @classmethod
+    def get_purgeable_notifications(cls, days=None, now=None):
+        """
+        الإشعارات المنتهية (expires_at) أو الأقدم من مدة الاحتفاظ
+        """
+        now = now or timezone.now()
+        days = cls.get_retention_days() if days is None else days
+        cutoff = now - timedelta(days=days)
         
-        cutoff_date = timezone.now() - timedelta(days=days)
         return Notification.objects.filter(
-            created_at__lt=cutoff_date,
-            is_read=True
-        ).delete()
+            Q(expires_at__lt=now) | Q(created_at__lt=cutoff)
+        )
+    
+    @classmethod
+    def get_purgeable_recipients(cls, days=None, now=None):
+        """
+        سجلات المستلمين التي حذفها المستخدم من قائمته وتجاوزت مدة الاحتفاظ
+        """
+        now = now or timezone.now()
+        days = cls.get_retention_days() if days is None else days
+        cutoff = now - timedelta(days=days)
+        
+        return NotificationRecipient.objects.filter(
+            is_deleted=True,
+            created_at__lt=cutoff
+        )
+    
+    @classmethod
+    def archive_notifications(cls, notification_ids):
+        """
+        حفظ ملخص إحصائي للإشعارات قبل حذفها
+        Returns: عدد الإشعارات المؤرشفة فعلاً (المؤرشفة سابقاً لا تُحتسب)
+        """
+        already_archived = NotificationArchive.objects.filter(
+            original_id__in=notification_ids
+        ).values_list('original_id', flat=True)
+        notifications = Notification.objects.filter(
+            pk__in=notification_ids
+        ).exclude(pk__in=already_archived).annotate(
+            total_recipients=Count('recipients'),
+            total_read=Count('recipients', filter=Q(recipients__is_read=True))
+        )
+        
+        archives = [
+            NotificationArchive(
+                original_id=notification.pk,
+                title=notification.title,
+                notification_type=notification.notification_type,
+                priority=notification.priority,
+                course_id=notification.course_id,
+                sender_id=notification.sender_id,
+                recipients_count=notification.total_recipients,
+                read_count=notification.total_read,
+                created_at=notification.created_at,
+                expires_at=notification.expires_at
+            )
+            for notification in notifications
+        ]
+        NotificationArchive.objects.bulk_create(archives, ignore_conflicts=True)
+        return len(archives)
+    
+    @classmethod
+    def _delete_in_batches(cls, queryset, batch_size):
+        """
+        حذف صفوف الاستعلام على دفعات بترتيب المفتاح الأساسي
+        """
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+                if not ids:
+                    break
+                count, _ = queryset.model.objects.filter(pk__in=ids).delete()
+                deleted += count
+        return deleted
+    
+    @classmethod
+    def purge(cls, days=None, batch_size=None, archive=False, dry_run=False, now=None):
+        """
+        تنفيذ مهمة التنظيف وإرجاع إحصائياتها
+        """
+        batch_size = batch_size or cls.get_batch_size()
+        notifications = cls.get_purgeable_notifications(days=days, now=now)
+        hidden_recipients = cls.get_purgeable_recipients(days=days, now=now)
+        
+        stats = {
+            'notifications': 0,
+            'recipients': 0,
+            'archived': 0,
+            'elapsed': 0.0,
+            'rows_per_second': 0.0,
+        }
+        
+        if dry_run:
+            stats['notifications'] = notifications.count()
+            stats['recipients'] = (
+                NotificationRecipient.objects.filter(notification__in=notifications).count() +
+                hidden_recipients.exclude(notification__in=notifications).count()
+            )
+            return stats
+        
+        started = time.monotonic()
+        
+        # سجلات المستلمين المخفية من قبل المستخدمين
+        stats['recipients'] += cls._delete_in_batches(hidden_recipients, batch_size)
+        
+        while True:
+            notification_ids = list(
+                notifications.order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not notification_ids:
+                break
+            
+            if archive:
+                with transaction.atomic():
+                    stats['archived'] += cls.archive_notifications(notification_ids)
+            
+            # حذف المستلمين أولاً على دفعات، ثم الإشعارات نفسها
+            stats['recipients'] += cls._delete_in_batches(
+                NotificationRecipient.objects.filter(notification_id__in=notification_ids),
+                batch_size
+            )
+            with transaction.atomic():
+                count, _ = Notification.objects.filter(pk__in=notification_ids).delete()
+                stats['notifications'] += count
+        
+        stats['elapsed'] = time.monotonic() - started
+        total_rows = stats['notifications'] + stats['recipients']
+        if stats['elapsed'] > 0:
+            stats['rows_per_second'] = total_rows / stats['elapsed']
+        
+        return stats
+
+
+class FileNotificationDigestService:
+    """
+    خدمة طابور إشعارات الملفات ودمجها
+    
+    تُجمع مهام الرفع حسب (المقرر، الرافع)، وتُرسل المجموعة كإشعار واحد
+    بعد مرور فترة هدوء دون رفع جديد، أو بعد أقصى مدة انتظار.
+    """
+    
+    @classmethod
+    def get_window(cls):
+        return timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 120))
+    
+    @classmethod
+    def get_max_delay(cls):
+        return timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_MAX_DELAY', 900))
+    
+    @classmethod
+    def get_max_attempts(cls):
+        return getattr(settings, 'NOTIFICATION_JOB_MAX_ATTEMPTS', 5)
+    
+    @classmethod
+    def get_due_groups(cls, now=None):
+        """
+        المجموعات التي انتهت فترة تجميعها
+        """
+        now = now or timezone.now()
+        
+        return FileNotificationJob.objects.filter(
+            status='pending'
+        ).values('course_id', 'uploader_id').annotate(
+            first_queued=Min('created_at'),
+            last_queued=Max('created_at')
+        ).filter(
+            Q(last_queued__lte=now - cls.get_window()) |
+            Q(first_queued__lte=now - cls.get_max_delay())
+        ).order_by('first_queued')
+    
+    @classmethod
+    def flush_group(cls, course_id, uploader_id, now=None):
+        """
+        بناء إشعار واحد لمجموعة (مقرر، رافع) وتعليم مهامها كمعالجة
+        """
+        now = now or timezone.now()
+        
+        with transaction.atomic():
+            # of=('self',): قفل صفوف المهام فقط؛ PostgreSQL يرفض FOR UPDATE على
+            # الطرف القابل للقيمة الفارغة من LEFT JOIN (uploader)
+            jobs = list(
+                FileNotificationJob.objects.select_for_update(of=('self',)).filter(
+                    status='pending',
+                    course_id=course_id,
+                    uploader_id=uploader_id
+                ).select_related('course', 'course__level', 'uploader', 'file')
+            )
+            if not jobs:
+                return None
+            
+            # الملفات التي أُخفيت أو حُذفت خلال فترة التجميع: حذف مهامها بدل تعليمها
+            # كمعالجة، فيُعاد جدولة الإعلان عنها عند إظهارها لاحقاً
+            withdrawn = [job for job in jobs if job.file.is_deleted or not job.file.is_visible]
+            if withdrawn:
+                FileNotificationJob.objects.filter(pk__in=[job.pk for job in withdrawn]).delete()
+                jobs = [job for job in jobs if job not in withdrawn]
+                if not jobs:
+                    return None
+            
+            files = []
+            seen = set()
+            for job in jobs:
+                if job.file_id in seen:
+                    continue
+                seen.add(job.file_id)
+                files.append(job.file)
+            
+            notification = NotificationManager.create_file_digest_notification(
+                jobs[0].course, jobs[0].uploader, files
+            )
+            
+            FileNotificationJob.objects.filter(
+                pk__in=[job.pk for job in jobs]
+            ).update(
+                status='done',
+                processed_at=now,
+                notification=notification,
+                attempts=F('attempts') + 1
+            )
+        
+        return notification
+    
+    @classmethod
+    def record_failure(cls, course_id, uploader_id, error):
+        """
+        تسجيل فشل معالجة مجموعة، وإيقافها بعد تجاوز الحد الأقصى للمحاولات
+        """
+        jobs = FileNotificationJob.objects.filter(
+            status='pending',
+            course_id=course_id,
+            uploader_id=uploader_id
+        )
+        jobs.update(attempts=F('attempts') + 1, last_error=str(error))
+        jobs.filter(attempts__gte=cls.get_max_attempts()).update(status='failed')
+    
+    @classmethod
+    def flush_due(cls, now=None):
+        """
+        معالجة جميع المجموعات المستحقة وإرجاع عدد الإشعارات المُنشأة
+        """
+        now = now or timezone.now()
+        created = 0
+        
+        for group in cls.get_due_groups(now=now):
+            try:
+                if cls.flush_group(group['course_id'], group['uploader_id'], now=now):
+                    created += 1
+            except Exception as e:
+                logger.exception(
+                    'File notification digest failed (course=%s, uploader=%s)',
+                    group['course_id'], group['uploader_id']
+                )
+                cls.record_failure(group['course_id'], group['uploader_id'], e)
+        
+        return created
+    
+    @classmethod
+    def get_queue_stats(cls, now=None):
+        """
+        مقاييس الطابور: عدد المهام المعلقة والفاشلة وتأخر المعالجة بالثواني
+        """
+        now = now or timezone.now()
+        pending = FileNotificationJob.objects.filter(status='pending')
+        
+        pending_stats = pending.aggregate(
+            count=Count('id'),
+            oldest=Min('created_at')
+        )
+        
+        lag = ExpressionWrapper(F('processed_at') - F('created_at'), output_field=DurationField())
+        recent_stats = FileNotificationJob.objects.filter(
+            status='done',
+            processed_at__gte=now - timedelta(hours=1)
+        ).aggregate(
+            count=Count('id'),
+            avg_lag=Avg(lag),
+            max_lag=Max(lag)
+        )
+        
+        oldest = pending_stats['oldest']
+        avg_lag, max_lag = recent_stats['avg_lag'], recent_stats['max_lag']
+        return {
+            'pending': pending_stats['count'],
+            'failed': FileNotificationJob.objects.filter(status='failed').count(),
+            'oldest_pending_age': (now - oldest).total_seconds() if oldest else 0,
+            'processed_last_hour': recent_stats['count'],
+            'avg_lag_last_hour': avg_lag.total_seconds() if avg_lag else 0,
+            'max_lag_last_hour': max_lag.total_seconds() if max_lag else 0,
+        }
+
+
+class NotificationEmailService:
+    """
+    قناة البريد الإلكتروني للإشعارات ذات الأولوية العالية
+    
+    تعيد استخدام اتصال SMTP واحد وترسل الرسائل على دفعات عبر send_messages،
+    مع تحديد معدل الإرسال وإعادة المحاولة بتأخير متزايد.
+    """
+    
+    @classmethod
+    def get_batch_size(cls):
+        return getattr(settings, 'NOTIFICATION_EMAIL_BATCH_SIZE', 50)
+    
+    @classmethod
+    def get_rate_limit(cls):
+        """الحد الأقصى للرسائل في الثانية (0 = بدون حد)"""
+        return getattr(settings, 'NOTIFICATION_EMAIL_RATE_LIMIT', 10)
+    
+    @classmethod
+    def get_max_attempts(cls):
+        return getattr(settings, 'NOTIFICATION_EMAIL_MAX_ATTEMPTS', 5)
+    
+    @classmethod
+    def build_message(cls, delivery):
+        """بناء رسالة البريد لمستلم واحد"""
+        notification = delivery.recipient.notification
+        return EmailMessage(
+            subject=f'[S-ACM] {notification.title}',
+            body=notification.body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[delivery.recipient.user.email]
+        )
+    
+    @classmethod
+    def send_batch(cls, messages, connection):
+        """إرسال دفعة رسائل عبر اتصال مفتوح واحد"""
+        return connection.send_messages(messages) or 0
+    
+    @classmethod
+    def throttle(cls, sent, started):
+        """الانتظار بما يكفي للبقاء تحت معدل الإرسال المحدد"""
+        rate_limit = cls.get_rate_limit()
+        if not rate_limit:
+            return
+        expected = sent / rate_limit
+        elapsed = time.monotonic() - started
+        if expected > elapsed:
+            time.sleep(expected - elapsed)
+    
+    @classmethod
+    def get_due_deliveries(cls, now=None):
+        now = now or timezone.now()
+        return EmailDelivery.objects.filter(
+            status='pending',
+            next_attempt_at__lte=now
+        )
+    
+    @classmethod
+    def claim_batch(cls, size, now=None):
+        """
+        حجز دفعة من الرسائل المستحقة لهذا المعالج (status=sending)
+        فلا يرسلها معالج آخر يعمل بالتوازي
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            ids = list(
+                cls.get_due_deliveries(now).select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:size]
+            )
+            EmailDelivery.objects.filter(pk__in=ids, status='pending').update(
+                status='sending',
+                claimed_at=now
+            )
+        return list(
+            EmailDelivery.objects.filter(
+                pk__in=ids, status='sending', claimed_at=now
+            ).select_related('recipient__user', 'recipient__notification')
+        )
+    
+    @classmethod
+    def release(cls, deliveries):
+        """إعادة رسائل محجوزة لم تُرسل إلى الانتظار"""
+        EmailDelivery.objects.filter(
+            pk__in=[delivery.pk for delivery in deliveries],
+            status='sending'
+        ).update(status='pending', claimed_at=None)
+    
+    @classmethod
+    def reclaim_stale(cls, now=None):
+        """
+        إعادة الدفعات المحجوزة لمعالج توقف قبل تسجيل نتيجتها إلى الانتظار
+        قد تصل بعض رسائلها مرتين، وهذا أفضل من ضياعها
+        """
+        now = now or timezone.now()
+        return EmailDelivery.objects.filter(
+            status='sending',
+            claimed_at__lt=now - timedelta(minutes=getattr(settings, 'NOTIFICATION_EMAIL_CLAIM_MINUTES', 10))
+        ).update(status='pending', claimed_at=None)
+    
+    @classmethod
+    def record_failure(cls, deliveries, error, now=None):
+        """
+        زيادة عدد المحاولات وجدولة إعادة المحاولة بتأخير متزايد
+        Returns: عدد الرسائل التي تجاوزت الحد الأقصى للمحاولات (فشل نهائي)
+        """
+        now = now or timezone.now()
+        max_attempts = cls.get_max_attempts()
+        failed = 0
+        
+        for delivery in deliveries:
+            delivery.attempts += 1
+            delivery.last_error = str(error)
+            delivery.claimed_at = None
+            if delivery.attempts >= max_attempts:
+                delivery.status = 'failed'
+                failed += 1
+            else:
+                delivery.status = 'pending'
+                delivery.next_attempt_at = now + timedelta(minutes=2 ** delivery.attempts)
+        
+        EmailDelivery.objects.bulk_update(
+            deliveries, ['attempts', 'last_error', 'status', 'next_attempt_at', 'claimed_at']
+        )
+        return failed
+    
+    @classmethod
+    def mark_sent(cls, deliveries):
+        if deliveries:
+            EmailDelivery.objects.filter(
+                pk__in=[delivery.pk for delivery in deliveries]
+            ).update(status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1)
+    
+    @classmethod
+    def send_each(cls, deliveries, connection, stats):
+        """
+        إرسال دفعة فشلت رسالة رسالة، فتُعاد جدولة الرسائل الفاشلة وحدها
+        وتُعلّم كل رسالة مرسلة فور إرسالها
+        """
+        for delivery in deliveries:
+            try:
+                cls.send_batch([cls.build_message(delivery)], connection)
+            except Exception as e:
+                failed = cls.record_failure([delivery], e)
+                stats['failed'] += failed
+                stats['retrying'] += 1 - failed
+                # إعادة فتح الاتصال بعد الفشل
+                connection.close()
+                connection.open()
+                continue
+            cls.mark_sent([delivery])
+            stats['sent'] += 1
+    
+    @classmethod
+    def send_pending(cls, limit=None, connection=None):
+        """
+        إرسال الرسائل المستحقة وإرجاع إحصائيات الإرسال
+        
+        كل دفعة تُحجز أولاً (status=sending) ثم تُرسل باستدعاء send_messages واحد
+        وتُعلّم كمرسلة مباشرة. إذا فشلت الدفعة يُعاد إرسالها رسالة رسالة لتحديد
+        الرسائل الفاشلة، وقد يتلقى من وصلته رسالة قبل الفشل نسخة ثانية.
+        الدفعات التي لم تُسجل نتيجتها (توقف المعالج) تُستعاد عبر reclaim_stale.
+        
+        stats: sent، retrying (ستُعاد محاولتها)، failed (تجاوزت الحد الأقصى)
+        """
+        batch_size = cls.get_batch_size()
+        stats = {'sent': 0, 'retrying': 0, 'failed': 0, 'elapsed': 0.0, 'messages_per_second': 0.0}
+        
+        def attempted():
+            return stats['sent'] + stats['retrying'] + stats['failed']
+        
+        cls.reclaim_stale()
+        connection = connection or get_connection(fail_silently=False)
+        started = time.monotonic()
+        
+        try:
+            connection.open()
+            while limit is None or attempted() < limit:
+                size = batch_size if limit is None else min(batch_size, limit - attempted())
+                deliveries = cls.claim_batch(size)
+                if not deliveries:
+                    break
+                
+                try:
+                    try:
+                        cls.send_batch([cls.build_message(d) for d in deliveries], connection)
+                    except Exception:
+                        logger.exception('Email batch of %d failed, retrying one by one', len(deliveries))
+                        connection.close()
+                        connection.open()
+                        cls.send_each(deliveries, connection, stats)
+                    else:
+                        cls.mark_sent(deliveries)
+                        stats['sent'] += len(deliveries)
+                finally:
+                    # رسائل لم تُسجل نتيجتها (انقطع الاتصال أثناء الإرسال الفردي)
+                    cls.release(deliveries)
+                
+                cls.throttle(attempted(), started)
+        finally:
+            connection.close()
+        
+        stats['elapsed'] = time.monotonic() - started
+        if stats['elapsed'] > 0:
+            stats['messages_per_second'] = stats['sent'] / stats['elapsed']
+        
+        return stats
@@ -24,4 +24,5 @@ urlpatterns = [
     # Admin Notifications
     path('admin/create/', views.AdminNotificationCreateView.as_view(), name='admin_create'),
     path('admin/', views.AdminNotificationListView.as_view(), name='admin_list'),
+    path('admin/queue-stats/', views.AdminNotificationQueueStatsView.as_view(), name='admin_queue_stats'),
 ]
@@ -12,14 +12,17 @@ from django.http import JsonResponse
 from django.urls import reverse_lazy
 
 from .models import Notification, NotificationRecipient, NotificationManager
+from .services import FileNotificationDigestService
 from .forms import NotificationForm, CourseNotificationForm
 from accounts.views import InstructorRequiredMixin, AdminRequiredMixin
 from courses.models import Course
+from core.pagination import CursorPaginationMixin
 
 
-class NotificationListView(LoginRequiredMixin, ListView):
+class NotificationListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """قائمة إشعارات المستخدم"""
     template_name = 'notifications/list.html'
+    fragment_template_name = 'notifications/partials/list_items.html'
     context_object_name = 'notifications'
     paginate_by = 20
     
@@ -31,7 +34,8 @@ class NotificationListView(LoginRequiredMixin, ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['unread_count'] = NotificationManager.get_unread_count(self.request.user)
+        if not self.is_fragment_request():
+            context['unread_count'] = NotificationManager.get_unread_count(self.request.user)
         return context
 
 
@@ -188,17 +192,13 @@ class AdminNotificationCreateView(LoginRequiredMixin, AdminRequiredMixin, Create
             users = User.objects.filter(account_status='active')
         
         # إنشاء سجلات المستلمين
-        recipients = [
-            NotificationRecipient(notification=notification, user=user)
-            for user in users
-        ]
-        NotificationRecipient.objects.bulk_create(recipients)
+        count = NotificationManager.add_recipients(notification, users)
         
-        messages.success(self.request, f'تم إرسال الإشعار إلى {len(recipients)} مستخدم.')
+        messages.success(self.request, f'تم إرسال الإشعار إلى {count} مستخدم.')
         return redirect(self.success_url)
 
 
-class AdminNotificationListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class AdminNotificationListView(LoginRequiredMixin, AdminRequiredMixin, CursorPaginationMixin, ListView):
     """قائمة جميع الإشعارات (للأدمن)"""
     model = Notification
     template_name = 'admin_panel/notifications/list.html'
@@ -206,4 +206,11 @@ class AdminNotificationListView(LoginRequiredMixin, AdminRequiredMixin, ListView
     paginate_by = 20
     
     def get_queryset(self):
-        return Notification.objects.all().order_by('-created_at')
+        return Notification.objects.select_related('sender', 'course')
+
+
+class AdminNotificationQueueStatsView(LoginRequiredMixin, AdminRequiredMixin, View):
+    """مقاييس طابور إشعارات الملفات (AJAX)"""
+    
+    def get(self, request):
+        return JsonResponse(FileNotificationDigestService.get_queue_stats())